@@ -1,6 +1,24 @@
 import functools as ft
+import itertools as it
+import sys
+import time
+from array import array
+from collections import Counter
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from enum import IntEnum, auto
 
-from tokenizer import Token, TokenType
+import instrumentation
+from tokenizer import (
+    OPENING_PARENTHESIS,
+    TOKEN_TYPE_CODES,
+    TOKEN_TYPES,
+    Position,
+    Token,
+    TokenStream,
+    TokenType,
+    UnsupportedLexemeError,
+)
 
 VALID_START_OF_EXPRESSION = {
     TokenType.IDENTIFIER,
@@ -41,16 +59,378 @@ VALID_FOLLOW_SETS = {
 }
 
 
+class SyntaxErrorKind(IntEnum):
+    """Kinds of syntax errors, in the order they are reported."""
+    EMPTY_EXPRESSION = auto()
+    INVALID_START = auto()
+    INVALID_FOLLOW = auto()
+    INVALID_END = auto()
+    UNMATCHED_CLOSING_PARENTHESIS = auto()
+    UNCLOSED_OPENING_PARENTHESIS = auto()
+
+
 class SyntaxAnalysisError(Exception):
-    """Invalid syntax encountered."""
+    """Invalid syntax encountered.
+
+    Without a message, it is rendered from the kind and tokens when the
+    error is first shown.
+    """
+    def __init__(
+        self,
+        message: str | None = None,
+        kind: SyntaxErrorKind | None = None,
+        tokens: tuple[Token, ...] = ()
+    ) -> None:
+        self.kind = kind
+        self.tokens = tokens
+        self._message = message
+        super().__init__(message, kind, tokens)
+
+    def __str__(self) -> str:
+        if self._message is None:
+            self._message = _syntax_error_message(self.kind, self.tokens)
+        return self._message
+
+    @property
+    def position(self) -> Position | None:
+        """Position of the token the error is reported at."""
+        return self.tokens[-1].position if self.tokens else None
+
+
+def _syntax_error_message(
+    kind: SyntaxErrorKind, tokens: tuple[Token, ...]
+) -> str:
+    match kind:
+        case SyntaxErrorKind.EMPTY_EXPRESSION:
+            return "Expression can't be empty"
+        case SyntaxErrorKind.INVALID_START:
+            return f"Expression can't start with {tokens[0].type!r}"
+        case SyntaxErrorKind.INVALID_FOLLOW:
+            prev, curr = tokens
+            return (
+                f"{curr.position}: {_format_token_info(prev)} "
+                f"can't be followed by {_format_token_info(curr)}"
+            )
+        case SyntaxErrorKind.INVALID_END:
+            return f"Expression can't end with {tokens[0].type!r}"
+        case SyntaxErrorKind.UNMATCHED_CLOSING_PARENTHESIS:
+            return f"{tokens[0].position}: ')' has never been openned with '('"
+        case SyntaxErrorKind.UNCLOSED_OPENING_PARENTHESIS:
+            return f"{tokens[0].position}: '(' has never been closed with ')'"
+
+
+def make_syntax_analysis_error(
+    kind: SyntaxErrorKind, *tokens: Token
+) -> SyntaxAnalysisError:
+    """Build an error of given kind about given tokens, its message is
+    rendered on demand."""
+    return SyntaxAnalysisError(None, kind, tokens)
+
+
+def analyze(
+    tokens: Sequence[Token], max_errors: int | None = None
+) -> list[SyntaxAnalysisError]:
+    return SyntaxAnalyzer(tokens, max_errors).analyze()
+
+
+_OPENING_PARENTHESIS_CODE = TOKEN_TYPE_CODES[TokenType.OPENING_PARENTHESIS]
+_CLOSING_PARENTHESIS_CODE = TOKEN_TYPE_CODES[TokenType.CLOSING_PARENTHESIS]
+
+# Pseudo token type code of the state preceding the first token
+START_OF_EXPRESSION_CODE = len(TOKEN_TYPES)
 
+# TRANSITIONS[prev][curr] tells whether token type with code `curr` may
+# follow one with code `prev`
+TRANSITIONS = tuple(
+    bytes(curr in follow_set for curr in TOKEN_TYPES)
+    for follow_set in (
+        *(VALID_FOLLOW_SETS[prev] for prev in TOKEN_TYPES),
+        VALID_START_OF_EXPRESSION,
+    )
+)
+VALID_END_CODES = bytes(
+    token_type in VALID_END_OF_EXPRESSION for token_type in TOKEN_TYPES
+)
 
-def analyze(tokens: list[Token]) -> list[SyntaxAnalysisError]:
-    return SyntaxAnalyzer(tokens).analyze()
+# Codes fit into _CODE_BITS bits, VALID_PAIRS[prev << _CODE_BITS | curr]
+# is TRANSITIONS[prev][curr], zero for codes that don't exist
+_CODE_BITS = 4
+VALID_PAIRS = bytes(
+    prev < len(TRANSITIONS) and curr < len(TOKEN_TYPES) and (
+        TRANSITIONS[prev][curr]
+    )
+    for prev in range(1 << _CODE_BITS) for curr in range(1 << _CODE_BITS)
+)
+
+_NON_PARENTHESIS_CODES = bytes(
+    code for code in range(256)
+    if code not in (_OPENING_PARENTHESIS_CODE, _CLOSING_PARENTHESIS_CODE)
+)
+_DEPTH_CHANGES = {_OPENING_PARENTHESIS_CODE: 1, _CLOSING_PARENTHESIS_CODE: -1}
+
+
+def token_type_codes(tokens: Sequence[Token]) -> Sequence[int]:
+    if isinstance(tokens, TokenStream):
+        return tokens.types
+    return [TOKEN_TYPE_CODES[token.type] for token in tokens]
+
+
+@dataclass
+class CodeScan:
+    """Indices of tokens failing the checks of a pass over type codes.
+
+    Index 0 among `invalid_follows` means an invalid start of expression.
+    """
+    invalid_follows: list[int]
+    unmatched_closings: list[int]
+    unclosed_openings: list[int]
+
+
+def _follow_checks(codes: bytes) -> bytes:
+    """Byte per token, zero when it can't follow the token before it."""
+    if not codes:
+        return b""
+    # Shifting all previous codes at once puts each into the high bits of
+    # the byte holding the code after it
+    previous = int.from_bytes(bytes((START_OF_EXPRESSION_CODE,)) + codes[:-1])
+    pairs = previous << _CODE_BITS | int.from_bytes(codes)
+    return pairs.to_bytes(len(codes)).translate(VALID_PAIRS)
+
+
+def _match_parentheses(codes: bytes) -> tuple[list[int], list[int]]:
+    """Indices of unmatched ')' and unclosed '('."""
+    parentheses = codes.translate(None, _NON_PARENTHESIS_CODES)
+    if not parentheses:
+        return [], []
+    depths = list(it.accumulate(map(_DEPTH_CHANGES.__getitem__, parentheses)))
+    if depths[-1] == 0 and min(depths) >= 0:
+        return [], []
+
+    opening_code = _OPENING_PARENTHESIS_CODE
+    closing_code = _CLOSING_PARENTHESIS_CODE
+    unmatched_closings: list[int] = []
+    unclosed_openings: list[int] = []
+    for index, code in enumerate(codes):
+        if code == opening_code:
+            unclosed_openings.append(index)
+        elif code == closing_code:
+            if unclosed_openings:
+                unclosed_openings.pop()
+            else:
+                unmatched_closings.append(index)
+    return unmatched_closings, unclosed_openings
+
+
+def scan_type_codes(
+    codes: Sequence[int], max_errors: int | None = None
+) -> CodeScan:
+    """Check start, adjacent tokens and parentheses.
+
+    Checks run over the codes as a whole, only an expression with
+    unmatched parentheses is walked token by token to find them. With
+    `max_errors`, the scan stops once that many invalid follows are
+    found, since they are reported before any later check.
+    """
+    codes = bytes(codes)
+    follow_checks = _follow_checks(codes)
+    invalid_follows: list[int] = []
+    index = follow_checks.find(0)
+    while index >= 0:
+        invalid_follows.append(index)
+        if len(invalid_follows) == max_errors:
+            codes = codes[:index]
+            break
+        index = follow_checks.find(0, index + 1)
+    return CodeScan(invalid_follows, *_match_parentheses(codes))
+
+
+class SyntaxErrorRecords(Sequence[SyntaxAnalysisError]):
+    """Syntax errors kept as kind codes and indices of the tokens they are
+    reported at, errors are built when accessed.
+
+    An invalid follow error is about the token at its index and the one
+    before it.
+    """
+    def __init__(self, tokens: Sequence[Token]) -> None:
+        self.tokens = tokens
+        self.kinds = array("B")
+        self.indices = array("i")
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        kind = SyntaxErrorKind(self.kinds[index])
+        token_index = self.indices[index]
+        if kind == SyntaxErrorKind.EMPTY_EXPRESSION:
+            return make_syntax_analysis_error(kind)
+        if kind == SyntaxErrorKind.INVALID_FOLLOW:
+            return make_syntax_analysis_error(
+                kind, self.tokens[token_index-1], self.tokens[token_index]
+            )
+        return make_syntax_analysis_error(kind, self.tokens[token_index])
+
+    def append(self, kind: SyntaxErrorKind, token_index: int = -1) -> None:
+        self.kinds.append(kind)
+        self.indices.append(token_index)
+
+    def kind(self, index: int) -> SyntaxErrorKind:
+        return SyntaxErrorKind(self.kinds[index])
+
+    def position(self, index: int) -> Position | None:
+        token_index = self.indices[index]
+        if token_index < 0:
+            return None
+        if isinstance(self.tokens, TokenStream):
+            return self.tokens.position(token_index)
+        return self.tokens[token_index].position
 
 
 class SyntaxAnalyzer:
-    def __init__(self, tokens: list[Token]) -> None:
+    """Checks start, adjacent tokens, end and parentheses in a single pass
+    over token type codes.
+
+    Errors are recorded as kinds and token indices, tokens are only
+    materialized when errors are accessed. With `max_errors`, analysis
+    stops after the first `max_errors` errors, which are the same as
+    without the limit.
+    """
+    def __init__(
+        self, tokens: Sequence[Token], max_errors: int | None = None
+    ) -> None:
+        self.tokens = tokens
+        self.max_errors = max_errors
+        self.errors: list[SyntaxAnalysisError] = []
+
+    def analyze(self) -> list[SyntaxAnalysisError]:
+        self.errors = list(self.analyze_records())
+        return self.errors
+
+    def analyze_records(self) -> SyntaxErrorRecords:
+        observer = instrumentation.observer
+        if observer is None:
+            return self.records(scan_type_codes(
+                token_type_codes(self.tokens), self.max_errors
+            ))
+
+        started_at = time.perf_counter()
+        scan = scan_type_codes(token_type_codes(self.tokens), self.max_errors)
+        scanned_at = time.perf_counter()
+        records = self.records(scan)
+        observer.phase_finished("analyze.scan", scanned_at - started_at)
+        observer.phase_finished(
+            "analyze.report", time.perf_counter() - scanned_at
+        )
+        observer.errors_counted(
+            Counter(
+                SyntaxErrorKind(kind).name.lower() for kind in records.kinds
+            )
+        )
+        return records
+
+    def report(self, scan: CodeScan) -> list[SyntaxAnalysisError]:
+        """Turn a scan of the tokens into errors, in reporting order."""
+        self.errors = list(self.records(scan))
+        return self.errors
+
+    def records(self, scan: CodeScan) -> SyntaxErrorRecords:
+        """Turn a scan of the tokens into error records, in reporting
+        order."""
+        tokens = self.tokens
+        records = SyntaxErrorRecords(tokens)
+        limit = sys.maxsize if self.max_errors is None else self.max_errors
+        if not tokens:
+            records.append(SyntaxErrorKind.EMPTY_EXPRESSION)
+            return records
+
+        invalid_follows = scan.invalid_follows[:limit]
+        if invalid_follows and invalid_follows[0] == 0:
+            records.append(SyntaxErrorKind.INVALID_START, 0)
+            invalid_follows = invalid_follows[1:]
+        for index in invalid_follows:
+            records.append(SyntaxErrorKind.INVALID_FOLLOW, index)
+        if len(records) >= limit:
+            return records
+        if tokens[-1].type not in VALID_END_OF_EXPRESSION:
+            records.append(SyntaxErrorKind.INVALID_END, len(tokens) - 1)
+        for kind, indices in [
+            (
+                SyntaxErrorKind.UNMATCHED_CLOSING_PARENTHESIS,
+                scan.unmatched_closings
+            ),
+            (
+                SyntaxErrorKind.UNCLOSED_OPENING_PARENTHESIS,
+                scan.unclosed_openings
+            ),
+        ]:
+            for index in indices[:limit - len(records)]:
+                records.append(kind, index)
+        return records
+
+
+def iter_analyze(
+    items: Iterable[Token | UnsupportedLexemeError]
+) -> Iterator[UnsupportedLexemeError | SyntaxAnalysisError]:
+    """Analyze tokens as they come, e.g. from `iter_tokenize`.
+
+    Tokenization errors are passed through. Errors are yielded as soon as
+    they're found, so unmatched ')' come along with the follow errors
+    instead of after the end error, as they do in `analyze`. Only the
+    positions of still-open parentheses are kept in memory.
+    """
+    transitions = TRANSITIONS
+    allowed = transitions[START_OF_EXPRESSION_CODE]
+    opening_code = _OPENING_PARENTHESIS_CODE
+    closing_code = _CLOSING_PARENTHESIS_CODE
+    unclosed_openings: list[int] = []
+    prev: Token | None = None
+    for item in items:
+        if not isinstance(item, Token):
+            yield item
+            continue
+        code = TOKEN_TYPE_CODES[item.type]
+        if not allowed[code]:
+            if prev is None:
+                yield make_syntax_analysis_error(
+                    SyntaxErrorKind.INVALID_START, item
+                )
+            else:
+                yield make_syntax_analysis_error(
+                    SyntaxErrorKind.INVALID_FOLLOW, prev, item
+                )
+        if code == opening_code:
+            unclosed_openings.append(item.position.start)
+        elif code == closing_code:
+            if unclosed_openings:
+                unclosed_openings.pop()
+            else:
+                yield make_syntax_analysis_error(
+                    SyntaxErrorKind.UNMATCHED_CLOSING_PARENTHESIS, item
+                )
+        allowed = transitions[code]
+        prev = item
+
+    if prev is None:
+        yield make_syntax_analysis_error(SyntaxErrorKind.EMPTY_EXPRESSION)
+        return
+    if not VALID_END_CODES[TOKEN_TYPE_CODES[prev.type]]:
+        yield make_syntax_analysis_error(SyntaxErrorKind.INVALID_END, prev)
+    for start in unclosed_openings:
+        yield make_syntax_analysis_error(
+            SyntaxErrorKind.UNCLOSED_OPENING_PARENTHESIS,
+            Token(
+                type=TokenType.OPENING_PARENTHESIS,
+                lexeme=OPENING_PARENTHESIS,
+                position=Position(start, start)
+            )
+        )
+
+
+class ReferenceSyntaxAnalyzer:
+    """Original multi-pass analyzer, kept to cross-check `SyntaxAnalyzer`."""
+    def __init__(self, tokens: Sequence[Token]) -> None:
         self.tokens = tokens
         self.errors: list[SyntaxAnalysisError] = []
 
@@ -0,0 +1,255 @@
+import heapq
+import math
+import random
+from dataclasses import dataclass
+
+from compiler import DivisionByZeroError, identifier_names, interpret
+from parser import NO_NODE, ExpressionTree, NodeKind
+
+_ADDITIVE_KINDS = {NodeKind.ADD, NodeKind.SUBTRACT, NodeKind.NEGATE}
+_MULTIPLICATIVE_KINDS = {NodeKind.MULTIPLY, NodeKind.DIVIDE}
+
+# Kind of operator whose tokens can be reused by a rebuilt node
+_TOKEN_KINDS = {
+    NodeKind.ADD: NodeKind.ADD,
+    NodeKind.SUBTRACT: NodeKind.SUBTRACT,
+    NodeKind.NEGATE: NodeKind.SUBTRACT,
+    NodeKind.MULTIPLY: NodeKind.MULTIPLY,
+    NodeKind.DIVIDE: NodeKind.DIVIDE,
+}
+
+
+@dataclass
+class BalancingResult:
+    """Balanced tree with the shape of the trees before and after."""
+    tree: ExpressionTree
+    height_before: int
+    height_after: int
+    operations_per_level_before: list[int]
+    operations_per_level_after: list[int]
+
+
+def _group(kind: int) -> set[NodeKind] | None:
+    if kind in _ADDITIVE_KINDS:
+        return _ADDITIVE_KINDS
+    if kind in _MULTIPLICATIVE_KINDS:
+        return _MULTIPLICATIVE_KINDS
+    return None
+
+
+def operations_per_level(tree: ExpressionTree) -> list[int]:
+    """Operations count at each height, starting from height 1.
+
+    Operations of a level only depend on lower levels, so the levels can
+    be evaluated one after another with each level's operations run in
+    parallel.
+    """
+    heights = tree.heights()
+    counts = [0] * (heights[tree.root] if len(tree) else 0)
+    for height in heights:
+        if height:
+            counts[height-1] += 1
+    return counts
+
+
+class _Builder:
+    """Appends nodes to a new tree, keeping their heights."""
+    def __init__(self, tree: ExpressionTree) -> None:
+        self.tree = ExpressionTree(tree.tokens)
+        self.heights: list[int] = []
+
+    def add_node(
+        self,
+        kind: NodeKind,
+        left: int = NO_NODE,
+        right: int = NO_NODE,
+        token_index: int = NO_NODE,
+    ) -> int:
+        self.heights.append(
+            0 if left == NO_NODE else 1 + max(
+                self.heights[left],
+                self.heights[right] if right != NO_NODE else 0
+            )
+        )
+        return self.tree.add_node(kind, left, right, token_index)
+
+    def combine(
+        self,
+        operands: tuple[list[int], list[int]],
+        kinds: tuple[NodeKind, NodeKind],
+        tokens: tuple[list[int], list[int]],
+    ) -> int:
+        """Join operands with an associative operator and its inverse,
+        always joining the two lowest ones, which gives the lowest
+        resulting height.
+
+        Operands come as positive and inverted ones, `kinds` are the
+        joining and the inverse operator, and `tokens` their tokens to
+        reuse. Two operands of the same sign are joined, a positive and an
+        inverted one subtracted, so given a positive operand the result is
+        positive.
+        """
+        heap = [
+            (self.heights[node], inverted, node)
+            for inverted, nodes in enumerate(operands) for node in nodes
+        ]
+        heapq.heapify(heap)
+        while len(heap) > 1:
+            left_height, left_inverted, left = heapq.heappop(heap)
+            right_height, right_inverted, right = heapq.heappop(heap)
+            if (
+                left_inverted != right_inverted and
+                left_height == right_height and
+                heap and heap[0][:2] == (right_height, right_inverted)
+            ):
+                # Any two of the lowest operands may be joined, ones of the
+                # same sign save an inverse operator
+                _, _, third = heapq.heappop(heap)
+                heapq.heappush(heap, (left_height, left_inverted, left))
+                left_inverted, left = right_inverted, right
+                right = third
+            if left_inverted == right_inverted:
+                index = 0
+            else:
+                index = 1
+                if left_inverted:
+                    left, right = right, left
+            node = self.add_node(
+                kinds[index],
+                left,
+                right,
+                tokens[index].pop() if tokens[index] else NO_NODE
+            )
+            heapq.heappush(
+                heap, (self.heights[node], left_inverted and not index, node)
+            )
+        return heap[0][2]
+
+
+def balance(tree: ExpressionTree) -> BalancingResult:
+    """Rebuild a tree with minimum height.
+
+    Maximal groups of '+', '-' and unary minus are flattened into positive
+    and negative terms, groups of '*' and '/' into numerators and
+    denominators. Terms are joined lowest first, two of the same sign
+    with '+' or '*', others with '-' or '/', so inverse operators may
+    appear at any level, giving O(log n) depth for n terms. A group of
+    only negative terms negates its lowest one first. Rebuilt operators
+    reuse tokens of the group's operators of the same kind, or have none.
+    Results are equal up to floating-point rounding.
+    """
+    parents = [NO_NODE] * len(tree)
+    for node in range(len(tree)):
+        for child in (tree.left[node], tree.right[node]):
+            if child != NO_NODE:
+                parents[child] = node
+
+    builder = _Builder(tree)
+    rebuilt = [NO_NODE] * len(tree)
+    for node, kind in enumerate(tree.kinds):
+        group = _group(kind)
+        parent = parents[node]
+        if group is not None and parent != NO_NODE and (
+            tree.kinds[parent] in group
+        ):
+            continue
+        if group is None:
+            rebuilt[node] = builder.add_node(
+                NodeKind(kind), token_index=tree.token_indices[node]
+            )
+            continue
+
+        operands: tuple[list[int], list[int]] = ([], [])
+        tokens: dict[NodeKind, list[int]] = {
+            token_kind: [] for token_kind in set(_TOKEN_KINDS.values())
+        }
+        stack = [(node, False)]
+        while stack:
+            member, inverted = stack.pop()
+            member_kind = tree.kinds[member]
+            if member_kind not in group:
+                operands[inverted].append(rebuilt[member])
+                continue
+            tokens[_TOKEN_KINDS[member_kind]].append(
+                tree.token_indices[member]
+            )
+            left, right = tree.left[member], tree.right[member]
+            if member_kind == NodeKind.NEGATE:
+                stack.append((left, not inverted))
+            else:
+                inverts_right = member_kind in (
+                    NodeKind.SUBTRACT, NodeKind.DIVIDE
+                )
+                stack.append((right, inverted != inverts_right))
+                stack.append((left, inverted))
+
+        if group is _ADDITIVE_KINDS:
+            kinds = (NodeKind.ADD, NodeKind.SUBTRACT)
+        else:
+            kinds = (NodeKind.MULTIPLY, NodeKind.DIVIDE)
+        group_tokens = (tokens[kinds[0]], tokens[kinds[1]])
+        positives, negatives = operands
+        if not positives:
+            # Only a group of unary minuses has no positive terms, the
+            # lowest one is negated as it adds the least height
+            lowest = min(negatives, key=builder.heights.__getitem__)
+            negatives.remove(lowest)
+            positives.append(builder.add_node(
+                NodeKind.NEGATE,
+                lowest,
+                token_index=(
+                    group_tokens[1].pop() if group_tokens[1] else NO_NODE
+                )
+            ))
+        rebuilt[node] = builder.combine(operands, kinds, group_tokens)
+
+    return BalancingResult(
+        tree=builder.tree,
+        height_before=tree.heights()[tree.root],
+        height_after=builder.heights[-1],
+        operations_per_level_before=operations_per_level(tree),
+        operations_per_level_after=operations_per_level(builder.tree),
+    )
+
+
+def _evaluate(
+    tree: ExpressionTree, bindings: dict[str, float]
+) -> float | None:
+    try:
+        return interpret(tree, bindings)
+    except DivisionByZeroError:
+        return None
+
+
+def check_equivalence(
+    original: ExpressionTree,
+    transformed: ExpressionTree,
+    trials: int = 100,
+    seed: int = 0,
+    rel_tol: float = 1e-9,
+    abs_tol: float = 1e-9,
+) -> bool:
+    """Whether two trees evaluate to close values on random inputs.
+
+    Division by zero counts as a value of its own.
+    """
+    rng = random.Random(seed)
+    names = identifier_names(original)
+    for _ in range(trials):
+        bindings = {
+            name: rng.choice((-1, 1)) * rng.uniform(0.5, 2)
+            for name in names
+        }
+        expected = _evaluate(original, bindings)
+        actual = _evaluate(transformed, bindings)
+        if expected is None or actual is None:
+            if expected is not actual:
+                return False
+        elif math.isnan(expected) or math.isnan(actual):
+            if not (math.isnan(expected) and math.isnan(actual)):
+                return False
+        elif not math.isclose(
+            expected, actual, rel_tol=rel_tol, abs_tol=abs_tol
+        ):
+            return False
+    return True
@@ -0,0 +1,164 @@
+import json
+import os
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import TextIO
+
+from analyzer import SyntaxAnalysisError
+from cache import ValidationCache
+from serialization import DiskCache
+from tokenizer import UnsupportedLexemeError
+from utils import format_tokens
+from validation import validate_expression
+
+DEFAULT_CHUNK_SIZE = 1000
+
+Chunk = list[tuple[int, str]]
+
+
+@dataclass
+class BatchSummary:
+    """Outcome of a batch validation."""
+    expressions_count: int
+    invalid_expressions_count: int
+    elapsed_seconds: float
+
+    @property
+    def throughput(self) -> float:
+        """Validated expressions per second."""
+        if not self.elapsed_seconds:
+            return float(self.expressions_count)
+        return self.expressions_count / self.elapsed_seconds
+
+
+def validation_result(
+    expression: str,
+    cache: ValidationCache | DiskCache | None = None,
+    with_tokens: bool = False,
+) -> dict:
+    """Validate an expression into a JSON-serializable result, optionally
+    with its tokens formatted as `main.py` prints them."""
+    if cache is None:
+        result = validate_expression(expression)
+    else:
+        result = cache.validate(expression)
+    record = {"valid": result.is_valid}
+    if with_tokens:
+        record["tokens"] = format_tokens(result.tokens)
+    record["errors"] = [_error_record(error) for error in result.errors]
+    return record
+
+
+def validation_record(
+    line_number: int,
+    expression: str,
+    cache: ValidationCache | DiskCache | None = None,
+) -> dict:
+    """Validate an expression read from given line of a batch."""
+    return {"line": line_number, **validation_result(expression, cache)}
+
+
+def _error_record(error: UnsupportedLexemeError | SyntaxAnalysisError) -> dict:
+    position = error.position
+    return {
+        "message": str(error),
+        "start": position.start if position else None,
+        "stop": position.stop if position else None,
+    }
+
+
+# Cache of the current process, see `_set_process_cache`
+_process_cache: ValidationCache | DiskCache | None = None
+
+
+def _set_process_cache(cache: ValidationCache | DiskCache | None) -> None:
+    global _process_cache
+    _process_cache = cache
+
+
+def _validate_chunk(chunk: Chunk) -> tuple[str, int]:
+    lines = []
+    invalid_count = 0
+    for line_number, expression in chunk:
+        record = validation_record(line_number, expression, _process_cache)
+        invalid_count += not record["valid"]
+        lines.append(json.dumps(record))
+    lines.append("")
+    return "\n".join(lines), invalid_count
+
+
+def _iter_chunks(lines: Iterable[str], chunk_size: int) -> Iterator[Chunk]:
+    numbered = (
+        (line_number, line.rstrip("\r\n"))
+        for line_number, line in enumerate(lines, 1)
+    )
+    while chunk := list(islice(numbered, chunk_size)):
+        yield chunk
+
+
+def validate_batch(
+    lines: Iterable[str],
+    output: TextIO,
+    workers: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    cache: ValidationCache | DiskCache | None = None,
+) -> BatchSummary:
+    """Validate expressions given one per line, writing NDJSON records in
+    input order.
+
+    Chunks of `chunk_size` lines are validated on a pool of `workers`
+    processes, at most two chunks per worker are in flight at once. Each
+    worker process gets an empty cache with the limits of `cache`, a disk
+    cache is shared by all of them.
+    """
+    if workers is not None and workers < 1:
+        raise ValueError(f"Number of workers must be positive: {workers}")
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be positive: {chunk_size}")
+    workers = workers or os.cpu_count() or 1
+    started_at = time.perf_counter()
+    expressions_count = 0
+    invalid_count = 0
+
+    def write(result: tuple[str, int], chunk_length: int) -> None:
+        nonlocal expressions_count, invalid_count
+        text, chunk_invalid_count = result
+        output.write(text)
+        expressions_count += chunk_length
+        invalid_count += chunk_invalid_count
+
+    chunks = _iter_chunks(lines, chunk_size)
+    if workers == 1:
+        _set_process_cache(cache)
+        try:
+            for chunk in chunks:
+                write(_validate_chunk(chunk), len(chunk))
+        finally:
+            _set_process_cache(None)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_set_process_cache,
+            initargs=(cache,)
+        ) as executor:
+            pending: deque[tuple[Future, int]] = deque()
+            for chunk in chunks:
+                if len(pending) >= 2 * workers:
+                    future, chunk_length = pending.popleft()
+                    write(future.result(), chunk_length)
+                pending.append(
+                    (executor.submit(_validate_chunk, chunk), len(chunk))
+                )
+            while pending:
+                future, chunk_length = pending.popleft()
+                write(future.result(), chunk_length)
+
+    return BatchSummary(
+        expressions_count=expressions_count,
+        invalid_expressions_count=invalid_count,
+        elapsed_seconds=time.perf_counter() - started_at,
+    )
@@ -0,0 +1,324 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+
+import main
+from analyzer import SyntaxAnalyzer
+from tokenizer import tokenize
+from utils import format_tokens
+
+SHAPES = ("short", "long_sum", "deep_nesting", "identifiers", "numbers")
+ERROR_DENSITIES = (0.0, 0.01, 0.1, 0.5)
+PHASES = ("tokenize", "analyze", "format_tokens", "main")
+
+DEFAULT_SIZE = 10_000
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.1
+
+OPERATORS = "+-*/"
+# Replacements injected into valid expressions: unsupported characters,
+# misplaced operators and parentheses, and a malformed number
+CORRUPTIONS = ("$", "#", "+", "*", "(", ")", "1.")
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    source_code: str
+
+
+@dataclass
+class BenchmarkResult:
+    case: str
+    phase: str
+    seconds: float
+    tokens_per_second: float
+    bytes_per_second: float
+    peak_memory_bytes: int
+
+
+@dataclass
+class SavedResults:
+    """Results saved by `save_results`, with the cases they were run on."""
+    results: list[BenchmarkResult]
+    seed: int
+    size: int
+
+
+@dataclass
+class Regression:
+    case: str
+    phase: str
+    baseline_seconds: float
+    seconds: float
+
+    @property
+    def ratio(self) -> float:
+        return self.seconds / self.baseline_seconds
+
+
+def _identifier(rng: random.Random) -> str:
+    return rng.choice("abcdefghxyz") + str(rng.randrange(100))
+
+
+def _number(rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return str(rng.randrange(1000))
+    return f"{rng.randrange(1000)}.{rng.randrange(1000)}"
+
+
+def _operand(rng: random.Random, identifier_share: float) -> str:
+    if rng.random() < identifier_share:
+        return _identifier(rng)
+    return _number(rng)
+
+
+def _lexemes(rng: random.Random, shape: str, size: int) -> list[str]:
+    """Lexemes of a valid expression of about `size` operands."""
+    match shape:
+        case "short":
+            lexemes = []
+            for index in range(size):
+                if index % 8 == 0:
+                    if lexemes:
+                        lexemes.append("+")
+                    lexemes += ["(", _operand(rng, 0.7)]
+                else:
+                    lexemes += [rng.choice(OPERATORS), _operand(rng, 0.7)]
+                if index % 8 == 7:
+                    lexemes.append(")")
+            if size % 8:
+                lexemes.append(")")
+            return lexemes
+        case "long_sum":
+            lexemes = [_operand(rng, 0.5)]
+            for _ in range(size - 1):
+                lexemes += ["+", _operand(rng, 0.5)]
+            return lexemes
+        case "deep_nesting":
+            lexemes = ["("] * (size - 1) + [_operand(rng, 0.5)]
+            for _ in range(size - 1):
+                lexemes += [rng.choice(OPERATORS), _operand(rng, 0.5), ")"]
+            return lexemes
+        case "identifiers" | "numbers":
+            identifier_share = 0.95 if shape == "identifiers" else 0.05
+            lexemes = [_operand(rng, identifier_share)]
+            for _ in range(size - 1):
+                lexemes += [
+                    rng.choice(OPERATORS), _operand(rng, identifier_share)
+                ]
+            return lexemes
+    raise ValueError(f"Unknown expression shape: '{shape}'")
+
+
+def generate_expression(
+    rng: random.Random, shape: str, size: int, error_density: float = 0.0
+) -> str:
+    """Expression of a shape, with about `error_density` of its lexemes
+    replaced by ones causing tokenization or syntax errors."""
+    lexemes = _lexemes(rng, shape, size)
+    for index in range(len(lexemes)):
+        if rng.random() < error_density:
+            lexemes[index] = rng.choice(CORRUPTIONS)
+    return " ".join(lexemes) if shape == "short" else "".join(lexemes)
+
+
+def generate_cases(
+    seed: int = 0, size: int = DEFAULT_SIZE
+) -> list[BenchmarkCase]:
+    rng = random.Random(seed)
+    return [
+        BenchmarkCase(
+            f"{shape}/errors={error_density:.0%}",
+            generate_expression(rng, shape, size, error_density)
+        )
+        for shape in SHAPES
+        for error_density in ERROR_DENSITIES
+    ]
+
+
+def _run_main(source_code: str) -> None:
+    # Invalid expressions list their tokens to stderr
+    output = io.StringIO()
+    with (
+        contextlib.redirect_stdout(output),
+        contextlib.redirect_stderr(output),
+    ):
+        try:
+            main.main(["--", source_code])
+        except ExceptionGroup:
+            pass
+
+
+def _measure(
+    function: Callable[[], object], repeat: int
+) -> tuple[float, int]:
+    """Best wall time of `repeat` runs and peak traced memory of one more."""
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds = min(seconds, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak_memory_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak_memory_bytes
+
+
+def run_benchmarks(
+    cases: list[BenchmarkCase], repeat: int = DEFAULT_REPEAT
+) -> list[BenchmarkResult]:
+    results = []
+    for case in cases:
+        tokens, _ = tokenize(case.source_code)
+        phases = {
+            "tokenize": lambda: tokenize(case.source_code),
+            "analyze": lambda: SyntaxAnalyzer(tokens).analyze(),
+            "format_tokens": lambda: format_tokens(tokens),
+            "main": lambda: _run_main(case.source_code),
+        }
+        for phase in PHASES:
+            seconds, peak_memory_bytes = _measure(phases[phase], repeat)
+            seconds = max(seconds, sys.float_info.min)
+            results.append(BenchmarkResult(
+                case=case.name,
+                phase=phase,
+                seconds=seconds,
+                tokens_per_second=len(tokens) / seconds,
+                bytes_per_second=len(case.source_code.encode()) / seconds,
+                peak_memory_bytes=peak_memory_bytes,
+            ))
+    return results
+
+
+def compare(
+    results: list[BenchmarkResult],
+    baseline: list[BenchmarkResult],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[Regression]:
+    """Results slower than their baseline by more than `threshold`."""
+    baseline_seconds = {
+        (result.case, result.phase): result.seconds for result in baseline
+    }
+    regressions = []
+    for result in results:
+        seconds = baseline_seconds.get((result.case, result.phase))
+        if seconds is not None and result.seconds > seconds * (1 + threshold):
+            regressions.append(Regression(
+                result.case, result.phase, seconds, result.seconds
+            ))
+    return regressions
+
+
+def save_results(
+    results: list[BenchmarkResult], path: str, seed: int, size: int
+) -> None:
+    with open(path, "w") as file:
+        json.dump(
+            {
+                "seed": seed,
+                "size": size,
+                "python": platform.python_version(),
+                "results": [asdict(result) for result in results],
+            },
+            file,
+            indent=2
+        )
+
+
+def load_results(path: str) -> SavedResults:
+    with open(path) as file:
+        saved = json.load(file)
+    return SavedResults(
+        [BenchmarkResult(**result) for result in saved["results"]],
+        saved["seed"],
+        saved["size"],
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark tokenizing and analyzing expressions."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=DEFAULT_SIZE,
+        help="number of operands in each generated expression"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="number of timed runs, the best one is kept"
+    )
+    parser.add_argument(
+        "--output", metavar="FILE", help="save results as JSON to FILE"
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="FILE",
+        help="compare results with ones saved to FILE"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="slowdown relative to the baseline reported as a regression"
+    )
+    return parser.parse_args(argv)
+
+
+def run(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    baseline = None
+    if args.baseline is not None:
+        baseline = load_results(args.baseline)
+        # Timings of other cases aren't comparable
+        if (baseline.seed, baseline.size) != (args.seed, args.size):
+            print(
+                f"Baseline was run with seed {baseline.seed} and size "
+                f"{baseline.size}, not seed {args.seed} and size "
+                f"{args.size}",
+                file=sys.stderr
+            )
+            return 2
+    results = run_benchmarks(generate_cases(args.seed, args.size), args.repeat)
+    for result in results:
+        print(
+            f"{result.case:<28} {result.phase:<14} "
+            f"{result.seconds * 1000:10.2f} ms "
+            f"{result.tokens_per_second:14.0f} tokens/s "
+            f"{result.bytes_per_second / 1e6:8.2f} MB/s "
+            f"{result.peak_memory_bytes / 1e6:8.2f} MB peak"
+        )
+    if args.output is not None:
+        save_results(results, args.output, args.seed, args.size)
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline.results, args.threshold)
+    for regression in regressions:
+        print(
+            f"Regression in {regression.case} {regression.phase}: "
+            f"{regression.baseline_seconds * 1000:.2f} ms -> "
+            f"{regression.seconds * 1000:.2f} ms "
+            f"({regression.ratio:.2f}x)",
+            file=sys.stderr
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,253 @@
+import re
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Callable
+
+from analyzer import SyntaxAnalysisError, make_syntax_analysis_error
+from serialization import DiskCache
+from tokenizer import (
+    WHITESPACE,
+    WORD_CHARACTER,
+    Position,
+    Token,
+    TokenStream,
+    UnsupportedLexemeError,
+)
+from validation import ValidationResult, validate_expression
+
+_WHITESPACE_RUN = re.compile(rf"{WHITESPACE}+")
+
+
+class WhitespaceMap:
+    """Maps offsets in a whitespace-normalized source back to the original.
+
+    Kept characters form segments, each stored as its start offset in both
+    the normalized and the original source.
+    """
+    def __init__(self) -> None:
+        self.normalized_starts: list[int] = []
+        self.original_starts: list[int] = []
+
+    def add_segment(self, normalized_start: int, original_start: int) -> None:
+        self.normalized_starts.append(normalized_start)
+        self.original_starts.append(original_start)
+
+    def locate(self, offset: int) -> int:
+        segment = bisect_right(self.normalized_starts, offset) - 1
+        return (
+            self.original_starts[segment] +
+            offset - self.normalized_starts[segment]
+        )
+
+
+def normalize_whitespace(source_code: str) -> tuple[str, WhitespaceMap]:
+    """Drop whitespace that doesn't separate lexemes.
+
+    A whitespace run between two characters that could belong to the same
+    identifier or number is kept as a single space, so the normalized
+    source is tokenized into the same lexemes.
+    """
+    pieces = []
+    offsets = WhitespaceMap()
+    normalized_length = 0
+    kept_from = 0
+    for match in _WHITESPACE_RUN.finditer(source_code):
+        start, stop = match.span()
+        if start > kept_from:
+            offsets.add_segment(normalized_length, kept_from)
+            pieces.append(source_code[kept_from:start])
+            normalized_length += start - kept_from
+        if (
+            0 < start and stop < len(source_code) and
+            WORD_CHARACTER.match(source_code[start-1]) and
+            WORD_CHARACTER.match(source_code[stop])
+        ):
+            offsets.add_segment(normalized_length, start)
+            pieces.append(" ")
+            normalized_length += 1
+        kept_from = stop
+    if kept_from < len(source_code):
+        offsets.add_segment(normalized_length, kept_from)
+        pieces.append(source_code[kept_from:])
+    return "".join(pieces), offsets
+
+
+def relocate_token(token: Token, locate: Callable[[int], int]) -> Token:
+    return Token(
+        type=token.type,
+        lexeme=token.lexeme,
+        position=Position(
+            locate(token.position.start), locate(token.position.stop)
+        )
+    )
+
+
+def relocate_result(
+    result: ValidationResult,
+    source_code: str,
+    locate: Callable[[int], int]
+) -> ValidationResult:
+    """Move positions of a result by `locate` over another source code."""
+    tokens = result.tokens
+    relocated_tokens = TokenStream(
+        source_code,
+        tokens.types,
+        array("I", map(locate, tokens.starts)),
+        array("I", map(locate, tokens.stops)),
+    )
+    tokenization_errors = tuple(
+        UnsupportedLexemeError(
+            error.lexeme,
+            locate(error.position.start),
+            None if error.last_visited_position is None
+            else locate(error.last_visited_position - 1) + 1
+        )
+        for error in result.tokenization_errors
+    )
+    syntax_analysis_errors = tuple(
+        make_syntax_analysis_error(
+            error.kind,
+            *(relocate_token(token, locate) for token in error.tokens)
+        )
+        for error in result.syntax_analysis_errors
+    )
+    return ValidationResult(
+        _frozen_tokens(relocated_tokens),
+        tokenization_errors,
+        syntax_analysis_errors
+    )
+
+
+def _frozen_tokens(tokens: TokenStream) -> TokenStream:
+    return TokenStream(
+        tokens.source_code,
+        memoryview(tokens.types).toreadonly(),
+        memoryview(tokens.starts).toreadonly(),
+        memoryview(tokens.stops).toreadonly(),
+    )
+
+
+class ValidationCache:
+    """Bounded LRU cache of validation results keyed by expression.
+
+    The cache is limited by entries count and by total UTF-8 size of the
+    cached expressions, either limit is optional. Cached token streams are
+    read-only. With `normalize_whitespace`, expressions differing only in
+    whitespace between lexemes share an entry, positions are still
+    reported over each given expression. Misses are looked up in
+    `disk_cache` before validating.
+
+    Pickles into an empty cache with the same limits and disk cache.
+    """
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        normalize_whitespace: bool = False,
+        disk_cache: DiskCache | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.normalize_whitespace = normalize_whitespace
+        self.disk_cache = disk_cache
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        self._entries: OrderedDict[str, tuple[ValidationResult, int]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        return (
+            type(self),
+            (
+                self.max_entries,
+                self.max_bytes,
+                self.normalize_whitespace,
+                self.disk_cache,
+            )
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def validate(self, expression: str) -> ValidationResult:
+        key, offsets = expression, None
+        if self.normalize_whitespace:
+            key, offsets = normalize_whitespace(expression)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is None:
+            if self.disk_cache is None:
+                result = validate_expression(key)
+            else:
+                result = self.disk_cache.validate(key)
+            result = _frozen_result(result)
+            self._store(key, result)
+        else:
+            result = entry[0]
+
+        if offsets is not None and key != expression:
+            result = relocate_result(result, expression, offsets.locate)
+        return result
+
+    def tokenize(
+        self, expression: str
+    ) -> tuple[TokenStream, tuple[UnsupportedLexemeError, ...]]:
+        result = self.validate(expression)
+        return result.tokens, result.tokenization_errors
+
+    def analyze(self, expression: str) -> tuple[SyntaxAnalysisError, ...]:
+        return self.validate(expression).syntax_analysis_errors
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _store(self, key: str, result: ValidationResult) -> None:
+        size = len(key.encode())
+        with self._lock:
+            self.misses += 1
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self._entries[key] = (result, size)
+            self.total_bytes += size
+            while (
+                (
+                    self.max_entries is not None and
+                    len(self._entries) > self.max_entries
+                ) or (
+                    self.max_bytes is not None and
+                    self.total_bytes > self.max_bytes
+                )
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+
+def _frozen_result(result: ValidationResult) -> ValidationResult:
+    return ValidationResult(
+        _frozen_tokens(result.tokens),
+        result.tokenization_errors,
+        result.syntax_analysis_errors
+    )
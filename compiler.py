@@ -0,0 +1,202 @@
+import math
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+
+from parser import (
+    ExpressionTree,
+    NodeKind,
+    parse,
+    parse_expression,
+)
+from tokenizer import DECIMAL_NUMBER_SEPARATOR, Position, Token
+
+# Python's own parser limits how deep parentheses may nest, deeper trees
+# are interpreted instead
+MAX_COMPILED_HEIGHT = 100
+
+DEFAULT_CACHE_ENTRIES = 1024
+
+_OPERATOR_SYMBOLS = {
+    NodeKind.ADD: "+",
+    NodeKind.SUBTRACT: "-",
+    NodeKind.MULTIPLY: "*",
+    NodeKind.DIVIDE: "/",
+}
+
+
+class DivisionByZeroError(ZeroDivisionError):
+    """Division by zero while evaluating an expression."""
+    def __init__(self, position: Position) -> None:
+        self.position = position
+        super().__init__(f"{position}: division by zero")
+
+
+def number_value(lexeme: str) -> int | float:
+    """Value of a number lexeme, integers are kept exact unless they have
+    more digits than `int` converts, which are approximated."""
+    max_digits = sys.get_int_max_str_digits()
+    if DECIMAL_NUMBER_SEPARATOR in lexeme or (
+        max_digits and len(lexeme) > max_digits
+    ):
+        return float(lexeme)
+    return int(lexeme)
+
+
+def identifier_names(tree: ExpressionTree) -> tuple[str, ...]:
+    """Names of identifiers in order of their first appearance."""
+    names = dict.fromkeys(
+        tree.lexeme(node)
+        for node in range(len(tree))
+        if tree.kinds[node] == NodeKind.IDENTIFIER
+    )
+    return tuple(names)
+
+
+def interpret(tree: ExpressionTree, bindings: Mapping[str, float]) -> float:
+    """Evaluate a tree node by node, in index order."""
+    values: list[float] = []
+    for node, kind in enumerate(tree.kinds):
+        match kind:
+            case NodeKind.IDENTIFIER:
+                value = bindings[tree.lexeme(node)]
+            case NodeKind.NUMBER:
+                value = number_value(tree.lexeme(node))
+            case NodeKind.NEGATE:
+                value = -values[tree.left[node]]
+            case NodeKind.ADD:
+                value = values[tree.left[node]] + values[tree.right[node]]
+            case NodeKind.SUBTRACT:
+                value = values[tree.left[node]] - values[tree.right[node]]
+            case NodeKind.MULTIPLY:
+                value = values[tree.left[node]] * values[tree.right[node]]
+            case NodeKind.DIVIDE:
+                try:
+                    value = values[tree.left[node]] / values[tree.right[node]]
+                except ZeroDivisionError:
+                    raise DivisionByZeroError(tree.position(node)) from None
+        values.append(value)
+    return values[tree.root]
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    """Expression compiled into a function of its identifiers.
+
+    Arguments are the identifier values in `identifiers` order. Division
+    by zero is located by evaluating the tree again, so it costs nothing
+    until it happens.
+    """
+    tree: ExpressionTree
+    identifiers: tuple[str, ...]
+    function: Callable[..., float]
+
+    def __call__(self, *arguments: float) -> float:
+        try:
+            return self.function(*arguments)
+        except DivisionByZeroError:
+            raise
+        except ZeroDivisionError:
+            pass
+        return interpret(self.tree, dict(zip(self.identifiers, arguments)))
+
+    def evaluate(self, bindings: Mapping[str, float]) -> float:
+        return self(*(bindings[name] for name in self.identifiers))
+
+
+def _python_source(tree: ExpressionTree, identifiers: Sequence[str]) -> str:
+    arguments = {name: f"_v{index}" for index, name in enumerate(identifiers)}
+    sources: list[str] = []
+    for node, kind in enumerate(tree.kinds):
+        if kind == NodeKind.IDENTIFIER:
+            source = arguments[tree.lexeme(node)]
+        elif kind == NodeKind.NUMBER:
+            value = number_value(tree.lexeme(node))
+            # repr of an infinite float isn't a literal
+            source = "1e999" if math.isinf(value) else repr(value)
+        elif kind == NodeKind.NEGATE:
+            source = f"(-{sources[tree.left[node]]})"
+        else:
+            source = (
+                f"({sources[tree.left[node]]}"
+                f"{_OPERATOR_SYMBOLS[NodeKind(kind)]}"
+                f"{sources[tree.right[node]]})"
+            )
+        sources.append(source)
+    return f"lambda {', '.join(arguments.values())}: {sources[tree.root]}"
+
+
+def _compile_function(
+    tree: ExpressionTree, identifiers: tuple[str, ...]
+) -> Callable[..., float] | None:
+    if tree.heights()[tree.root] > MAX_COMPILED_HEIGHT:
+        return None
+    try:
+        code = compile(
+            _python_source(tree, identifiers), "<expression>", "eval"
+        )
+    except (SyntaxError, RecursionError, MemoryError):
+        return None
+    return eval(code, {"__builtins__": {}})
+
+
+def compile_tree(tree: ExpressionTree) -> CompiledExpression:
+    identifiers = identifier_names(tree)
+    function = _compile_function(tree, identifiers)
+    if function is None:
+        def function(*arguments: float) -> float:
+            return interpret(tree, dict(zip(identifiers, arguments)))
+    return CompiledExpression(tree, identifiers, function)
+
+
+def compile_tokens(tokens: Sequence[Token]) -> CompiledExpression:
+    """Compile tokens that passed `analyze`."""
+    return compile_tree(parse(tokens))
+
+
+def compile_expression(expression: str) -> CompiledExpression:
+    """Validate and compile an expression."""
+    return compile_tree(parse_expression(expression))
+
+
+class CompiledExpressionCache:
+    """Bounded LRU cache of compiled expressions keyed by expression."""
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, CompiledExpression] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def compile(self, expression: str) -> CompiledExpression:
+        with self._lock:
+            compiled = self._entries.get(expression)
+            if compiled is not None:
+                self._entries.move_to_end(expression)
+                self.hits += 1
+                return compiled
+        compiled = compile_expression(expression)
+        with self._lock:
+            self.misses += 1
+            self._entries[expression] = compiled
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return compiled
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,157 @@
+from array import array
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+
+from compiler import DivisionByZeroError, number_value
+from parser import NO_NODE, ExpressionTree, NodeKind, parse_expression
+from tokenizer import Position
+
+_COMMUTATIVE_KINDS = {NodeKind.ADD, NodeKind.MULTIPLY}
+
+
+@dataclass
+class DagStats:
+    """Sizes of the interned trees and of the DAG they share."""
+    trees_count: int
+    tree_nodes_count: int
+    dag_nodes_count: int
+    reused_nodes_count: int
+
+    @property
+    def reduction(self) -> float:
+        """Fraction of tree nodes that didn't need a DAG node."""
+        if not self.tree_nodes_count:
+            return 0.0
+        return 1 - self.dag_nodes_count / self.tree_nodes_count
+
+
+@dataclass
+class ExpressionDag:
+    """Expressions with structurally equal subtrees stored once.
+
+    Nodes are stored in flat arrays like `ExpressionTree` nodes, children
+    before parents, so node order is an evaluation schedule. Leaves keep
+    their lexeme, operators the position of the first token they were
+    built from. With `commutative`, operands of '+' and '*' are ordered,
+    so `a+b` and `b+a` share a node.
+    """
+    commutative: bool = False
+    kinds: array = field(default_factory=lambda: array("B"))
+    left: array = field(default_factory=lambda: array("i"))
+    right: array = field(default_factory=lambda: array("i"))
+    reuse_counts: array = field(default_factory=lambda: array("I"))
+    lexemes: list[str | None] = field(default_factory=list)
+    positions: list[Position | None] = field(default_factory=list)
+    roots: list[int] = field(default_factory=list)
+    tree_nodes_count: int = 0
+    _nodes: dict[tuple, int] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def add_tree(self, tree: ExpressionTree) -> int:
+        """Intern nodes of a tree, its root is added to `roots`."""
+        interned = array("i", bytes(4 * len(tree)))
+        for node, kind in enumerate(tree.kinds):
+            left = tree.left[node]
+            right = tree.right[node]
+            if kind == NodeKind.IDENTIFIER:
+                key = (kind, tree.lexeme(node))
+            elif kind == NodeKind.NUMBER:
+                value = number_value(tree.lexeme(node))
+                key = (kind, type(value), value)
+            else:
+                left = interned[left]
+                right = interned[right] if right != NO_NODE else NO_NODE
+                if self.commutative and kind in _COMMUTATIVE_KINDS:
+                    left, right = min(left, right), max(left, right)
+                key = (kind, left, right)
+            interned[node] = self._intern(key, tree, node, left, right)
+        self.tree_nodes_count += len(tree)
+        root = interned[tree.root]
+        self.roots.append(root)
+        return root
+
+    def _intern(
+        self, key: tuple, tree: ExpressionTree, node: int, left: int,
+        right: int
+    ) -> int:
+        dag_node = self._nodes.get(key)
+        if dag_node is not None:
+            self.reuse_counts[dag_node] += 1
+            return dag_node
+        kind = tree.kinds[node]
+        self.kinds.append(kind)
+        self.reuse_counts.append(0)
+        if kind == NodeKind.IDENTIFIER or kind == NodeKind.NUMBER:
+            self.left.append(NO_NODE)
+            self.right.append(NO_NODE)
+            self.lexemes.append(tree.lexeme(node))
+        else:
+            self.left.append(left)
+            self.right.append(right)
+            self.lexemes.append(None)
+        self.positions.append(tree.position(node))
+        dag_node = len(self.kinds) - 1
+        self._nodes[key] = dag_node
+        return dag_node
+
+    def schedule(self) -> list[int]:
+        """Operator nodes in an order where operands come first."""
+        return [
+            node for node, kind in enumerate(self.kinds)
+            if kind != NodeKind.IDENTIFIER and kind != NodeKind.NUMBER
+        ]
+
+    def evaluate(self, bindings: Mapping[str, float]) -> list[float]:
+        """Values of all roots, computing every shared node once."""
+        values: list[float] = []
+        left, right, lexemes = self.left, self.right, self.lexemes
+        for node, kind in enumerate(self.kinds):
+            match kind:
+                case NodeKind.IDENTIFIER:
+                    value = bindings[lexemes[node]]
+                case NodeKind.NUMBER:
+                    value = number_value(lexemes[node])
+                case NodeKind.NEGATE:
+                    value = -values[left[node]]
+                case NodeKind.ADD:
+                    value = values[left[node]] + values[right[node]]
+                case NodeKind.SUBTRACT:
+                    value = values[left[node]] - values[right[node]]
+                case NodeKind.MULTIPLY:
+                    value = values[left[node]] * values[right[node]]
+                case NodeKind.DIVIDE:
+                    try:
+                        value = values[left[node]] / values[right[node]]
+                    except ZeroDivisionError:
+                        raise DivisionByZeroError(
+                            self.positions[node]
+                        ) from None
+            values.append(value)
+        return [values[root] for root in self.roots]
+
+    def stats(self) -> DagStats:
+        return DagStats(
+            trees_count=len(self.roots),
+            tree_nodes_count=self.tree_nodes_count,
+            dag_nodes_count=len(self.kinds),
+            reused_nodes_count=sum(count > 0 for count in self.reuse_counts),
+        )
+
+
+def build_dag(
+    trees: Iterable[ExpressionTree], commutative: bool = False
+) -> ExpressionDag:
+    """Intern a batch of trees into a single DAG."""
+    dag = ExpressionDag(commutative)
+    for tree in trees:
+        dag.add_tree(tree)
+    return dag
+
+
+def build_expressions_dag(
+    expressions: Iterable[str], commutative: bool = False
+) -> ExpressionDag:
+    """Validate, parse and intern a batch of expressions."""
+    return build_dag(map(parse_expression, expressions), commutative)
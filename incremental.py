@@ -0,0 +1,180 @@
+from bisect import bisect_right
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from analyzer import SyntaxAnalysisError, SyntaxAnalyzer
+from parallel import ChunkScan, combine_scans, scan_chunk, split_source_code
+from tokenizer import (
+    TOKEN_TYPES,
+    WORD_CHARACTER,
+    Position,
+    Token,
+    UnsupportedLexemeError,
+)
+
+DEFAULT_BLOCK_SIZE = 4096
+
+
+@dataclass
+class _Block:
+    """Piece of the source code lexed on its own, with positions relative
+    to its start."""
+    text: str
+    chunk_scan: ChunkScan
+
+
+def _make_block(text: str) -> _Block:
+    return _Block(text, scan_chunk(text, 0))
+
+
+def _joins(left: str, right: str) -> bool:
+    """Whether a lexeme could span the boundary between two texts."""
+    return bool(
+        left and right and
+        WORD_CHARACTER.match(left[-1]) and WORD_CHARACTER.match(right[0])
+    )
+
+
+class SessionTokens(Sequence[Token]):
+    """Tokens of a session, built on demand from its blocks."""
+    def __init__(self, session: "ValidationSession") -> None:
+        self._session = session
+
+    def __len__(self) -> int:
+        return self._session._tokens_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("token index out of range")
+        session = self._session
+        block_index = bisect_right(session._token_bases, index) - 1
+        block = session._blocks[block_index]
+        local_index = index - session._token_bases[block_index]
+        block_start = session._block_starts[block_index]
+        start = block.chunk_scan.starts[local_index]
+        stop = block.chunk_scan.stops[local_index]
+        return Token(
+            type=TOKEN_TYPES[block.chunk_scan.types[local_index]],
+            lexeme=block.text[start:stop+1],
+            position=Position(block_start + start, block_start + stop)
+        )
+
+
+class ValidationSession:
+    """Keeps an expression validated while it is being edited.
+
+    The source code is held in blocks of about `block_size` characters,
+    each tokenized and scanned on its own. An edit re-lexes only the
+    blocks it touches, merged with neighbours when a lexeme could span
+    their boundary, and shifts later blocks as a whole. Follow checks at
+    block seams and parentheses matching are recombined from per-block
+    scans, and errors are rebuilt only when asked for. Results are the
+    same as validating the whole source code again.
+    """
+    def __init__(
+        self, source_code: str = "", block_size: int = DEFAULT_BLOCK_SIZE
+    ) -> None:
+        self.block_size = block_size
+        self._blocks = self._make_blocks(source_code)
+        self._update_offsets()
+
+    @property
+    def source_code(self) -> str:
+        return "".join(block.text for block in self._blocks)
+
+    @property
+    def tokens(self) -> SessionTokens:
+        return SessionTokens(self)
+
+    @property
+    def tokenization_errors(self) -> list[UnsupportedLexemeError]:
+        return [
+            UnsupportedLexemeError(
+                lexeme,
+                block_start + position,
+                None if last_visited_position is None
+                else block_start + last_visited_position
+            )
+            for block, block_start in zip(self._blocks, self._block_starts)
+            for lexeme, position, last_visited_position
+            in block.chunk_scan.lexeme_errors
+        ]
+
+    @property
+    def syntax_analysis_errors(self) -> list[SyntaxAnalysisError]:
+        if self._syntax_analysis_errors is None:
+            self._syntax_analysis_errors = SyntaxAnalyzer(self.tokens).report(
+                combine_scans([block.chunk_scan for block in self._blocks])
+            )
+        return self._syntax_analysis_errors
+
+    @property
+    def errors(self) -> list[UnsupportedLexemeError | SyntaxAnalysisError]:
+        return [*self.tokenization_errors, *self.syntax_analysis_errors]
+
+    def edit(
+        self, offset: int, deleted_length: int, inserted_text: str
+    ) -> None:
+        """Replace `deleted_length` characters at `offset` with a text."""
+        if not 0 <= offset <= offset + deleted_length <= self._length:
+            raise ValueError(
+                f"Can't delete {deleted_length} characters at {offset} "
+                f"from a source code of {self._length} characters"
+            )
+        blocks = self._blocks
+        if not blocks:
+            self._blocks = self._make_blocks(inserted_text)
+            self._update_offsets()
+            return
+
+        first = self._block_index(offset)
+        last = self._block_index(offset + deleted_length)
+        text = "".join(block.text for block in blocks[first:last+1])
+        local_offset = offset - self._block_starts[first]
+        text = (
+            text[:local_offset] +
+            inserted_text +
+            text[local_offset+deleted_length:]
+        )
+        while first > 0 and _joins(blocks[first-1].text, text):
+            first -= 1
+            text = blocks[first].text + text
+        while last + 1 < len(blocks) and (
+            _joins(text, blocks[last+1].text) or
+            len(text) < self.block_size // 2
+        ):
+            last += 1
+            text += blocks[last].text
+        blocks[first:last+1] = self._make_blocks(text)
+        self._update_offsets()
+
+    def _make_blocks(self, text: str) -> list[_Block]:
+        if not text:
+            return []
+        if len(text) <= 2 * self.block_size:
+            return [_make_block(text)]
+        offsets = split_source_code(text, len(text) // self.block_size)
+        return [
+            _make_block(text[start:stop])
+            for start, stop in zip(offsets, [*offsets[1:], len(text)])
+        ]
+
+    def _update_offsets(self) -> None:
+        self._block_starts = []
+        self._token_bases = []
+        length = tokens_count = 0
+        for block in self._blocks:
+            self._block_starts.append(length)
+            self._token_bases.append(tokens_count)
+            length += len(block.text)
+            tokens_count += len(block.chunk_scan.types)
+        self._length = length
+        self._tokens_count = tokens_count
+        self._syntax_analysis_errors: list[SyntaxAnalysisError] | None = None
+
+    def _block_index(self, offset: int) -> int:
+        return max(bisect_right(self._block_starts, offset) - 1, 0)
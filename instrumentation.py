@@ -0,0 +1,163 @@
+import threading
+from collections import Counter, defaultdict
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+
+METRICS_PREFIX = "expressions"
+
+
+class Observer:
+    """Receives events from instrumented code, ignoring them by default.
+
+    Instrumented code checks the module's `observer` before measuring
+    anything, so instrumentation costs a global lookup when disabled.
+    """
+    def phase_finished(self, phase: str, seconds: float) -> None:
+        pass
+
+    def input_measured(self, phase: str, size: int) -> None:
+        pass
+
+    def tokens_counted(self, counts: Mapping[str, int]) -> None:
+        pass
+
+    def errors_counted(self, counts: Mapping[str, int]) -> None:
+        pass
+
+
+observer: Observer | None = None
+
+
+def set_observer(new_observer: Observer | None) -> Observer | None:
+    """Install an observer, returning the previous one."""
+    global observer
+    previous, observer = observer, new_observer
+    return previous
+
+
+@contextmanager
+def observing(new_observer: Observer) -> Iterator[Observer]:
+    previous = set_observer(new_observer)
+    try:
+        yield new_observer
+    finally:
+        set_observer(previous)
+
+
+class MetricsCollector(Observer):
+    """Observer summing up events, safe to share between threads."""
+    def __init__(self) -> None:
+        self.phase_seconds: defaultdict[str, float] = defaultdict(float)
+        self.phase_calls: Counter[str] = Counter()
+        self.input_sizes: Counter[str] = Counter()
+        self.token_counts: Counter[str] = Counter()
+        self.error_counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def phase_finished(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phase_seconds[phase] += seconds
+            self.phase_calls[phase] += 1
+
+    def input_measured(self, phase: str, size: int) -> None:
+        with self._lock:
+            self.input_sizes[phase] += size
+
+    def tokens_counted(self, counts: Mapping[str, int]) -> None:
+        with self._lock:
+            self.token_counts.update(counts)
+
+    def errors_counted(self, counts: Mapping[str, int]) -> None:
+        with self._lock:
+            self.error_counts.update(counts)
+
+    def summary(self) -> str:
+        with self._lock:
+            lines = ["Phase                 calls      total ms"]
+            lines += [
+                f"{phase:<20} {self.phase_calls[phase]:6} "
+                f"{seconds * 1000:13.3f}"
+                for phase, seconds in self.phase_seconds.items()
+            ]
+            lines += [
+                f"Input characters of {phase}: {size}"
+                for phase, size in self.input_sizes.items()
+            ]
+            lines += [
+                f"Tokens of type {token_type}: {count}"
+                for token_type, count in self.token_counts.most_common()
+            ]
+            lines += [
+                f"Errors of kind {kind}: {count}"
+                for kind, count in self.error_counts.most_common()
+            ]
+        return "\n".join(lines)
+
+    def prometheus(self) -> str:
+        """Counters in Prometheus text exposition format."""
+        with self._lock:
+            return "".join([
+                _counter(
+                    "phase_seconds_total",
+                    "Wall time spent in each phase.",
+                    "phase",
+                    self.phase_seconds
+                ),
+                _counter(
+                    "phase_calls_total",
+                    "Number of times each phase ran.",
+                    "phase",
+                    self.phase_calls
+                ),
+                _counter(
+                    "input_characters_total",
+                    "Characters given to each phase.",
+                    "phase",
+                    self.input_sizes
+                ),
+                _counter(
+                    "tokens_total",
+                    "Recognized tokens by type.",
+                    "type",
+                    self.token_counts
+                ),
+                _counter(
+                    "errors_total",
+                    "Reported errors by kind.",
+                    "kind",
+                    self.error_counts
+                ),
+            ])
+
+
+def _escape_label_value(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    )
+
+
+def metric_lines(
+    name: str,
+    help_text: str,
+    metric_type: str,
+    samples: Mapping[str, float],
+    label: str | None = None,
+) -> str:
+    """A metric family in text format, samples are keyed by the value of
+    `label`, or by '' for a single sample without labels."""
+    name = f"{METRICS_PREFIX}_{name}"
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for key, value in samples.items():
+        if label is None:
+            lines.append(f"{name}{key} {value}")
+        else:
+            lines.append(
+                f'{name}{{{label}="{_escape_label_value(key)}"}} {value}'
+            )
+    return "\n".join(lines) + "\n"
+
+
+def _counter(
+    name: str, help_text: str, label: str, samples: Mapping[str, float]
+) -> str:
+    return metric_lines(name, help_text, "counter", samples, label)
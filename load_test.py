@@ -0,0 +1,213 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from benchmark import SHAPES, generate_expression
+from server import DEFAULT_HOST, DEFAULT_PORT, ValidationServer
+from worker import LatencyStats
+
+DEFAULT_CONNECTIONS = 16
+DEFAULT_REQUESTS = 10_000
+DEFAULT_DEPTH = 8
+DEFAULT_DISTINCT = 500
+DEFAULT_SIZE = 20
+
+
+@dataclass
+class LoadTestResult:
+    requests_count: int
+    failed_count: int
+    elapsed_seconds: float
+    latencies: LatencyStats
+
+    @property
+    def throughput(self) -> float:
+        """Answered requests per second."""
+        if not self.elapsed_seconds:
+            return float(self.requests_count)
+        return self.requests_count / self.elapsed_seconds
+
+
+def generate_expressions(
+    seed: int, count: int, size: int, error_density: float = 0.1
+) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        generate_expression(rng, rng.choice(SHAPES), size, error_density)
+        for _ in range(count)
+    ]
+
+
+async def _drive_connection(
+    host: str,
+    port: int,
+    expressions: list[str],
+    depth: int,
+    latencies: LatencyStats,
+) -> int:
+    """Send expressions keeping up to `depth` requests outstanding,
+    returning the number of failed requests.
+
+    Error responses, with or without the id of their request, and
+    requests left unanswered when the server closes the connection count
+    as failed.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    sent_at: dict[int, float] = {}
+    outstanding = asyncio.Semaphore(depth)
+    failed_count = 0
+    answered_count = 0
+
+    async def receive() -> None:
+        nonlocal failed_count, answered_count
+        for _ in expressions:
+            line = await reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            answered_count += 1
+            started_at = sent_at.pop(response.get("id"), None)
+            if started_at is not None:
+                latencies.record(time.perf_counter() - started_at)
+            failed_count += "error" in response
+            outstanding.release()
+        # Wakes the sender up should the connection have been closed
+        outstanding.release()
+
+    receiver = asyncio.create_task(receive())
+    try:
+        for request_id, expression in enumerate(expressions):
+            await outstanding.acquire()
+            if receiver.done():
+                break
+            sent_at[request_id] = time.perf_counter()
+            writer.write(
+                (
+                    json.dumps({"id": request_id, "expression": expression})
+                    + "\n"
+                ).encode()
+            )
+            await writer.drain()
+    except ConnectionError:
+        pass
+    await receiver
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except ConnectionError:
+        pass
+    return failed_count + len(expressions) - answered_count
+
+
+async def drive(
+    host: str,
+    port: int,
+    expressions: list[str],
+    requests_count: int,
+    connections: int,
+    depth: int,
+    seed: int = 0,
+) -> LoadTestResult:
+    """Send `requests_count` requests for expressions picked at random,
+    spread over concurrent connections."""
+    rng = random.Random(seed)
+    picked = rng.choices(expressions, k=requests_count)
+    latencies = LatencyStats(requests_count)
+    started_at = time.perf_counter()
+    failed_counts = await asyncio.gather(*(
+        _drive_connection(
+            host, port, picked[index::connections], depth, latencies
+        )
+        for index in range(connections)
+    ))
+    return LoadTestResult(
+        requests_count=requests_count,
+        failed_count=sum(failed_counts),
+        elapsed_seconds=time.perf_counter() - started_at,
+        latencies=latencies,
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Drive a validation server with concurrent requests."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument(
+        "--port",
+        type=int,
+        help="port of a running server, without one a server is started "
+             f"in this process (a running one listens on {DEFAULT_PORT} by "
+             "default)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--requests", type=int, default=DEFAULT_REQUESTS
+    )
+    parser.add_argument(
+        "--connections", type=int, default=DEFAULT_CONNECTIONS
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=DEFAULT_DEPTH,
+        help="outstanding requests per connection"
+    )
+    parser.add_argument(
+        "--distinct",
+        type=int,
+        default=DEFAULT_DISTINCT,
+        help="number of distinct expressions requests are picked from"
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=DEFAULT_SIZE,
+        help="number of operands in each generated expression"
+    )
+    return parser.parse_args(argv)
+
+
+async def _run(args: argparse.Namespace) -> LoadTestResult:
+    expressions = generate_expressions(args.seed, args.distinct, args.size)
+    if args.port is not None:
+        return await drive(
+            args.host, args.port, expressions, args.requests,
+            args.connections, args.depth, args.seed
+        )
+    workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor:
+        server = ValidationServer(executor, workers)
+        tcp_server = await server.start(args.host, 0)
+        try:
+            return await drive(
+                args.host, tcp_server.sockets[0].getsockname()[1],
+                expressions, args.requests, args.connections, args.depth,
+                args.seed
+            )
+        finally:
+            tcp_server.close()
+            await server.close()
+
+
+def run(argv: list[str] | None = None) -> int:
+    result = asyncio.run(_run(parse_args(argv)))
+    latencies = result.latencies.snapshot()
+    print(
+        f"{result.requests_count} requests ({result.failed_count} failed) "
+        f"in {result.elapsed_seconds:.3f}s: "
+        f"{result.throughput:.0f} requests/s, "
+        f"p50 {latencies['p50_ms']:.2f} ms, "
+        f"p99 {latencies['p99_ms']:.2f} ms"
+    )
+    return 1 if result.failed_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
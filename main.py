@@ -1,25 +1,357 @@
+import argparse
+import cProfile
 import sys
+import time
 
-from analyzer import analyze
-from tokenizer import tokenize
-from utils import format_tokens
+import instrumentation
+from analyzer import SyntaxAnalysisError
+from batch import DEFAULT_CHUNK_SIZE, validate_batch
+from cache import ValidationCache
+from instrumentation import MetricsCollector
+from mapped_file import validate_file
+from serialization import DiskCache, dumps
+from tokenizer import UnsupportedLexemeError
+from utils import (
+    write_errors_ndjson,
+    write_tokens,
+    write_tokens_ndjson,
+)
+from validation import ValidationResult, validate_expression
+from worker import ValidationWorker, serve_unix_socket
 
+TEXT_FORMAT = "text"
+NDJSON_FORMAT = "ndjson"
+BINARY_FORMAT = "binary"
 
-def main() -> None:
-    expression = sys.argv[1]
-    tokens, tokenization_errors = tokenize(expression)
-    syntax_analysis_errors = analyze(tokens)
-    errors = [*tokenization_errors, *syntax_analysis_errors]
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Validate arithmetic expressions."
+    )
+    modes = parser.add_mutually_exclusive_group(required=True)
+    modes.add_argument("expression", nargs="?", help="expression to validate")
+    modes.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="validate expressions from FILE, one per line ('-' for stdin), "
+             "and print NDJSON records"
+    )
+    modes.add_argument(
+        "--file",
+        metavar="FILE",
+        help="validate a single expression stored in FILE, reading it "
+             "through a memory map"
+    )
+    modes.add_argument(
+        "--serve",
+        action="store_true",
+        help="answer newline-delimited JSON requests from stdin until EOF"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes in batch mode (default: CPU count)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="number of expressions handed to a worker at once"
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="with --serve, listen on a Unix domain socket instead of stdin"
+    )
+    parser.add_argument(
+        "--cache-entries",
+        type=int,
+        metavar="N",
+        help="in batch and worker modes, cache results of up to N expressions"
+    )
+    parser.add_argument(
+        "--cache-bytes",
+        type=int,
+        metavar="N",
+        help="in batch and worker modes, cache results of expressions "
+             "totalling up to N bytes"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        help="in expression, batch and worker modes, reuse validation "
+             "results stored in DIR, storing new ones there"
+    )
+    parser.add_argument(
+        "--cache-dir-bytes",
+        type=int,
+        metavar="N",
+        help="with --cache-dir, remove least recently used results once "
+             "DIR holds more than N bytes of them"
+    )
+    parser.add_argument(
+        "--normalize-whitespace",
+        action="store_true",
+        help="let cached expressions differing only in whitespace share "
+             "an entry"
+    )
+    parser.add_argument(
+        "--max-errors",
+        type=int,
+        metavar="N",
+        help="stop validating a single expression after its first N "
+             "errors"
+    )
+    parser.add_argument(
+        "--format",
+        dest="output_format",
+        choices=[TEXT_FORMAT, NDJSON_FORMAT, BINARY_FORMAT],
+        help="for a single expression, print tokens and errors as text "
+             "(the default), as a JSON object per line, or in the binary "
+             "format of serialization.py"
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        metavar="N",
+        help="for a single expression, list only the first and last of N "
+             "tokens, eliding the middle"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print time spent per phase, token and error counts to stderr; "
+             "in worker mode they are also answered to the 'metrics' command"
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="FILE",
+        help="with --profile, also dump cProfile statistics to FILE"
+    )
+    args = parser.parse_args(_separate_expression(
+        parser, sys.argv[1:] if argv is None else argv
+    ))
+    if args.max_errors is not None and args.max_errors < 1:
+        parser.error("--max-errors must be positive")
+    if args.max_tokens is not None and args.max_tokens < 1:
+        parser.error("--max-tokens must be positive")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be positive")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+    if args.profile_output is not None and not args.profile:
+        parser.error("--profile-output requires --profile")
+    if args.socket is not None and not args.serve:
+        parser.error("--socket requires --serve")
+    if args.batch is None and not args.serve:
+        for option, value in [
+            ("--cache-entries", args.cache_entries),
+            ("--cache-bytes", args.cache_bytes),
+        ]:
+            if value is not None:
+                parser.error(f"{option} requires --batch or --serve")
+    if args.cache_dir_bytes is not None and args.cache_dir is None:
+        parser.error("--cache-dir-bytes requires --cache-dir")
+    if args.expression is None:
+        for option, value in [
+            ("--format", args.output_format),
+            ("--max-tokens", args.max_tokens),
+            ("--max-errors", args.max_errors),
+        ]:
+            if value is not None:
+                parser.error(f"{option} requires a single expression")
+    if args.max_errors is not None and args.cache_dir is not None:
+        # Stored results hold every error of an expression
+        parser.error("--max-errors can't be combined with --cache-dir")
+    if (
+        args.normalize_whitespace and
+        args.cache_entries is None and args.cache_bytes is None
+    ):
+        parser.error(
+            "--normalize-whitespace requires --cache-entries or "
+            "--cache-bytes"
+        )
+    if args.output_format is None:
+        args.output_format = TEXT_FORMAT
+    return args
+
+
+def _separate_expression(
+    parser: argparse.ArgumentParser, argv: list[str]
+) -> list[str]:
+    """Move an expression starting with a unary minus, which argparse
+    would take for an option, behind '--'."""
+    # argparse keeps no public mapping of option strings to actions
+    actions = parser._option_string_actions
+    takes_value = False
+    for index, arg in enumerate(argv):
+        if takes_value:
+            takes_value = False
+        elif arg == "--":
+            break
+        elif (option := arg.split("=", 1)[0]) in actions:
+            takes_value = "=" not in arg and actions[option].nargs != 0
+        elif arg.startswith("-") and not arg.startswith("--") and arg != "-":
+            return [*argv[:index], *argv[index+1:], "--", arg]
+    return argv
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if not args.profile:
+        run(args)
+        return
+
+    collector = MetricsCollector()
+    profiler = cProfile.Profile() if args.profile_output else None
+    with instrumentation.observing(collector):
+        try:
+            if profiler is None:
+                run(args, collector)
+            else:
+                profiler.runcall(run, args, collector)
+        finally:
+            print(collector.summary(), file=sys.stderr)
+            if profiler is not None:
+                profiler.dump_stats(args.profile_output)
+
+
+def run(
+    args: argparse.Namespace, metrics: MetricsCollector | None = None
+) -> None:
+    cache = disk_cache = None
+    if args.cache_dir is not None:
+        cache = disk_cache = DiskCache(args.cache_dir, args.cache_dir_bytes)
+    if args.cache_entries is not None or args.cache_bytes is not None:
+        cache = ValidationCache(
+            args.cache_entries,
+            args.cache_bytes,
+            args.normalize_whitespace,
+            disk_cache,
+        )
+    if args.batch is not None:
+        run_batch(args.batch, args.workers, args.chunk_size, cache)
+    elif args.file is not None:
+        validate_expression_file(args.file)
+    elif args.serve:
+        run_worker(args.socket, cache, metrics)
+    else:
+        validate(
+            args.expression,
+            args.max_errors,
+            disk_cache,
+            args.output_format,
+            args.max_tokens,
+        )
+
+
+def validate(
+    expression: str,
+    max_errors: int | None = None,
+    disk_cache: DiskCache | None = None,
+    output_format: str = TEXT_FORMAT,
+    max_tokens: int | None = None,
+) -> None:
+    if disk_cache is None or max_errors is not None:
+        # Analysis stops at the limit, which stored results can't do
+        result = validate_expression(expression, max_errors)
+    else:
+        result = disk_cache.validate(expression)
+    tokens = result.tokens
+    errors = [*result.tokenization_errors, *result.syntax_analysis_errors]
+    if output_format != TEXT_FORMAT:
+        write_result(result, errors, output_format, max_tokens)
+        if errors:
+            raise ExceptionGroup(
+                f"Invalid expression given: '{expression}'", errors
+            )
+        return
     if errors:
+        # The listing goes to stderr as it is written, rather than into
+        # the message, which would hold all of it in memory
+        sys.stderr.write("Recognized tokens: ")
+        write_tokens(tokens, sys.stderr, max_tokens)
+        sys.stderr.write("\n")
         raise ExceptionGroup(
-            f"Invalid expression given: '{expression}'\n\t" +
-            f"Recognized tokens: {format_tokens(tokens)}\n\t",
-            errors
+            f"Invalid expression given: '{expression}'", errors
         )
-    print(
+    observer = instrumentation.observer
+    if observer is not None:
+        started_at = time.perf_counter()
+    sys.stdout.write(
         f"Given expression is completely valid: '{expression}'\n"
-        f"Recognized tokens: {format_tokens(tokens)}"
+        "Recognized tokens: "
     )
+    write_tokens(tokens, sys.stdout, max_tokens)
+    sys.stdout.write("\n")
+    if observer is not None:
+        observer.phase_finished("output", time.perf_counter() - started_at)
+
+
+def write_result(
+    result: ValidationResult,
+    errors: list[UnsupportedLexemeError | SyntaxAnalysisError],
+    output_format: str,
+    max_tokens: int | None = None,
+) -> None:
+    """Write tokens and errors to stdout as NDJSON records, or in the
+    format of `serialization.dumps`."""
+    if output_format == NDJSON_FORMAT:
+        write_tokens_ndjson(result.tokens, sys.stdout, max_tokens)
+        write_errors_ndjson(errors, sys.stdout)
+        return
+    sys.stdout.flush()
+    sys.stdout.buffer.write(dumps(result))
+    sys.stdout.buffer.flush()
+
+
+def validate_expression_file(path: str) -> None:
+    result = validate_file(path)
+    if result.errors:
+        raise ExceptionGroup(
+            f"Invalid expression in file: '{path}'", result.errors
+        )
+    print(
+        f"Given expression file is completely valid: '{path}'\n"
+        f"Recognized tokens count: {result.tokens_count}"
+    )
+
+
+def run_batch(
+    path: str,
+    workers: int | None,
+    chunk_size: int,
+    cache: ValidationCache | DiskCache | None,
+) -> None:
+    if path == "-":
+        summary = validate_batch(
+            sys.stdin, sys.stdout, workers, chunk_size, cache
+        )
+    else:
+        with open(path) as file:
+            summary = validate_batch(
+                file, sys.stdout, workers, chunk_size, cache
+            )
+    print(
+        f"Validated {summary.expressions_count} expressions "
+        f"({summary.invalid_expressions_count} invalid) "
+        f"in {summary.elapsed_seconds:.3f}s: "
+        f"{summary.throughput:.0f} expressions/s",
+        file=sys.stderr
+    )
+
+
+def run_worker(
+    socket_path: str | None,
+    cache: ValidationCache | DiskCache | None,
+    metrics: MetricsCollector | None = None,
+) -> None:
+    worker = ValidationWorker(cache, metrics)
+    if socket_path is not None:
+        serve_unix_socket(worker, socket_path)
+    else:
+        worker.serve(sys.stdin, sys.stdout)
 
 
 if __name__ == "__main__":
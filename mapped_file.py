@@ -0,0 +1,283 @@
+import mmap
+import re
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+from analyzer import (
+    START_OF_EXPRESSION_CODE,
+    TRANSITIONS,
+    VALID_END_CODES,
+    SyntaxAnalysisError,
+    SyntaxErrorKind,
+    make_syntax_analysis_error,
+)
+from tokenizer import (
+    DECIMAL_NUMBER_SEPARATOR,
+    DIGIT,
+    LETTER,
+    LEXEME_PATTERN,
+    SINGLE_CHARACTER_LEXEMES,
+    TOKEN_TYPE_CODES,
+    TOKEN_TYPES,
+    WHITESPACE,
+    Position,
+    Token,
+    TokenType,
+    UnsupportedLexemeError,
+)
+
+_ASCII_SIZE = 128
+
+
+def _byte_class(pattern: str) -> bytes:
+    """ASCII bytes whose characters are matched by `pattern`."""
+    return bytes(
+        byte for byte in range(_ASCII_SIZE) if re.match(pattern, chr(byte))
+    )
+
+
+DIGIT_BYTES = _byte_class(DIGIT)
+LETTER_BYTES = _byte_class(LETTER)
+WHITESPACE_BYTES = _byte_class(WHITESPACE)
+
+
+def _character_set(*byte_classes: bytes) -> bytes:
+    escaped = b"".join(
+        b"\\x%02x" % byte for byte_class in byte_classes for byte in byte_class
+    )
+    return b"[" + escaped + b"]"
+
+
+_NON_ASCII_BYTE = re.compile(rb"[\x80-\xff]")
+
+_UNSUPPORTED_GROUP = "unsupported"
+
+_LEXEME_PATTERN = re.compile(
+    b"|".join([
+        b"(?P<%s>%s%s*)" % (
+            str(TokenType.IDENTIFIER).encode(),
+            _character_set(LETTER_BYTES),
+            _character_set(LETTER_BYTES, DIGIT_BYTES),
+        ),
+        b"(?P<%s>%s+(?:%s%s*)?)" % (
+            str(TokenType.NUMBER).encode(),
+            _character_set(DIGIT_BYTES),
+            re.escape(DECIMAL_NUMBER_SEPARATOR.encode()),
+            _character_set(DIGIT_BYTES),
+        ),
+        *(
+            b"(?P<%s>%s)" % (
+                str(token_type).encode(), re.escape(lexeme.encode())
+            )
+            for token_type, lexeme in SINGLE_CHARACTER_LEXEMES.items()
+        ),
+        b"(?P<whitespace>%s+)" % _character_set(WHITESPACE_BYTES),
+        b"(?P<%s>.)" % _UNSUPPORTED_GROUP.encode(),
+    ]),
+    re.DOTALL
+)
+
+_GROUP_TOKEN_TYPE_CODES = {
+    str(token_type): code for token_type, code in TOKEN_TYPE_CODES.items()
+}
+_NUMBER_CODE = TOKEN_TYPE_CODES[TokenType.NUMBER]
+_OPENING_PARENTHESIS_CODE = TOKEN_TYPE_CODES[TokenType.OPENING_PARENTHESIS]
+_CLOSING_PARENTHESIS_CODE = TOKEN_TYPE_CODES[TokenType.CLOSING_PARENTHESIS]
+_DECIMAL_NUMBER_SEPARATOR_BYTE = ord(DECIMAL_NUMBER_SEPARATOR)
+
+# Bytes of a file not containing only ASCII are scanned in segments of
+# about this size, split before one of these bytes
+_SEGMENT_SIZE = 1 << 16
+_SEGMENT_BOUNDARY = re.compile(_character_set(
+    WHITESPACE_BYTES, *(
+        lexeme.encode() for lexeme in SINGLE_CHARACTER_LEXEMES.values()
+    )
+))
+
+
+@dataclass
+class FileValidationResult:
+    """Errors found in an expression file, tokens are only counted."""
+    tokens_count: int
+    tokenization_errors: list[UnsupportedLexemeError]
+    syntax_analysis_errors: list[SyntaxAnalysisError]
+
+    @property
+    def errors(self) -> list[UnsupportedLexemeError | SyntaxAnalysisError]:
+        return [*self.tokenization_errors, *self.syntax_analysis_errors]
+
+
+def validate_file(path: str) -> FileValidationResult:
+    """Validate an expression stored in a file through a memory map.
+
+    The mapping is tokenized and analyzed in place, without storing
+    tokens, only the positions of open parentheses and the errors are
+    kept. Errors are the same, in the same order, as `tokenize` and
+    `analyze` give for the decoded text. A file containing non-ASCII bytes
+    is scanned in segments instead, with those containing non-ASCII bytes
+    decoded as UTF-8 so that positions count characters, and malformed
+    bytes reported as unsupported U+FFFD characters.
+    """
+    with open(path, "rb") as file:
+        if not file.seek(0, 2):
+            return _validate_segments([])
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+            if _NON_ASCII_BYTE.search(mapping):
+                return _validate_segments(_segments(mapping))
+            return _validate_segments([mapping])
+
+
+def _segments(mapping: mmap.mmap) -> Iterator[bytes | str]:
+    """Split a mapping before bytes that always start a lexeme, decoding
+    segments that contain non-ASCII bytes and keeping ASCII ones as is.
+
+    A lexeme never spans segments, and a UTF-8 sequence never spans them
+    either, as the bytes split at are ASCII.
+    """
+    size = len(mapping)
+    start = 0
+    while start < size:
+        stop = start + _SEGMENT_SIZE
+        if stop < size:
+            boundary = _SEGMENT_BOUNDARY.search(mapping, stop)
+            stop = boundary.start() if boundary else size
+        segment = mapping[start:stop]
+        if _NON_ASCII_BYTE.search(segment):
+            yield segment.decode("utf-8", errors="replace")
+        else:
+            yield segment
+        start = stop
+
+
+def _lexeme(buffer: bytes | mmap.mmap | str, start: int, stop: int) -> str:
+    text = buffer[start:stop]
+    return text if isinstance(text, str) else text.decode("ascii")
+
+
+def _token_at(
+    buffer: bytes | mmap.mmap | str,
+    offset: int,
+    code: int,
+    start: int,
+    stop: int,
+) -> Token:
+    """Token at `start` and `stop` of a segment at `offset`."""
+    return Token(
+        type=TOKEN_TYPES[code],
+        lexeme=_lexeme(buffer, start, stop),
+        position=Position(offset + start, offset + stop - 1)
+    )
+
+
+def _validate_segments(
+    segments: Iterable[bytes | mmap.mmap | str]
+) -> FileValidationResult:
+    """Tokenize and analyze an expression given in consecutive segments,
+    either ASCII bytes or decoded text, none splitting a lexeme."""
+    tokenization_errors: list[UnsupportedLexemeError] = []
+    syntax_analysis_errors: list[SyntaxAnalysisError] = []
+    unmatched_closings = array("Q")
+    unclosed_openings = array("Q")
+    transitions = TRANSITIONS
+    allowed = transitions[START_OF_EXPRESSION_CODE]
+    group_codes = _GROUP_TOKEN_TYPE_CODES
+    prev_code = START_OF_EXPRESSION_CODE
+    prev_start = prev_stop = 0
+    # The previous token when it was found in an earlier segment
+    carried_token = None
+    tokens_count = 0
+    buffer = b""
+    offset = 0
+    for segment in segments:
+        if prev_code != START_OF_EXPRESSION_CODE and carried_token is None:
+            carried_token = _token_at(
+                buffer, offset, prev_code, prev_start, prev_stop
+            )
+        offset += len(buffer)
+        buffer = segment
+        if isinstance(buffer, str):
+            pattern, separator = LEXEME_PATTERN, DECIMAL_NUMBER_SEPARATOR
+        else:
+            pattern, separator = (
+                _LEXEME_PATTERN, _DECIMAL_NUMBER_SEPARATOR_BYTE
+            )
+        for match in pattern.finditer(buffer):
+            group = match.lastgroup
+            code = group_codes.get(group)
+            start, stop = match.span()
+            if code is None:
+                if group == _UNSUPPORTED_GROUP:
+                    tokenization_errors.append(UnsupportedLexemeError(
+                        _lexeme(buffer, start, stop), offset + start
+                    ))
+                continue
+            if code == _NUMBER_CODE and buffer[stop-1] == separator:
+                tokenization_errors.append(UnsupportedLexemeError(
+                    _lexeme(buffer, start, stop),
+                    offset + start,
+                    offset + stop
+                ))
+                continue
+
+            tokens_count += 1
+            if not allowed[code]:
+                if prev_code == START_OF_EXPRESSION_CODE:
+                    syntax_analysis_errors.append(make_syntax_analysis_error(
+                        SyntaxErrorKind.INVALID_START,
+                        _token_at(buffer, offset, code, start, stop)
+                    ))
+                else:
+                    syntax_analysis_errors.append(make_syntax_analysis_error(
+                        SyntaxErrorKind.INVALID_FOLLOW,
+                        carried_token or _token_at(
+                            buffer, offset, prev_code, prev_start, prev_stop
+                        ),
+                        _token_at(buffer, offset, code, start, stop)
+                    ))
+            if code == _OPENING_PARENTHESIS_CODE:
+                unclosed_openings.append(offset + start)
+            elif code == _CLOSING_PARENTHESIS_CODE:
+                if unclosed_openings:
+                    unclosed_openings.pop()
+                else:
+                    unmatched_closings.append(offset + start)
+            allowed = transitions[code]
+            prev_code, prev_start, prev_stop = code, start, stop
+            carried_token = None
+
+    if not tokens_count:
+        syntax_analysis_errors.append(
+            make_syntax_analysis_error(SyntaxErrorKind.EMPTY_EXPRESSION)
+        )
+    elif not VALID_END_CODES[prev_code]:
+        syntax_analysis_errors.append(make_syntax_analysis_error(
+            SyntaxErrorKind.INVALID_END,
+            carried_token or _token_at(
+                buffer, offset, prev_code, prev_start, prev_stop
+            )
+        ))
+    for kind, token_type, starts in [
+        (
+            SyntaxErrorKind.UNMATCHED_CLOSING_PARENTHESIS,
+            TokenType.CLOSING_PARENTHESIS,
+            unmatched_closings
+        ),
+        (
+            SyntaxErrorKind.UNCLOSED_OPENING_PARENTHESIS,
+            TokenType.OPENING_PARENTHESIS,
+            unclosed_openings
+        ),
+    ]:
+        for start in starts:
+            syntax_analysis_errors.append(make_syntax_analysis_error(
+                kind,
+                Token(
+                    type=token_type,
+                    lexeme=SINGLE_CHARACTER_LEXEMES[token_type],
+                    position=Position(start, start)
+                )
+            ))
+    return FileValidationResult(
+        tokens_count, tokenization_errors, syntax_analysis_errors
+    )
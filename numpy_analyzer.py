@@ -0,0 +1,150 @@
+from collections.abc import Sequence
+
+import numpy as np
+
+from analyzer import (
+    START_OF_EXPRESSION_CODE,
+    TRANSITIONS,
+    VALID_END_CODES,
+    CodeScan,
+    SyntaxAnalysisError,
+    SyntaxAnalyzer,
+    token_type_codes,
+)
+from tokenizer import TOKEN_TYPE_CODES, Token, TokenType
+
+_OPENING_PARENTHESIS_CODE = TOKEN_TYPE_CODES[TokenType.OPENING_PARENTHESIS]
+_CLOSING_PARENTHESIS_CODE = TOKEN_TYPE_CODES[TokenType.CLOSING_PARENTHESIS]
+
+# FOLLOWS[prev, curr] tells whether token type with code `curr` may follow
+# one with code `prev`, the last row is the start of expression
+FOLLOWS = np.array(
+    [list(transitions) for transitions in TRANSITIONS], dtype=bool
+)
+VALID_ENDS = np.array(list(VALID_END_CODES), dtype=bool)
+
+
+def _segment_ids(offsets: np.ndarray) -> np.ndarray:
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def _scan_arrays(
+    codes: np.ndarray, offsets: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Global indices of invalid follows, unmatched ')' and unclosed '('
+    of expressions whose codes are `codes[offsets[i]:offsets[i+1]]`."""
+    codes = codes.astype(np.intp, copy=False)
+    starts = offsets[:-1][np.diff(offsets) > 0]
+    previous = np.empty_like(codes)
+    previous[1:] = codes[:-1]
+    previous[starts] = START_OF_EXPRESSION_CODE
+    invalid_follows = np.flatnonzero(~FOLLOWS[previous, codes])
+
+    # Running sums are shifted by a segment's number times a step larger
+    # than any depth range, so that accumulating a minimum over the whole
+    # array never mixes up values of different expressions
+    is_opening = codes == _OPENING_PARENTHESIS_CODE
+    is_closing = codes == _CLOSING_PARENTHESIS_CODE
+    step = 2 * len(codes) + 2
+    segments = _segment_ids(offsets)
+    depths = np.cumsum(is_opening.astype(np.int64) - is_closing)
+    depths -= np.concatenate(([0], depths))[offsets[:-1]][segments]
+
+    # Unmatched ')' lower the running minimum of depth below 0
+    lowest = np.minimum(
+        np.minimum.accumulate(depths - segments * step) + segments * step, 0
+    )
+    previous_lowest = np.empty_like(lowest)
+    previous_lowest[1:] = lowest[:-1]
+    previous_lowest[starts] = 0
+    unmatched_closings = np.flatnonzero(lowest < previous_lowest)
+
+    # Depth with unmatched ')' ignored, an '(' is left open when depth never
+    # drops below its own afterwards
+    open_depths = depths - lowest + segments * step
+    lowest_after = np.minimum.accumulate(open_depths[::-1])[::-1]
+    unclosed_openings = np.flatnonzero(
+        is_opening & (lowest_after == open_depths)
+    )
+    return invalid_follows, unmatched_closings, unclosed_openings
+
+
+def _expression_scan(
+    found: tuple[np.ndarray, ...],
+    bounds: tuple[np.ndarray, ...],
+    offsets: np.ndarray,
+    expression: int,
+) -> CodeScan:
+    return CodeScan(*(
+        (
+            indices[index_bounds[expression]:index_bounds[expression+1]]
+            - offsets[expression]
+        ).tolist()
+        for indices, index_bounds in zip(found, bounds)
+    ))
+
+
+def scan_batch(
+    codes: Sequence[int], offsets: Sequence[int]
+) -> list[CodeScan]:
+    """Check a ragged batch of expressions given as concatenated token type
+    codes, expression `i` spans `codes[offsets[i]:offsets[i+1]]`.
+
+    Every check runs over the whole batch at once, scans hold indices
+    local to their expression.
+    """
+    codes = np.asarray(codes)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    found = _scan_arrays(codes, offsets)
+    bounds = tuple(np.searchsorted(indices, offsets) for indices in found)
+    return [
+        _expression_scan(found, bounds, offsets, expression)
+        for expression in range(len(offsets) - 1)
+    ]
+
+
+def scan_codes(codes: Sequence[int]) -> CodeScan:
+    """Check a single expression's token type codes."""
+    return scan_batch(codes, [0, len(codes)])[0]
+
+
+def analyze_batch(
+    batch: Sequence[Sequence[Token]], max_errors: int | None = None
+) -> list[list[SyntaxAnalysisError]]:
+    """Analyze many expressions in one pass over their token type codes,
+    reporting the same errors as `SyntaxAnalyzer`.
+
+    Expressions without errors are recognized from the arrays alone, only
+    the failing ones have their errors built in Python.
+    """
+    codes = np.concatenate([
+        np.empty(0, np.uint8),
+        *(
+            np.asarray(token_type_codes(tokens), dtype=np.uint8)
+            for tokens in batch
+        ),
+    ])
+    lengths = np.fromiter(map(len, batch), np.intp, len(batch))
+    offsets = np.zeros(len(batch) + 1, dtype=np.intp)
+    np.cumsum(lengths, out=offsets[1:])
+    found = _scan_arrays(codes, offsets)
+
+    failing = lengths == 0
+    nonempty = ~failing
+    failing[nonempty] = ~VALID_ENDS[codes[offsets[1:][nonempty] - 1]]
+    for indices in found:
+        failing[np.searchsorted(offsets, indices, side="right") - 1] = True
+
+    errors: list[list[SyntaxAnalysisError]] = [[] for _ in batch]
+    bounds = tuple(np.searchsorted(indices, offsets) for indices in found)
+    for expression in np.flatnonzero(failing).tolist():
+        errors[expression] = SyntaxAnalyzer(
+            batch[expression], max_errors
+        ).report(_expression_scan(found, bounds, offsets, expression))
+    return errors
+
+
+def analyze(
+    tokens: Sequence[Token], max_errors: int | None = None
+) -> list[SyntaxAnalysisError]:
+    return analyze_batch([tokens], max_errors)[0]
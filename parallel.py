@@ -0,0 +1,194 @@
+import os
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from analyzer import (
+    TRANSITIONS,
+    CodeScan,
+    SyntaxAnalyzer,
+    scan_type_codes,
+)
+from tokenizer import (
+    SINGLE_CHARACTER_LEXEMES,
+    WHITESPACE,
+    TokenStream,
+    UnsupportedLexemeError,
+    tokenize_stream,
+)
+from validation import ValidationResult
+
+# Characters that can't be a part of an identifier or a number, so a chunk
+# may start at any of them
+_SAFE_BOUNDARY = re.compile(
+    "|".join([
+        *(re.escape(lexeme) for lexeme in SINGLE_CHARACTER_LEXEMES.values()),
+        WHITESPACE,
+    ])
+)
+
+CHUNKS_PER_WORKER = 4
+
+
+@dataclass
+class ChunkScan:
+    """Tokens of a chunk with positions in the whole source code, and a
+    scan of their type codes with indices local to the chunk."""
+    types: array
+    starts: array
+    stops: array
+    lexeme_errors: list[tuple[str, int, int | None]]
+    scan: CodeScan
+
+
+def split_source_code(source_code: str, chunks_count: int) -> list[int]:
+    """Offsets at which chunks start, each chunk but the first one starts
+    at a safe boundary."""
+    offsets = [0]
+    chunk_length = max(len(source_code) // max(chunks_count, 1), 1)
+    target = chunk_length
+    while target < len(source_code):
+        match = _SAFE_BOUNDARY.search(source_code, target)
+        if match is None:
+            break
+        offsets.append(match.start())
+        target = match.start() + chunk_length
+    return offsets
+
+
+def scan_chunk(chunk: str, offset: int) -> ChunkScan:
+    stream, errors = tokenize_stream(chunk)
+    return ChunkScan(
+        types=stream.types,
+        starts=array("I", map(offset.__add__, stream.starts)),
+        stops=array("I", map(offset.__add__, stream.stops)),
+        lexeme_errors=[
+            (
+                error.lexeme,
+                offset + error.position.start,
+                None if error.last_visited_position is None
+                else offset + error.last_visited_position
+            )
+            for error in errors
+        ],
+        scan=scan_type_codes(stream.types),
+    )
+
+
+def validate_parallel(
+    source_code: str,
+    workers: int | None = None,
+    chunks_count: int | None = None,
+) -> ValidationResult:
+    """Validate a single large expression on a pool of processes.
+
+    The source code is split into chunks at safe boundaries, chunks are
+    tokenized and scanned independently, then their scans are combined:
+    adjacent tokens are checked across chunk seams and parentheses are
+    matched with a prefix scan over each chunk's unmatched ')' and
+    unclosed '(' counts. The result equals `validate_expression`'s.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks_count = chunks_count or workers * CHUNKS_PER_WORKER
+    offsets = split_source_code(source_code, chunks_count)
+    chunks = [
+        source_code[start:stop]
+        for start, stop in zip(offsets, [*offsets[1:], len(source_code)])
+    ]
+    if workers == 1:
+        chunk_scans = list(map(scan_chunk, chunks, offsets))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk_scans = list(executor.map(scan_chunk, chunks, offsets))
+    return _combine(source_code, chunk_scans)
+
+
+def combine_scans(chunk_scans: Sequence[ChunkScan]) -> CodeScan:
+    """Scan of the tokens of consecutive chunks, indexed over all of them."""
+    invalid_follows: list[int] = []
+    base = 0
+    last_code = None
+    for chunk_scan in chunk_scans:
+        types = chunk_scan.types
+        local_follows = chunk_scan.scan.invalid_follows
+        if last_code is not None and types:
+            # First token was checked as a start of expression, check it
+            # against the last token of previous chunks instead
+            local_follows = [index for index in local_follows if index]
+            if not TRANSITIONS[last_code][types[0]]:
+                local_follows.insert(0, 0)
+        invalid_follows.extend(base + index for index in local_follows)
+        if types:
+            last_code = types[-1]
+        base += len(types)
+    return CodeScan(invalid_follows, *_match_parentheses(chunk_scans))
+
+
+def _combine(
+    source_code: str, chunk_scans: list[ChunkScan]
+) -> ValidationResult:
+    stream = TokenStream(source_code)
+    tokenization_errors = []
+    for chunk_scan in chunk_scans:
+        stream.types.extend(chunk_scan.types)
+        stream.starts.extend(chunk_scan.starts)
+        stream.stops.extend(chunk_scan.stops)
+        tokenization_errors.extend(
+            UnsupportedLexemeError(*lexeme_error)
+            for lexeme_error in chunk_scan.lexeme_errors
+        )
+    return ValidationResult(
+        tokens=stream,
+        tokenization_errors=tuple(tokenization_errors),
+        syntax_analysis_errors=tuple(
+            SyntaxAnalyzer(stream).report(combine_scans(chunk_scans))
+        ),
+    )
+
+
+def _match_parentheses(
+    chunk_scans: Sequence[ChunkScan]
+) -> tuple[list[int], list[int]]:
+    """Find globally unmatched ')' and unclosed '(' from chunk scans.
+
+    A chunk's unmatched ')' close '(' left open by previous chunks, so
+    only the ones exceeding the depth reached before the chunk remain
+    unmatched. Symmetrically, a chunk's unclosed '(' are closed by the
+    remaining unmatched ')' of the following chunks.
+    """
+    bases = []
+    base = 0
+    for chunk_scan in chunk_scans:
+        bases.append(base)
+        base += len(chunk_scan.types)
+
+    unmatched_closings = []
+    depth = 0
+    for base, chunk_scan in zip(bases, chunk_scans):
+        closings = chunk_scan.scan.unmatched_closings
+        matched_count = min(depth, len(closings))
+        unmatched_closings.extend(
+            base + index for index in closings[matched_count:]
+        )
+        depth += len(chunk_scan.scan.unclosed_openings) - matched_count
+
+    unclosed_openings_by_chunk = []
+    closings_count = 0
+    for base, chunk_scan in zip(reversed(bases), reversed(chunk_scans)):
+        openings = chunk_scan.scan.unclosed_openings
+        kept_count = max(len(openings) - closings_count, 0)
+        unclosed_openings_by_chunk.append(
+            [base + index for index in openings[:kept_count]]
+        )
+        closings_count = (
+            closings_count - (len(openings) - kept_count) +
+            len(chunk_scan.scan.unmatched_closings)
+        )
+    unclosed_openings = [
+        index
+        for openings in reversed(unclosed_openings_by_chunk)
+        for index in openings
+    ]
+    return unmatched_closings, unclosed_openings
@@ -0,0 +1,208 @@
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from enum import IntEnum
+
+from analyzer import analyze, token_type_codes
+from tokenizer import (
+    TOKEN_TYPE_CODES,
+    Position,
+    Token,
+    TokenType,
+    tokenize_stream,
+)
+
+
+class NodeKind(IntEnum):
+    IDENTIFIER = 0
+    NUMBER = 1
+    ADD = 2
+    SUBTRACT = 3
+    MULTIPLY = 4
+    DIVIDE = 5
+    NEGATE = 6
+
+
+LEAF_KINDS = {NodeKind.IDENTIFIER, NodeKind.NUMBER}
+BINARY_KINDS = {
+    NodeKind.ADD, NodeKind.SUBTRACT, NodeKind.MULTIPLY, NodeKind.DIVIDE
+}
+
+PRECEDENCE = {
+    NodeKind.ADD: 1,
+    NodeKind.SUBTRACT: 1,
+    NodeKind.MULTIPLY: 2,
+    NodeKind.DIVIDE: 2,
+    NodeKind.NEGATE: 3,
+}
+
+NO_NODE = -1
+
+
+class ParsingError(Exception):
+    """Tokens can't be arranged into an expression tree."""
+
+
+@dataclass
+class ExpressionTree:
+    """Expression stored as nodes in flat arrays.
+
+    Children are always stored before their parents, so the root is the
+    last node and nodes can be evaluated in index order. The operand of
+    `NEGATE` is its left child. Nodes refer to the tokens they were built
+    from by index, `NO_NODE` for nodes without one.
+    """
+    tokens: Sequence[Token]
+    kinds: array = field(default_factory=lambda: array("B"))
+    left: array = field(default_factory=lambda: array("i"))
+    right: array = field(default_factory=lambda: array("i"))
+    token_indices: array = field(default_factory=lambda: array("i"))
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def root(self) -> int:
+        return len(self.kinds) - 1
+
+    def add_node(
+        self,
+        kind: NodeKind,
+        left: int = NO_NODE,
+        right: int = NO_NODE,
+        token_index: int = NO_NODE,
+    ) -> int:
+        self.kinds.append(kind)
+        self.left.append(left)
+        self.right.append(right)
+        self.token_indices.append(token_index)
+        return len(self.kinds) - 1
+
+    def kind(self, node: int) -> NodeKind:
+        return NodeKind(self.kinds[node])
+
+    def lexeme(self, node: int) -> str:
+        return self.tokens[self.token_indices[node]].lexeme
+
+    def position(self, node: int) -> Position | None:
+        token_index = self.token_indices[node]
+        if token_index == NO_NODE:
+            return None
+        return self.tokens[token_index].position
+
+    def heights(self) -> array:
+        """Height of every node, leaves having height 0."""
+        heights = array("I", bytes(4 * len(self.kinds)))
+        for node, (left, right) in enumerate(zip(self.left, self.right)):
+            if left != NO_NODE:
+                heights[node] = 1 + max(
+                    heights[left], heights[right] if right != NO_NODE else 0
+                )
+        return heights
+
+
+_TOKEN_NODE_KINDS = {
+    TOKEN_TYPE_CODES[TokenType.ADDITION_OPERATOR]: NodeKind.ADD,
+    TOKEN_TYPE_CODES[TokenType.MINUS_SIGN]: NodeKind.SUBTRACT,
+    TOKEN_TYPE_CODES[TokenType.MULTIPLICATION_OPERATOR]: NodeKind.MULTIPLY,
+    TOKEN_TYPE_CODES[TokenType.DIVISION_OPERATOR]: NodeKind.DIVIDE,
+}
+_IDENTIFIER_CODE = TOKEN_TYPE_CODES[TokenType.IDENTIFIER]
+_NUMBER_CODE = TOKEN_TYPE_CODES[TokenType.NUMBER]
+_MINUS_SIGN_CODE = TOKEN_TYPE_CODES[TokenType.MINUS_SIGN]
+_OPENING_PARENTHESIS_CODE = TOKEN_TYPE_CODES[TokenType.OPENING_PARENTHESIS]
+_CLOSING_PARENTHESIS_CODE = TOKEN_TYPE_CODES[TokenType.CLOSING_PARENTHESIS]
+
+# Operator stack marker of an opening parenthesis
+_PARENTHESIS = -1
+
+
+def parse(tokens: Sequence[Token]) -> ExpressionTree:
+    """Build an expression tree from tokens that passed `analyze`.
+
+    Uses the shunting-yard algorithm with explicit stacks, so nesting
+    depth is only limited by memory. A minus sign expected to be an
+    operand is a unary minus, binding tighter than any binary operator.
+    """
+    tree = ExpressionTree(tokens)
+    operands: list[int] = []
+    operator_kinds: list[int] = []
+    operator_tokens: list[int] = []
+
+    def reduce() -> None:
+        kind = operator_kinds.pop()
+        token_index = operator_tokens.pop()
+        try:
+            if kind == NodeKind.NEGATE:
+                operands.append(tree.add_node(
+                    NodeKind.NEGATE, operands.pop(), token_index=token_index
+                ))
+            else:
+                right = operands.pop()
+                operands.append(tree.add_node(
+                    NodeKind(kind), operands.pop(), right, token_index
+                ))
+        except IndexError:
+            raise ParsingError(
+                f"{tokens[token_index].position}: operator lacks an operand"
+            ) from None
+
+    expects_operand = True
+    for index, code in enumerate(token_type_codes(tokens)):
+        if code == _IDENTIFIER_CODE or code == _NUMBER_CODE:
+            kind = (
+                NodeKind.IDENTIFIER if code == _IDENTIFIER_CODE
+                else NodeKind.NUMBER
+            )
+            operands.append(tree.add_node(kind, token_index=index))
+            expects_operand = False
+        elif code == _OPENING_PARENTHESIS_CODE:
+            operator_kinds.append(_PARENTHESIS)
+            operator_tokens.append(index)
+            expects_operand = True
+        elif code == _CLOSING_PARENTHESIS_CODE:
+            while operator_kinds and operator_kinds[-1] != _PARENTHESIS:
+                reduce()
+            if not operator_kinds:
+                raise ParsingError(
+                    f"{tokens[index].position}: unmatched parenthesis"
+                )
+            operator_kinds.pop()
+            operator_tokens.pop()
+            expects_operand = False
+        elif code == _MINUS_SIGN_CODE and expects_operand:
+            operator_kinds.append(NodeKind.NEGATE)
+            operator_tokens.append(index)
+        else:
+            kind = _TOKEN_NODE_KINDS[code]
+            precedence = PRECEDENCE[kind]
+            while (
+                operator_kinds and operator_kinds[-1] != _PARENTHESIS and
+                PRECEDENCE[operator_kinds[-1]] >= precedence
+            ):
+                reduce()
+            operator_kinds.append(kind)
+            operator_tokens.append(index)
+            expects_operand = True
+
+    while operator_kinds:
+        if operator_kinds[-1] == _PARENTHESIS:
+            raise ParsingError(
+                f"{tokens[operator_tokens[-1]].position}: "
+                "unmatched parenthesis"
+            )
+        reduce()
+    if len(operands) != 1:
+        raise ParsingError("Tokens don't form a single expression")
+    return tree
+
+
+def parse_expression(expression: str) -> ExpressionTree:
+    """Validate and parse an expression."""
+    tokens, tokenization_errors = tokenize_stream(expression)
+    errors = [*tokenization_errors, *analyze(tokens)]
+    if errors:
+        raise ExceptionGroup(
+            f"Invalid expression given: '{expression}'", errors
+        )
+    return parse(tokens)
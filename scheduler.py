@@ -0,0 +1,183 @@
+import heapq
+import operator
+from collections.abc import Callable, Mapping
+from concurrent.futures import Executor
+from dataclasses import dataclass
+
+from compiler import DivisionByZeroError, number_value
+from dag import ExpressionDag
+from parser import LEAF_KINDS, NO_NODE, ExpressionTree, NodeKind
+
+_OPERATIONS: dict[NodeKind, Callable] = {
+    NodeKind.ADD: operator.add,
+    NodeKind.SUBTRACT: operator.sub,
+    NodeKind.MULTIPLY: operator.mul,
+    NodeKind.DIVIDE: operator.truediv,
+    NodeKind.NEGATE: operator.neg,
+}
+
+# Relative costs of operations, in abstract time units
+DEFAULT_LATENCIES = {
+    NodeKind.ADD: 1.0,
+    NodeKind.SUBTRACT: 1.0,
+    NodeKind.MULTIPLY: 3.0,
+    NodeKind.DIVIDE: 10.0,
+    NodeKind.NEGATE: 1.0,
+}
+
+Nodes = ExpressionTree | ExpressionDag
+
+
+@dataclass
+class SimulationResult:
+    """Timing of a simulated execution on a number of processors."""
+    processors: int
+    makespan: float
+    sequential_time: float
+
+    @property
+    def speedup(self) -> float:
+        if not self.makespan:
+            return 1.0
+        return self.sequential_time / self.makespan
+
+    @property
+    def efficiency(self) -> float:
+        return self.speedup / self.processors
+
+
+def _operands(nodes: Nodes, node: int) -> list[int]:
+    return [
+        child for child in (nodes.left[node], nodes.right[node])
+        if child != NO_NODE
+    ]
+
+
+def levels(nodes: Nodes) -> list[list[int]]:
+    """Operator nodes grouped by dependency depth.
+
+    Operations of a level only take leaves and results of earlier levels,
+    so all of them can run at once.
+    """
+    depths = [0] * len(nodes)
+    result: list[list[int]] = []
+    for node, kind in enumerate(nodes.kinds):
+        if kind in LEAF_KINDS:
+            continue
+        depth = 1 + max(depths[child] for child in _operands(nodes, node))
+        depths[node] = depth
+        if depth > len(result):
+            result.append([])
+        result[depth-1].append(node)
+    return result
+
+
+def evaluate_levels(
+    tree: ExpressionTree,
+    bindings: Mapping[str, object],
+    executor: Executor | None = None,
+) -> object:
+    """Evaluate a tree level by level.
+
+    Operations of each level are dispatched to `executor` and awaited
+    before the next level starts, without one they run in the calling
+    thread. Pays off when operands are large NumPy arrays, whose
+    operators release the GIL, on a thread pool. Operands are pickled on a
+    process pool.
+    """
+    values: list = [None] * len(tree)
+    for node, kind in enumerate(tree.kinds):
+        if kind == NodeKind.IDENTIFIER:
+            values[node] = bindings[tree.lexeme(node)]
+        elif kind == NodeKind.NUMBER:
+            values[node] = number_value(tree.lexeme(node))
+    for level in levels(tree):
+        operations = [
+            (
+                _OPERATIONS[tree.kinds[node]],
+                [values[child] for child in _operands(tree, node)],
+            )
+            for node in level
+        ]
+        futures = None
+        if executor is not None:
+            futures = [
+                executor.submit(function, *operands)
+                for function, operands in operations
+            ]
+        for index, node in enumerate(level):
+            try:
+                if futures is None:
+                    function, operands = operations[index]
+                    values[node] = function(*operands)
+                else:
+                    values[node] = futures[index].result()
+            except ZeroDivisionError:
+                raise DivisionByZeroError(tree.position(node)) from None
+    return values[tree.root]
+
+
+def simulate(
+    nodes: Nodes,
+    processors: int,
+    latencies: Mapping[NodeKind, float] = DEFAULT_LATENCIES,
+) -> SimulationResult:
+    """Simulate list scheduling of operations on `processors`.
+
+    Leaves are available at once. Whenever a processor is free it takes
+    the ready operation with the longest path of latencies to a root,
+    which keeps the critical path busy.
+    """
+    if processors < 1:
+        raise ValueError(
+            f"Number of processors must be positive: {processors}"
+        )
+    costs = [
+        0.0 if kind in LEAF_KINDS else latencies[NodeKind(kind)]
+        for kind in nodes.kinds
+    ]
+    parents: list[list[int]] = [[] for _ in range(len(nodes))]
+    waiting = [0] * len(nodes)
+    for node, kind in enumerate(nodes.kinds):
+        if kind in LEAF_KINDS:
+            continue
+        for child in set(_operands(nodes, node)):
+            if nodes.kinds[child] not in LEAF_KINDS:
+                parents[child].append(node)
+                waiting[node] += 1
+
+    bottom_levels = [0.0] * len(nodes)
+    for node in reversed(range(len(nodes))):
+        bottom_levels[node] = costs[node] + max(
+            (bottom_levels[parent] for parent in parents[node]), default=0.0
+        )
+
+    ready = [
+        (-bottom_levels[node], node)
+        for node, kind in enumerate(nodes.kinds)
+        if kind not in LEAF_KINDS and not waiting[node]
+    ]
+    heapq.heapify(ready)
+    running: list[tuple[float, int]] = []
+    free_processors = processors
+    time = makespan = 0.0
+    while ready or running:
+        while ready and free_processors:
+            _, node = heapq.heappop(ready)
+            heapq.heappush(running, (time + costs[node], node))
+            free_processors -= 1
+        time = running[0][0]
+        while running and running[0][0] == time:
+            _, node = heapq.heappop(running)
+            free_processors += 1
+            makespan = time
+            for parent in parents[node]:
+                waiting[parent] -= 1
+                if not waiting[parent]:
+                    heapq.heappush(ready, (-bottom_levels[parent], parent))
+
+    return SimulationResult(
+        processors=processors,
+        makespan=makespan,
+        sequential_time=sum(costs),
+    )
@@ -0,0 +1,353 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from analyzer import SyntaxErrorRecords
+from tokenizer import TokenStream, UnsupportedLexemeError
+from validation import ValidationResult, validate_expression
+
+MAGIC = b"PZKS"
+FORMAT_VERSION = 1
+
+# Magic, format version, SHA-256 of the UTF-8 source, its size in bytes,
+# and counts of tokens, tokenization errors and syntax errors
+_HEADER = struct.Struct("<4sH2x32sIIII")
+# Start, length and last visited position (-1 for none) of an unsupported
+# lexeme
+_LEXEME_ERROR_FIELDS = 3
+_NO_POSITION = -1
+_ALIGNMENT = 4
+
+# Prefix of entries being written
+_TEMPORARY_PREFIX = "."
+
+_ENCODING = "utf-8"
+_ENCODING_ERRORS = "surrogatepass"
+
+
+class SerializationError(Exception):
+    """Serialized results are malformed or of another format version."""
+
+
+def source_digest(source_code: str) -> bytes:
+    """SHA-256 digest identifying a source code."""
+    return hashlib.sha256(
+        source_code.encode(_ENCODING, _ENCODING_ERRORS)
+    ).digest()
+
+
+def _padding(size: int) -> bytes:
+    return bytes(-size % _ALIGNMENT)
+
+
+def _little_endian(typecode: str, values) -> bytes:
+    values = array(typecode, values)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _view(buffer: memoryview, typecode: str):
+    """Values of a little-endian buffer, without a copy where possible."""
+    if sys.byteorder == "little" or typecode == "B":
+        return buffer.cast(typecode)
+    values = array(typecode, buffer.tobytes())
+    values.byteswap()
+    return values
+
+
+def dumps(result: ValidationResult) -> bytes:
+    """Serialize validation results of a source code.
+
+    Layout after the header: the UTF-8 source, token starts and stops,
+    unsupported lexemes, syntax error token indices, token type codes and
+    syntax error kinds. Every section is aligned to 4 bytes.
+    """
+    tokens = result.tokens
+    source = tokens.source_code.encode(_ENCODING, _ENCODING_ERRORS)
+    lexeme_errors = []
+    for error in result.tokenization_errors:
+        lexeme_errors += [
+            error.position.start,
+            len(error.lexeme),
+            _NO_POSITION if error.last_visited_position is None
+            else error.last_visited_position,
+        ]
+    starts = tokens.starts
+    error_kinds = []
+    error_indices = []
+    for error in result.syntax_analysis_errors:
+        error_kinds.append(error.kind)
+        error_indices.append(
+            bisect_left(starts, error.tokens[-1].position.start)
+            if error.tokens else _NO_POSITION
+        )
+    return b"".join([
+        _HEADER.pack(
+            MAGIC,
+            FORMAT_VERSION,
+            hashlib.sha256(source).digest(),
+            len(source),
+            len(tokens),
+            len(result.tokenization_errors),
+            len(error_kinds),
+        ),
+        source,
+        _padding(len(source)),
+        _little_endian("I", starts),
+        _little_endian("I", tokens.stops),
+        _little_endian("i", lexeme_errors),
+        _little_endian("i", error_indices),
+        bytes(tokens.types),
+        bytes(error_kinds),
+    ])
+
+
+def loads(
+    buffer, source_code: str | None = None
+) -> ValidationResult:
+    """Deserialize validation results from a bytes-like object.
+
+    Token and error arrays are read-only views of `buffer`, nothing is
+    copied but the source code, which isn't decoded either when it is
+    given. A given source code must be the serialized one. Syntax errors
+    are built when accessed.
+    """
+    view = memoryview(buffer).toreadonly()
+    if len(view) < _HEADER.size:
+        raise SerializationError("Serialized results are truncated")
+    (
+        magic, version, digest, source_size, tokens_count,
+        lexeme_errors_count, syntax_errors_count
+    ) = _HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise SerializationError("Not serialized validation results")
+    if version != FORMAT_VERSION:
+        raise SerializationError(
+            f"Unsupported format version {version}, "
+            f"expected {FORMAT_VERSION}"
+        )
+
+    sizes = [
+        source_size + len(_padding(source_size)),
+        4 * tokens_count,
+        4 * tokens_count,
+        4 * _LEXEME_ERROR_FIELDS * lexeme_errors_count,
+        4 * syntax_errors_count,
+        tokens_count,
+        syntax_errors_count,
+    ]
+    if len(view) != _HEADER.size + sum(sizes):
+        raise SerializationError("Serialized results are truncated")
+    sections = []
+    offset = _HEADER.size
+    for size in sizes:
+        sections.append(view[offset:offset+size])
+        offset += size
+    source, starts, stops, lexeme_errors, indices, types, kinds = sections
+
+    if source_code is None:
+        source_code = str(
+            source[:source_size], _ENCODING, _ENCODING_ERRORS
+        )
+    elif source_digest(source_code) != digest:
+        raise SerializationError("Serialized results are of another source")
+
+    tokens = TokenStream(
+        source_code, types, _view(starts, "I"), _view(stops, "I")
+    )
+    lexeme_errors = _view(lexeme_errors, "i")
+    tokenization_errors = []
+    for index in range(0, len(lexeme_errors), _LEXEME_ERROR_FIELDS):
+        start, length, last_visited_position = (
+            lexeme_errors[index:index+_LEXEME_ERROR_FIELDS]
+        )
+        tokenization_errors.append(UnsupportedLexemeError(
+            source_code[start:start+length],
+            start,
+            None if last_visited_position == _NO_POSITION
+            else last_visited_position
+        ))
+    syntax_analysis_errors = SyntaxErrorRecords(tokens)
+    syntax_analysis_errors.kinds = kinds
+    syntax_analysis_errors.indices = _view(indices, "i")
+    return ValidationResult(
+        tokens, tuple(tokenization_errors), syntax_analysis_errors
+    )
+
+
+def dump_file(result: ValidationResult, path: str) -> None:
+    with open(path, "wb") as file:
+        file.write(dumps(result))
+
+
+def load_file(path: str, source_code: str | None = None) -> ValidationResult:
+    """Deserialize validation results through a memory map of a file.
+
+    Arrays of the result keep the mapping, and its file descriptor, open
+    until they are released, so results to be kept long should rather be
+    loaded from the file's bytes.
+    """
+    with open(path, "rb") as file:
+        if not file.seek(0, 2):
+            raise SerializationError("Serialized results are truncated")
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return loads(mapping, source_code)
+
+
+class DiskCache:
+    """Content-addressed cache of validation results in a directory.
+
+    Entries are named by the SHA-256 digest of the source code and the
+    format version, and written atomically, so processes and machines may
+    share a directory. When entries exceed `max_bytes`, the least recently
+    used ones are removed. Malformed entries are removed, and they and
+    entries that can't be read at the moment are treated as misses.
+
+    Pickles into a cache of the same directory.
+    """
+    def __init__(self, directory: str, max_bytes: int | None = None) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    def __reduce__(self):
+        return type(self), (self.directory, self.max_bytes)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._entries())
+
+    def path(self, source_code: str) -> str:
+        digest = source_digest(source_code).hex()
+        return os.path.join(
+            self.directory, digest[:2], f"{digest}.v{FORMAT_VERSION}"
+        )
+
+    def load(self, source_code: str) -> ValidationResult | None:
+        path = self.path(source_code)
+        try:
+            # Read rather than mapped, so that results kept by callers,
+            # e.g. a ValidationCache in front, don't hold a descriptor each
+            with open(path, "rb") as file:
+                data = file.read()
+            result = loads(data, source_code)
+            self._touch(path)
+        except SerializationError:
+            self._remove(path)
+            result = None
+        except OSError:
+            # Missing, or unreadable for now (e.g. out of descriptors),
+            # which doesn't make the entry malformed
+            result = None
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def store(self, result: ValidationResult) -> None:
+        path = self.path(result.tokens.source_code)
+        data = dumps(result)
+        if self.max_bytes is not None and len(data) > self.max_bytes:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "wb", prefix=_TEMPORARY_PREFIX, dir=os.path.dirname(path),
+            delete=False
+        ) as file:
+            file.write(data)
+        os.replace(file.name, path)
+        self._touch(path)
+        with self._lock:
+            self.total_bytes += len(data)
+            over_limit = (
+                self.max_bytes is not None and
+                self.total_bytes > self.max_bytes
+            )
+        if over_limit:
+            self._evict()
+
+    def validate(self, expression: str) -> ValidationResult:
+        result = self.load(expression)
+        if result is None:
+            result = validate_expression(expression)
+            self.store(result)
+        return result
+
+    def stats(self) -> dict:
+        entries_count = len(self)
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries_count,
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """Modification time, size and path of every entry."""
+        entries = []
+        with os.scandir(self.directory) as subdirectories:
+            for subdirectory in subdirectories:
+                if not subdirectory.is_dir():
+                    continue
+                try:
+                    files = list(os.scandir(subdirectory.path))
+                except FileNotFoundError:
+                    continue
+                for file in files:
+                    if file.name.startswith(_TEMPORARY_PREFIX):
+                        continue
+                    try:
+                        stat = file.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, file.path))
+        return entries
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the directory fits in
+        `max_bytes`, recounting entries other processes stored."""
+        entries = sorted(self._entries())
+        total_bytes = sum(size for _, size, _ in entries)
+        evictions = 0
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            if self._remove(path):
+                evictions += 1
+            total_bytes -= size
+        with self._lock:
+            self.total_bytes = total_bytes
+            self.evictions += evictions
+
+    @staticmethod
+    def _touch(path: str) -> None:
+        # Explicit times are kept at full precision, unlike ones the file
+        # system takes from its coarse clock
+        now = time.time()
+        os.utime(path, (now, now))
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return False
+        return True
@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from batch import validation_result
+from worker import STATS_COMMAND, LatencyStats
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_BATCH_DELAY = 0.002
+DEFAULT_MAX_QUEUE = 1024
+DEFAULT_MAX_REQUEST_BYTES = 1 << 20
+# Responses of a connection waiting to be written, reading its requests
+# pauses beyond that
+PIPELINE_DEPTH = 64
+
+
+def validate_expressions(expressions: list[str]) -> list[dict]:
+    """Validation results of a micro-batch, run on the executor."""
+    return [
+        validation_result(expression, with_tokens=True)
+        for expression in expressions
+    ]
+
+
+class ValidationServer:
+    """Validates expressions sent as newline-delimited JSON over TCP.
+
+    Requests and responses are those of `worker.ValidationWorker`, results
+    also carry tokens formatted as `main.py` prints them. Responses of a
+    connection come in request order.
+
+    Requests of identical expressions in flight share a single validation.
+    Distinct expressions are queued and handed to `executor` in batches of
+    up to `batch_size`, collected for up to `batch_delay` seconds, with at
+    most two batches per worker in flight. When the queue of `max_queue`
+    expressions is full, connections stop being read until it drains.
+    Requests longer than `max_request_bytes` get an error and their
+    connection is closed.
+    """
+    def __init__(
+        self,
+        executor: Executor,
+        workers: int,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_delay: float = DEFAULT_BATCH_DELAY,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        max_request_bytes: int = DEFAULT_MAX_REQUEST_BYTES,
+    ) -> None:
+        self.executor = executor
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_request_bytes = max_request_bytes
+        self.stats = LatencyStats()
+        self.coalesced_count = 0
+        self.batches_count = 0
+        self._queue: asyncio.Queue[str] = asyncio.Queue(max_queue)
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._batch_slots = asyncio.Semaphore(2 * workers)
+        self._batcher: asyncio.Task | None = None
+
+    async def start(
+        self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT
+    ) -> asyncio.Server:
+        self._batcher = asyncio.create_task(self._dispatch_batches())
+        # Lines are limited by the stream buffer, the newline included
+        return await asyncio.start_server(
+            self._serve_connection, host, port,
+            limit=self.max_request_bytes + 1
+        )
+
+    async def close(self) -> None:
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+
+    async def validate(self, expression: str) -> dict:
+        future = self._in_flight.get(expression)
+        if future is not None:
+            self.coalesced_count += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._in_flight[expression] = future
+            try:
+                await self._queue.put(expression)
+            except asyncio.CancelledError:
+                # Requests coalesced meanwhile would wait forever otherwise
+                del self._in_flight[expression]
+                future.cancel()
+                raise
+        return await asyncio.shield(future)
+
+    async def handle(self, line: str) -> dict:
+        started_at = time.perf_counter()
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as exc:
+            return {"error": f"Malformed request: {exc}"}
+        if not isinstance(request, dict):
+            return {"error": "Request must be a JSON object"}
+
+        response = {"id": request["id"]} if "id" in request else {}
+        if "expression" in request:
+            expression = request["expression"]
+            if not isinstance(expression, str):
+                response["error"] = "Expression must be a string"
+                return response
+            try:
+                response.update(await self.validate(expression))
+            except Exception as exc:
+                response["error"] = f"Validation failed: {exc!r}"
+            self.stats.record(time.perf_counter() - started_at)
+        elif request.get("command") == STATS_COMMAND:
+            response.update(self.stats.snapshot())
+            response.update(
+                coalesced=self.coalesced_count,
+                batches=self.batches_count,
+                queued=self._queue.qsize(),
+            )
+        else:
+            response["error"] = (
+                "Request must contain an expression or a command"
+            )
+        return response
+
+    async def _dispatch_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expressions = [await self._queue.get()]
+            if self._queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.batch_delay)
+            while (
+                len(expressions) < self.batch_size and
+                not self._queue.empty()
+            ):
+                expressions.append(self._queue.get_nowait())
+            await self._batch_slots.acquire()
+            self.batches_count += 1
+            batch = loop.run_in_executor(
+                self.executor, validate_expressions, expressions
+            )
+            batch.add_done_callback(
+                functools.partial(self._finish_batch, expressions)
+            )
+
+    def _finish_batch(
+        self, expressions: list[str], batch: asyncio.Future
+    ) -> None:
+        self._batch_slots.release()
+        for index, expression in enumerate(expressions):
+            future = self._in_flight.pop(expression)
+            if future.done():
+                continue
+            if batch.cancelled():
+                future.cancel()
+            elif batch.exception() is not None:
+                future.set_exception(batch.exception())
+            else:
+                future.set_result(batch.result()[index])
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        responses: asyncio.Queue[asyncio.Task | None] = asyncio.Queue(
+            PIPELINE_DEPTH
+        )
+        sender = asyncio.create_task(self._send_responses(responses, writer))
+        try:
+            while True:
+                try:
+                    raw_line = await reader.readline()
+                except ValueError:
+                    await responses.put(self._answered({
+                        "error":
+                            f"Request exceeds {self.max_request_bytes} bytes"
+                    }))
+                    break
+                if not raw_line:
+                    break
+                line = raw_line.decode(errors="replace")
+                if line.strip():
+                    await responses.put(
+                        asyncio.create_task(self.handle(line))
+                    )
+        except ConnectionError:
+            pass
+        finally:
+            await responses.put(None)
+            await sender
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    def _answered(response: dict) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(response)
+        return future
+
+    @staticmethod
+    async def _send_responses(
+        responses: asyncio.Queue, writer: asyncio.StreamWriter
+    ) -> None:
+        while (response := await responses.get()) is not None:
+            try:
+                writer.write((json.dumps(await response) + "\n").encode())
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Serve expression validation over TCP."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="most expressions handed to a worker at once"
+    )
+    parser.add_argument(
+        "--batch-delay",
+        type=float,
+        default=DEFAULT_BATCH_DELAY,
+        help="seconds to wait for more expressions to batch"
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=DEFAULT_MAX_QUEUE,
+        help="queued expressions beyond which requests are no longer read"
+    )
+    parser.add_argument(
+        "--max-request-bytes",
+        type=int,
+        default=DEFAULT_MAX_REQUEST_BYTES,
+        help="longest accepted request line"
+    )
+    return parser.parse_args(argv)
+
+
+async def serve(args: argparse.Namespace) -> None:
+    workers = args.workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as executor:
+        server = ValidationServer(
+            executor,
+            workers,
+            args.batch_size,
+            args.batch_delay,
+            args.max_queue,
+            args.max_request_bytes,
+        )
+        tcp_server = await server.start(args.host, args.port)
+        address = tcp_server.sockets[0].getsockname()
+        print(f"Listening on {address[0]}:{address[1]}", file=sys.stderr)
+        try:
+            async with tcp_server:
+                await tcp_server.serve_forever()
+        finally:
+            await server.close()
+
+
+def run(argv: list[str] | None = None) -> int:
+    try:
+        asyncio.run(serve(parse_args(argv)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,308 @@
+import math
+import operator
+import sys
+from collections.abc import Callable
+from dataclasses import dataclass
+from decimal import Decimal
+
+from compiler import DivisionByZeroError, number_value
+from parser import (
+    LEAF_KINDS,
+    NO_NODE,
+    PRECEDENCE,
+    ExpressionTree,
+    NodeKind,
+    parse_expression,
+)
+from tokenizer import (
+    ADDITION_OPERATOR,
+    CLOSING_PARENTHESIS,
+    DIVISION_OPERATOR,
+    MINUS_SIGN,
+    MULTIPLICATION_OPERATOR,
+    OPENING_PARENTHESIS,
+    TokenStream,
+    tokenize_stream,
+)
+
+_OPERATOR_LEXEMES = {
+    NodeKind.ADD: ADDITION_OPERATOR,
+    NodeKind.SUBTRACT: MINUS_SIGN,
+    NodeKind.MULTIPLY: MULTIPLICATION_OPERATOR,
+    NodeKind.DIVIDE: DIVISION_OPERATOR,
+}
+
+_OPERATIONS: dict[NodeKind, Callable[[float, float], float]] = {
+    NodeKind.ADD: operator.add,
+    NodeKind.SUBTRACT: operator.sub,
+    NodeKind.MULTIPLY: operator.mul,
+    NodeKind.DIVIDE: operator.truediv,
+}
+
+
+@dataclass
+class SimplificationResult:
+    """Simplified expression, its tokens and what was done to it."""
+    expression: str
+    tokens: TokenStream
+    removed_operations_count: int
+    divisions_by_zero: list[DivisionByZeroError]
+
+
+def format_number(value: int | float) -> str:
+    """Number lexeme of a non-negative finite value, -0.0 included."""
+    if isinstance(value, int):
+        return str(value)
+    text = format(Decimal(repr(abs(value))), "f")
+    return text if "." in text else text + ".0"
+
+
+class _Simplified:
+    """Simplified nodes, numbers hold their value and, unless folded, the
+    lexeme they were written with. Whether a subtree contains a division
+    is tracked, as it may fail and so can't be dropped."""
+    def __init__(self) -> None:
+        self.kinds: list[NodeKind] = []
+        self.left: list[int] = []
+        self.right: list[int] = []
+        self.lexemes: list[str | None] = []
+        self.values: list[int | float | None] = []
+        self.divides: list[bool] = []
+
+    def add_node(
+        self,
+        kind: NodeKind,
+        left: int = NO_NODE,
+        right: int = NO_NODE,
+        lexeme: str | None = None,
+        value: int | float | None = None,
+    ) -> int:
+        self.kinds.append(kind)
+        self.left.append(left)
+        self.right.append(right)
+        self.lexemes.append(lexeme)
+        self.values.append(value)
+        self.divides.append(kind == NodeKind.DIVIDE or any(
+            self.divides[child] for child in (left, right)
+            if child != NO_NODE
+        ))
+        return len(self.kinds) - 1
+
+    def number(self, value: int | float) -> int:
+        return self.add_node(NodeKind.NUMBER, value=value)
+
+    def is_number(self, node: int, value: int | None = None) -> bool:
+        return self.kinds[node] == NodeKind.NUMBER and (
+            value is None or self.values[node] == value
+        )
+
+    def operations_count(self, node: int) -> int:
+        """Operations in a subtree as printed, where a negative number is
+        a unary minus."""
+        count = 0
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if self.is_number(node):
+                count += self.values[node] < 0
+            elif self.kinds[node] not in LEAF_KINDS:
+                count += 1
+                stack.extend(
+                    child for child in (self.left[node], self.right[node])
+                    if child != NO_NODE
+                )
+        return count
+
+
+def _fold(
+    kind: NodeKind, left: int | float, right: int | float
+) -> int | float | None:
+    """Value of an operation on numbers, None when it can't be folded or
+    printed."""
+    try:
+        value = _OPERATIONS[kind](left, right)
+    except (ZeroDivisionError, OverflowError):
+        return None
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    max_digits = sys.get_int_max_str_digits()
+    if isinstance(value, int) and max_digits and (
+        abs(value) >= 10 ** max_digits
+    ):
+        # `str` refuses integers with more digits than that
+        return None
+    return value
+
+
+def _simplify_node(
+    nodes: _Simplified,
+    kind: NodeKind,
+    left: int,
+    right: int,
+) -> int:
+    """Apply folding, identity and annihilator rules to an operation on
+    already simplified operands."""
+    if kind == NodeKind.NEGATE:
+        if nodes.is_number(left):
+            return nodes.number(-nodes.values[left])
+        if nodes.kinds[left] == NodeKind.NEGATE:
+            return nodes.left[left]
+        return nodes.add_node(kind, left)
+
+    if nodes.is_number(left) and nodes.is_number(right):
+        value = _fold(kind, nodes.values[left], nodes.values[right])
+        if value is not None:
+            return nodes.number(value)
+
+    match kind:
+        case NodeKind.ADD:
+            if nodes.is_number(left, 0):
+                return right
+            if nodes.is_number(right, 0):
+                return left
+            if nodes.kinds[right] == NodeKind.NEGATE:
+                return nodes.add_node(
+                    NodeKind.SUBTRACT, left, nodes.left[right]
+                )
+        case NodeKind.SUBTRACT:
+            if nodes.is_number(right, 0):
+                return left
+            if nodes.is_number(left, 0):
+                return _simplify_node(nodes, NodeKind.NEGATE, right, NO_NODE)
+            if nodes.kinds[right] == NodeKind.NEGATE:
+                return nodes.add_node(NodeKind.ADD, left, nodes.left[right])
+        case NodeKind.MULTIPLY:
+            if nodes.is_number(right, 1) or (
+                nodes.is_number(left, 0) and not nodes.divides[right]
+            ):
+                return left
+            if nodes.is_number(left, 1) or (
+                nodes.is_number(right, 0) and not nodes.divides[left]
+            ):
+                return right
+        case NodeKind.DIVIDE:
+            if nodes.is_number(right, 1):
+                return left
+    return nodes.add_node(kind, left, right)
+
+
+def _precedence(nodes: _Simplified, node: int) -> int:
+    kind = nodes.kinds[node]
+    if kind == NodeKind.NUMBER and nodes.values[node] < 0:
+        return PRECEDENCE[NodeKind.NEGATE]
+    if kind in LEAF_KINDS:
+        return PRECEDENCE[NodeKind.NEGATE] + 1
+    return PRECEDENCE[kind]
+
+
+def _render(nodes: _Simplified, root: int) -> str:
+    """Print nodes with only the parentheses needed to parse them back
+    into the same tree.
+
+    A unary minus is only allowed at the start of the expression or right
+    after '(', so it is wrapped into parentheses anywhere else.
+    """
+    pieces = []
+    # Items are either text or a node with whether it is printed at the
+    # start of the expression or right after '('
+    stack: list[str | tuple[int, bool]] = [(root, True)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            pieces.append(item)
+            continue
+        node, at_start = item
+        kind = nodes.kinds[node]
+        precedence = _precedence(nodes, node)
+        if kind == NodeKind.IDENTIFIER:
+            tasks = [nodes.lexemes[node]]
+        elif kind == NodeKind.NUMBER and nodes.values[node] >= 0:
+            lexeme = nodes.lexemes[node]
+            tasks = [lexeme or format_number(nodes.values[node])]
+        elif kind == NodeKind.NUMBER:
+            tasks = [MINUS_SIGN, format_number(-nodes.values[node])]
+        elif kind == NodeKind.NEGATE:
+            operand = nodes.left[node]
+            if nodes.kinds[operand] in LEAF_KINDS:
+                tasks = [MINUS_SIGN, (operand, False)]
+            else:
+                tasks = [
+                    MINUS_SIGN,
+                    OPENING_PARENTHESIS,
+                    (operand, True),
+                    CLOSING_PARENTHESIS,
+                ]
+        else:
+            left, right = nodes.left[node], nodes.right[node]
+            if _precedence(nodes, left) < precedence:
+                tasks = [
+                    OPENING_PARENTHESIS, (left, True), CLOSING_PARENTHESIS
+                ]
+            else:
+                tasks = [(left, at_start)]
+            tasks.append(_OPERATOR_LEXEMES[kind])
+            if _precedence(nodes, right) <= precedence:
+                tasks += [
+                    OPENING_PARENTHESIS, (right, True), CLOSING_PARENTHESIS
+                ]
+            else:
+                tasks.append((right, False))
+        if precedence == PRECEDENCE[NodeKind.NEGATE] and not at_start:
+            tasks = [OPENING_PARENTHESIS, *tasks, CLOSING_PARENTHESIS]
+        stack.extend(reversed(tasks))
+    return "".join(pieces)
+
+
+def simplify(tree: ExpressionTree) -> SimplificationResult:
+    """Fold numbers and apply algebraic rules to a tree.
+
+    Operations on numbers are folded, `x+0`, `x-0`, `x*1`, `x/1` become
+    `x`, `0*x` becomes `0` unless `x` contains a division, `0-x` becomes
+    `-x`, and double unary minuses cancel out. Division by a zero is left
+    in place and reported at its '/'. The result is printed with minimal
+    parentheses and tokenized again.
+    """
+    nodes = _Simplified()
+    simplified = [NO_NODE] * len(tree)
+    divisions_by_zero = []
+    for node, kind in enumerate(tree.kinds):
+        if kind == NodeKind.IDENTIFIER:
+            simplified[node] = nodes.add_node(
+                NodeKind.IDENTIFIER, lexeme=tree.lexeme(node)
+            )
+        elif kind == NodeKind.NUMBER:
+            lexeme = tree.lexeme(node)
+            simplified[node] = nodes.add_node(
+                NodeKind.NUMBER, lexeme=lexeme, value=number_value(lexeme)
+            )
+        else:
+            left = simplified[tree.left[node]]
+            right = (
+                simplified[tree.right[node]]
+                if tree.right[node] != NO_NODE else NO_NODE
+            )
+            if kind == NodeKind.DIVIDE and nodes.is_number(right, 0):
+                divisions_by_zero.append(
+                    DivisionByZeroError(tree.position(node))
+                )
+            simplified[node] = _simplify_node(
+                nodes, NodeKind(kind), left, right
+            )
+
+    root = simplified[tree.root]
+    expression = _render(nodes, root)
+    tokens, _ = tokenize_stream(expression)
+    return SimplificationResult(
+        expression=expression,
+        tokens=tokens,
+        removed_operations_count=(
+            sum(kind not in LEAF_KINDS for kind in tree.kinds) -
+            nodes.operations_count(root)
+        ),
+        divisions_by_zero=divisions_by_zero,
+    )
+
+
+def simplify_expression(expression: str) -> SimplificationResult:
+    """Validate and simplify an expression."""
+    return simplify(parse_expression(expression))
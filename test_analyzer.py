@@ -1,9 +1,25 @@
 import itertools as it
+import pickle
+import random
 from unittest import TestCase
 
-from analyzer import analyze
+from analyzer import (
+    ReferenceSyntaxAnalyzer,
+    SyntaxAnalyzer,
+    SyntaxErrorKind,
+    SyntaxErrorRecords,
+    analyze,
+    iter_analyze,
+)
 from test_tokenizer import parametrize
-from tokenizer import TokenType, tokenize
+from tokenizer import (
+    Position,
+    TokenType,
+    iter_tokenize,
+    tokenize,
+    tokenize_stream,
+)
+from validation import validate_expression
 
 OPERATION_TO_TOKEN_TYPE = {
     "+": TokenType.ADDITION_OPERATOR,
@@ -138,3 +154,146 @@ class TestAnalyzer(TestCase):
         errors = analyze(tokens)
         self.assertTrue(str(error_message) in str(errors[0]))
 
+
+    @parametrize(
+        "expression", [("a+b",), (")a+b(",), ("a++(b*)",), ("2(x-)",)]
+    )
+    def test_accepts_token_stream(self, expression: str) -> None:
+        stream, _ = tokenize_stream(expression)
+        tokens, _ = tokenize(expression)
+        self.assertEqual(
+            [str(error) for error in analyze(stream)],
+            [str(error) for error in analyze(tokens)]
+        )
+
+    def test_empty_expression_is_reported(self) -> None:
+        tokens, _ = tokenize(" $ ")
+        errors = analyze(tokens)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].kind, SyntaxErrorKind.EMPTY_EXPRESSION)
+
+
+class TestAnalyzerMatchesReference(TestCase):
+    ALPHABET = "ab1.+-*/()"
+
+    def test_random_expressions(self) -> None:
+        rng = random.Random(7)
+        for _ in range(1000):
+            expression = "".join(
+                rng.choices(self.ALPHABET, k=rng.randint(1, 30))
+            )
+            tokens, _ = tokenize(expression)
+            if not tokens:
+                continue
+            with self.subTest(expression=expression):
+                self.assertEqual(
+                    [str(error) for error in analyze(tokens)],
+                    [
+                        str(error)
+                        for error in ReferenceSyntaxAnalyzer(tokens).analyze()
+                    ]
+                )
+
+
+class TestIterAnalyze(TestCase):
+    @parametrize(
+        "expression",
+        [("a+b",), ("",), (")a+(b",), ("(a$+)*(",), ("1.+c",), ("((x)))-",)]
+    )
+    def test_reports_same_errors_as_analyze(self, expression: str) -> None:
+        errors = list(iter_analyze(iter_tokenize([expression])))
+        tokens, tokenization_errors = tokenize(expression)
+        expected_errors = [*tokenization_errors, *analyze(tokens)]
+        self.assertEqual(
+            sorted(str(error) for error in errors),
+            sorted(str(error) for error in expected_errors)
+        )
+
+    def test_reports_errors_as_soon_as_found(self) -> None:
+        errors = iter_analyze(iter_tokenize(["a+*b)", "+c"]))
+        self.assertEqual(
+            next(errors).kind, SyntaxErrorKind.INVALID_FOLLOW
+        )
+        self.assertEqual(
+            next(errors).kind, SyntaxErrorKind.UNMATCHED_CLOSING_PARENTHESIS
+        )
+
+
+class TestMaxErrors(TestCase):
+    ALPHABET = "ab1.$+-*/()"
+
+    def test_reports_first_errors(self) -> None:
+        rng = random.Random(11)
+        for _ in range(300):
+            expression = "".join(
+                rng.choices(self.ALPHABET, k=rng.randint(0, 30))
+            )
+            errors = [
+                str(error) for error in validate_expression(expression).errors
+            ]
+            for max_errors in range(1, len(errors) + 2):
+                with self.subTest(
+                    expression=expression, max_errors=max_errors
+                ):
+                    result = validate_expression(expression, max_errors)
+                    self.assertEqual(
+                        [str(error) for error in result.errors],
+                        errors[:max_errors]
+                    )
+
+    def test_tokenizer_stops_at_limit(self) -> None:
+        tokens, errors = tokenize_stream("a$b$c", max_errors=1)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual([token.lexeme for token in tokens], ["a"])
+
+
+class TestSyntaxErrorRecords(TestCase):
+    def test_keeps_kinds_and_positions(self) -> None:
+        tokens, _ = tokenize_stream("+a*/b)")
+        records = SyntaxAnalyzer(tokens).analyze_records()
+        self.assertEqual(
+            [records.kind(index) for index in range(len(records))],
+            [
+                SyntaxErrorKind.INVALID_START,
+                SyntaxErrorKind.INVALID_FOLLOW,
+                SyntaxErrorKind.UNMATCHED_CLOSING_PARENTHESIS,
+            ]
+        )
+        self.assertEqual(
+            [records.position(index) for index in range(len(records))],
+            [Position(0, 0), Position(3, 3), Position(5, 5)]
+        )
+        self.assertEqual(
+            [str(error) for error in records[1:]],
+            [str(error) for error in analyze(tokens)[1:]]
+        )
+
+    def test_empty_expression_has_no_position(self) -> None:
+        tokens, _ = tokenize_stream("")
+        records = SyntaxAnalyzer(tokens).analyze_records()
+        self.assertEqual(records.kind(0), SyntaxErrorKind.EMPTY_EXPRESSION)
+        self.assertIsNone(records.position(0))
+
+    def test_validation_keeps_records(self) -> None:
+        result = validate_expression("+a*/b)")
+        records = result.syntax_analysis_errors
+        self.assertIsInstance(records, SyntaxErrorRecords)
+        self.assertEqual(len(records), 3)
+        self.assertEqual(
+            [str(error) for error in records],
+            [str(error) for error in analyze(result.tokens)]
+        )
+
+    def test_analyze_keeps_errors(self) -> None:
+        tokens, _ = tokenize_stream("a+)")
+        analyzer = SyntaxAnalyzer(tokens)
+        self.assertIs(analyzer.analyze(), analyzer.errors)
+        self.assertEqual(len(analyzer.errors), 2)
+
+    def test_errors_survive_pickling(self) -> None:
+        result = validate_expression("(a$+)")
+        for error in result.errors:
+            with self.subTest(error=str(error)):
+                self.assertEqual(
+                    str(pickle.loads(pickle.dumps(error))), str(error)
+                )
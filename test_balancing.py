@@ -0,0 +1,94 @@
+import random
+from unittest import TestCase
+
+from balancing import balance, check_equivalence, operations_per_level
+from compiler import compile_tree
+from parser import NO_NODE, NodeKind, parse_expression
+from test_simplifier import _random_expression
+from test_tokenizer import parametrize
+
+
+class TestBalance(TestCase):
+    @parametrize(
+        "expression,expected_height",
+        [
+            ("+".join(f"a{i}" for i in range(16)), 4),
+            ("*".join(f"a{i}" for i in range(1000)), 10),
+            ("a-b-c-d-e-f-g-h", 3),
+            ("a-b+c*d", 2),
+            ("a-b-c+d*e*f", 3),
+            ("(-c)-(0/a)", 2),
+            ("c-0.0-a-0.0+0*3.5*a/(b)", 3),
+            ("a/b/c/d/e/f/g/h", 3),
+            ("-a-b-c-d", 3),
+            ("a*b+c*d-e/f/g+h", 4),
+        ]
+    )
+    def test_reduces_height(
+        self, expression: str, expected_height: int
+    ) -> None:
+        tree = parse_expression(expression)
+        result = balance(tree)
+        self.assertEqual(result.height_before, tree.heights()[tree.root])
+        self.assertEqual(result.height_after, expected_height)
+        self.assertEqual(
+            result.height_after, result.tree.heights()[result.tree.root]
+        )
+        self.assertTrue(check_equivalence(tree, result.tree))
+
+    @parametrize(
+        "expression",
+        [
+            ("a",),
+            ("-(-a)",),
+            ("-(a+b)*c/(d-(-e))",),
+            ("(a+b)/(c*(d/e))-f*(g-h)",),
+            ("a-(b-(c-(d-e)))+2.5*x/3",),
+            ("x/(y-y)",),
+        ]
+    )
+    def test_keeps_value(self, expression: str) -> None:
+        tree = parse_expression(expression)
+        self.assertTrue(check_equivalence(tree, balance(tree).tree))
+
+    def test_never_increases_height(self) -> None:
+        rng = random.Random(3)
+        for _ in range(300):
+            expression = _random_expression(rng, 6)
+            tree = parse_expression(expression)
+            result = balance(tree)
+            with self.subTest(expression=expression):
+                self.assertLessEqual(
+                    result.height_after, result.height_before
+                )
+                self.assertTrue(check_equivalence(tree, result.tree))
+
+    def test_reports_operations_per_level(self) -> None:
+        tree = parse_expression("a+b+c+d+e")
+        result = balance(tree)
+        self.assertEqual(result.operations_per_level_before, [1, 1, 1, 1])
+        self.assertEqual(result.operations_per_level_after, [2, 1, 1])
+        self.assertEqual(operations_per_level(parse_expression("a")), [])
+
+    def test_balances_long_chains_without_recursion(self) -> None:
+        terms = 50_000
+        tree = parse_expression("-".join(f"a{i % 10}" for i in range(terms)))
+        result = balance(tree)
+        self.assertEqual(result.height_before, terms - 1)
+        self.assertLessEqual(result.height_after, 17)
+        self.assertTrue(check_equivalence(tree, result.tree, trials=3))
+
+    def test_keeps_division_positions(self) -> None:
+        tree = balance(parse_expression("a/b/c")).tree
+        divisions = [
+            node for node in range(len(tree))
+            if tree.kinds[node] == NodeKind.DIVIDE
+        ]
+        self.assertEqual(len(divisions), 1)
+        self.assertNotEqual(tree.token_indices[divisions[0]], NO_NODE)
+        self.assertEqual(compile_tree(tree)(6, 1, 2), 3)
+
+    def test_detects_different_trees(self) -> None:
+        self.assertFalse(check_equivalence(
+            parse_expression("a-b"), parse_expression("b-a")
+        ))
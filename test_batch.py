@@ -0,0 +1,78 @@
+import contextlib
+import io
+import json
+from unittest import TestCase
+
+import main
+from batch import validate_batch, validation_record
+from cache import ValidationCache
+from test_tokenizer import parametrize
+
+EXPRESSIONS = ["a+b", "(a+b", "1.+c", "", "x*(y-2.5)/z"] * 7
+
+
+class TestValidationRecord(TestCase):
+    def test_valid_expression(self) -> None:
+        record = validation_record(3, "a*(b+1)")
+        self.assertEqual(record, {"line": 3, "valid": True, "errors": []})
+
+    def test_reports_error_positions(self) -> None:
+        record = validation_record(1, "a$+(b")
+        self.assertFalse(record["valid"])
+        self.assertEqual(
+            [(error["start"], error["stop"]) for error in record["errors"]],
+            [(1, 1), (3, 3)]
+        )
+
+
+class TestValidateBatch(TestCase):
+    @parametrize("workers,chunk_size", [(1, 3), (2, 4)])
+    def test_writes_records_in_input_order(
+        self, workers: int, chunk_size: int
+    ) -> None:
+        lines = io.StringIO("\n".join(EXPRESSIONS) + "\n")
+        output = io.StringIO()
+        summary = validate_batch(lines, output, workers, chunk_size)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(
+            records,
+            [
+                validation_record(line_number, expression)
+                for line_number, expression in enumerate(EXPRESSIONS, 1)
+            ]
+        )
+        self.assertEqual(summary.expressions_count, len(EXPRESSIONS))
+        self.assertEqual(
+            summary.invalid_expressions_count,
+            sum(not record["valid"] for record in records)
+        )
+
+    def test_uses_cache_in_worker_processes(self) -> None:
+        lines = io.StringIO("\n".join(EXPRESSIONS))
+        output = io.StringIO()
+        cache = ValidationCache(max_entries=10, normalize_whitespace=True)
+        validate_batch(lines, output, 2, 4, cache)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(
+            records,
+            [
+                validation_record(line_number, expression)
+                for line_number, expression in enumerate(EXPRESSIONS, 1)
+            ]
+        )
+
+    @parametrize(
+        "workers,chunk_size",
+        [(0, 1), (-1, 1), (1, 0), (None, -2)]
+    )
+    def test_rejects_non_positive_sizes(
+        self, workers: int | None, chunk_size: int
+    ) -> None:
+        with self.assertRaises(ValueError):
+            validate_batch(["a"], io.StringIO(), workers, chunk_size)
+        argv = ["--batch", "-", "--chunk-size", str(chunk_size)]
+        if workers is not None:
+            argv += ["--workers", str(workers)]
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                main.parse_args(argv)
@@ -0,0 +1,98 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+from unittest import TestCase
+
+from benchmark import (
+    PHASES,
+    SHAPES,
+    BenchmarkCase,
+    BenchmarkResult,
+    compare,
+    generate_cases,
+    generate_expression,
+    load_results,
+    run,
+    run_benchmarks,
+    save_results,
+)
+from validation import validate_expression
+
+
+def _result(case: str, seconds: float) -> BenchmarkResult:
+    return BenchmarkResult(case, "tokenize", seconds, 1.0, 1.0, 0)
+
+
+class TestGenerateExpression(TestCase):
+    def test_is_reproducible(self) -> None:
+        self.assertEqual(
+            [case.source_code for case in generate_cases(3, 50)],
+            [case.source_code for case in generate_cases(3, 50)]
+        )
+
+    def test_generates_valid_expressions(self) -> None:
+        rng = random.Random(1)
+        for shape in SHAPES:
+            for size in (1, 7, 8, 100):
+                expression = generate_expression(rng, shape, size)
+                with self.subTest(shape=shape, size=size):
+                    self.assertTrue(validate_expression(expression).is_valid)
+
+    def test_injects_errors(self) -> None:
+        rng = random.Random(1)
+        for shape in SHAPES:
+            expression = generate_expression(rng, shape, 100, 0.5)
+            with self.subTest(shape=shape):
+                self.assertGreater(
+                    len(validate_expression(expression).errors), 10
+                )
+
+
+class TestBenchmarks(TestCase):
+    def test_measures_every_phase(self) -> None:
+        results = run_benchmarks([BenchmarkCase("tiny", "a+b*(c-1)")], 1)
+        self.assertEqual([result.phase for result in results], list(PHASES))
+        for result in results:
+            self.assertGreater(result.seconds, 0)
+            self.assertGreater(result.tokens_per_second, 0)
+
+    def test_keeps_main_output_off_the_terminal(self) -> None:
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with (
+            contextlib.redirect_stdout(stdout),
+            contextlib.redirect_stderr(stderr),
+        ):
+            run_benchmarks([BenchmarkCase("invalid", "a+*b$")], 1)
+        self.assertEqual((stdout.getvalue(), stderr.getvalue()), ("", ""))
+
+    def test_compares_with_baseline(self) -> None:
+        baseline = [_result("a", 1.0), _result("b", 1.0)]
+        results = [_result("a", 1.05), _result("b", 1.2), _result("c", 9.0)]
+        regressions = compare(results, baseline, threshold=0.1)
+        self.assertEqual(
+            [(regression.case, regression.ratio) for regression in
+             regressions],
+            [("b", 1.2)]
+        )
+
+    def test_saves_results(self) -> None:
+        results = [_result("a", 0.5)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            save_results(results, path, seed=3, size=10)
+            saved = load_results(path)
+        self.assertEqual(
+            (saved.results, saved.seed, saved.size), (results, 3, 10)
+        )
+
+    def test_refuses_baseline_of_other_cases(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            save_results([_result("a", 0.5)], path, seed=0, size=10)
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                exit_code = run(["--size", "20", "--baseline", path])
+        self.assertEqual(exit_code, 2)
+        self.assertIn("size 10", stderr.getvalue())
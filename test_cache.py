@@ -0,0 +1,97 @@
+import pickle
+import random
+from unittest import TestCase
+
+from cache import ValidationCache, normalize_whitespace
+from test_tokenizer import parametrize
+from validation import ValidationResult, validate_expression
+
+
+def _describe(result: ValidationResult) -> tuple:
+    return (
+        list(result.tokens),
+        [
+            (str(error), error.position, error.last_visited_position)
+            for error in result.tokenization_errors
+        ],
+        [str(error) for error in result.syntax_analysis_errors],
+    )
+
+
+class TestNormalizeWhitespace(TestCase):
+    @parametrize(
+        "source_code,expected_result",
+        [
+            ("a + b", "a+b"),
+            ("  ( a1 *\t2 ) ", "(a1*2)"),
+            ("a b", "a b"),
+            ("1. 5", "1. 5"),
+            ("1 \n .5", "1 .5"),
+        ]
+    )
+    def test_keeps_only_separating_whitespace(
+        self, source_code: str, expected_result: str
+    ) -> None:
+        normalized, _ = normalize_whitespace(source_code)
+        self.assertEqual(normalized, expected_result)
+
+
+class TestValidationCache(TestCase):
+    def test_counts_hits_and_misses(self) -> None:
+        cache = ValidationCache(max_entries=10)
+        for expression in ["a+b", "a*b", "a+b", "a+b"]:
+            cache.validate(expression)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_evicts_least_recently_used_entries(self) -> None:
+        cache = ValidationCache(max_entries=2)
+        for expression in ["a", "b", "a", "c", "a"]:
+            cache.validate(expression)
+        self.assertEqual(cache.evictions, 1)
+        cache.validate("b")
+        self.assertEqual(cache.misses, 4)
+
+    def test_evicts_entries_above_bytes_limit(self) -> None:
+        cache = ValidationCache(max_bytes=8)
+        for expression in ["a+b", "c+d", "e+f", "too+long+to+cache"]:
+            cache.validate(expression)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.total_bytes, 6)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_cached_tokens_are_read_only(self) -> None:
+        cache = ValidationCache(max_entries=1)
+        tokens, _ = cache.tokenize("a+b")
+        with self.assertRaises(TypeError):
+            tokens.starts[0] = 1
+
+    def test_normalized_entries_report_own_positions(self) -> None:
+        cache = ValidationCache(max_entries=100, normalize_whitespace=True)
+        rng = random.Random(42)
+        templates = ["a+b*(c-1.5)", "(x 1.+)", "$ y z ) ("]
+        keys = set()
+        for _ in range(200):
+            expression = "".join(
+                char + " " * rng.choice([0, 0, 1, 3])
+                for char in rng.choice(templates)
+            )
+            keys.add(normalize_whitespace(expression)[0])
+            with self.subTest(expression=expression):
+                self.assertEqual(
+                    _describe(cache.validate(expression)),
+                    _describe(validate_expression(expression))
+                )
+        self.assertEqual(cache.misses, len(keys))
+        self.assertGreater(cache.hits, cache.misses)
+
+    def test_pickles_into_empty_cache(self) -> None:
+        cache = ValidationCache(3, 100, True)
+        cache.validate("a+b")
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(len(copy), 0)
+        self.assertEqual(
+            (copy.max_entries, copy.max_bytes, copy.normalize_whitespace),
+            (3, 100, True)
+        )
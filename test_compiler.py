@@ -0,0 +1,120 @@
+import random
+import sys
+from unittest import TestCase, skipUnless
+
+from compiler import (
+    CompiledExpressionCache,
+    DivisionByZeroError,
+    compile_expression,
+    compile_tokens,
+    interpret,
+    number_value,
+)
+from parser import parse_expression
+from test_tokenizer import parametrize
+from tokenizer import Position, tokenize
+
+
+class TestCompileExpression(TestCase):
+    @parametrize(
+        "expression,bindings,expected_result",
+        [
+            ("a+b*c", {"a": 1, "b": 2, "c": 3}, 7),
+            ("a-b-c", {"a": 10, "b": 2, "c": 3}, 5),
+            ("-a*b+c", {"a": 2, "b": 3, "c": 1}, -5),
+            ("(a+b)/(-c)", {"a": 1, "b": 3, "c": 2}, -2.0),
+            ("x*x-007+1.50", {"x": 3}, 3.5),
+            ("if+lambda", {"if": 1, "lambda": 2}, 3),
+        ]
+    )
+    def test_evaluates(
+        self, expression: str, bindings: dict, expected_result: float
+    ) -> None:
+        compiled = compile_expression(expression)
+        self.assertEqual(compiled.evaluate(bindings), expected_result)
+        self.assertEqual(
+            interpret(parse_expression(expression), bindings),
+            expected_result
+        )
+
+    def test_takes_identifiers_in_order_of_appearance(self) -> None:
+        compiled = compile_expression("b*a+b-c")
+        self.assertEqual(compiled.identifiers, ("b", "a", "c"))
+        self.assertEqual(compiled(2, 3, 4), 4)
+
+    def test_matches_interpreter(self) -> None:
+        rng = random.Random(12)
+        expression = "(a+b*2.5)/(c-d)-(-(a*d)+3)*b/(c+1)"
+        compiled = compile_expression(expression)
+        tree = parse_expression(expression)
+        for _ in range(100):
+            bindings = {name: rng.uniform(-10, 10) for name in "abcd"}
+            self.assertEqual(
+                compiled.evaluate(bindings), interpret(tree, bindings)
+            )
+
+    def test_compiles_tokens(self) -> None:
+        tokens, _ = tokenize("a/2")
+        self.assertEqual(compile_tokens(tokens)(5), 2.5)
+
+    @parametrize(
+        "expression,bindings,expected_position",
+        [
+            ("a/b", {"a": 1, "b": 0}, Position(1, 1)),
+            ("a + b/(c-c)", {"a": 1, "b": 2, "c": 3.5}, Position(5, 5)),
+            ("1/2/(a*0)", {"a": 7}, Position(3, 3)),
+        ]
+    )
+    def test_reports_division_by_zero_position(
+        self, expression: str, bindings: dict, expected_position: Position
+    ) -> None:
+        with self.assertRaises(DivisionByZeroError) as context:
+            compile_expression(expression).evaluate(bindings)
+        self.assertEqual(context.exception.position, expected_position)
+        self.assertIsInstance(context.exception, ZeroDivisionError)
+
+    def test_interprets_deep_nesting(self) -> None:
+        depth = 10_000
+        compiled = compile_expression("(" * depth + "a" + "+b)" * depth)
+        self.assertEqual(compiled(1, 2), 1 + 2 * depth)
+        with self.assertRaises(DivisionByZeroError) as context:
+            compile_expression("(" * depth + "a" + "/b)" * depth)(1, 0)
+        self.assertEqual(
+            context.exception.position, Position(depth + 1, depth + 1)
+        )
+
+    @skipUnless(sys.get_int_max_str_digits(), "int conversion is unlimited")
+    def test_approximates_numbers_too_long_for_int(self) -> None:
+        digits = "9" * (sys.get_int_max_str_digits() + 1)
+        self.assertEqual(number_value(digits), float("inf"))
+        self.assertEqual(number_value("1" + "0" * 400), 10 ** 400)
+        expression = compile_expression("a+" + digits)
+        self.assertEqual(expression(1), float("inf"))
+        self.assertEqual(
+            interpret(expression.tree, {"a": 1}), float("inf")
+        )
+
+    def test_rejects_invalid_expression(self) -> None:
+        with self.assertRaises(ExceptionGroup):
+            compile_expression("a*/b")
+
+
+class TestCompiledExpressionCache(TestCase):
+    def test_reuses_compiled_expressions(self) -> None:
+        cache = CompiledExpressionCache(max_entries=2)
+        compiled = cache.compile("a+1")
+        self.assertIs(cache.compile("a+1"), compiled)
+        cache.compile("a+2")
+        cache.compile("a+3")
+        self.assertIsNot(cache.compile("a+1"), compiled)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(
+            cache.stats(),
+            {
+                "entries": 2,
+                "hits": 1,
+                "misses": 4,
+                "evictions": 2,
+                "hit_rate": 0.2,
+            }
+        )
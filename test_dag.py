@@ -0,0 +1,66 @@
+import random
+from unittest import TestCase
+
+from compiler import DivisionByZeroError, interpret
+from dag import build_dag, build_expressions_dag
+from parser import parse_expression
+from tokenizer import Position
+
+
+class TestExpressionDag(TestCase):
+    def test_shares_common_subexpressions(self) -> None:
+        dag = build_expressions_dag(["(a+b)*c + (a+b)*d - (a+b)/e"])
+        # a, b, a+b, c, *, d, *, +, e, /, -
+        self.assertEqual(len(dag), 11)
+        a_plus_b = dag.left[dag.left[dag.left[dag.roots[0]]]]
+        self.assertEqual(dag.reuse_counts[a_plus_b], 2)
+        stats = dag.stats()
+        self.assertEqual(stats.tree_nodes_count, 17)
+        self.assertEqual(stats.dag_nodes_count, 11)
+        self.assertAlmostEqual(stats.reduction, 6 / 17)
+
+    def test_shares_commutative_operands_when_asked(self) -> None:
+        expressions = ["a+b", "b+a", "a*b-b*a", "a-b", "b-a"]
+        self.assertEqual(len(build_expressions_dag(expressions)), 9)
+        dag = build_expressions_dag(expressions, commutative=True)
+        # a, b, a+b, a*b, a*b-a*b, a-b, b-a
+        self.assertEqual(len(dag), 7)
+        self.assertEqual(dag.roots[0], dag.roots[1])
+
+    def test_shares_across_batch(self) -> None:
+        dag = build_expressions_dag(["x*y+1", "x*y-1", "2*(x*y)"])
+        # x, y, x*y and 1
+        self.assertEqual(dag.stats().reused_nodes_count, 4)
+        self.assertEqual(dag.evaluate({"x": 2, "y": 3}), [7, 5, 12])
+
+    def test_schedules_operands_first(self) -> None:
+        dag = build_expressions_dag(["(a-b)*(a-b)/(-(a-b))"])
+        schedule = dag.schedule()
+        self.assertEqual(len(schedule), 4)
+        scheduled = set()
+        for node in schedule:
+            for child in (dag.left[node], dag.right[node]):
+                if child in schedule:
+                    self.assertIn(child, scheduled)
+            scheduled.add(node)
+
+    def test_evaluates_like_trees(self) -> None:
+        rng = random.Random(5)
+        expressions = [
+            "(a+b)*c + (a+b)*d - (a+b)/e",
+            "-(a+b)*(c+d)+(d+c)/(b+a)",
+            "a*b*c+a*b*d+e",
+        ]
+        trees = [parse_expression(expression) for expression in expressions]
+        for commutative in (False, True):
+            dag = build_dag(trees, commutative)
+            for _ in range(20):
+                bindings = {name: rng.uniform(1, 2) for name in "abcde"}
+                for value, tree in zip(dag.evaluate(bindings), trees):
+                    self.assertAlmostEqual(value, interpret(tree, bindings))
+
+    def test_reports_division_by_zero_position(self) -> None:
+        dag = build_expressions_dag(["a+1", "a/(b-b)"])
+        with self.assertRaises(DivisionByZeroError) as context:
+            dag.evaluate({"a": 1, "b": 2})
+        self.assertEqual(context.exception.position, Position(1, 1))
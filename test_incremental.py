@@ -0,0 +1,66 @@
+import random
+from unittest import TestCase
+
+from incremental import ValidationSession
+from test_tokenizer import parametrize
+from validation import validate_expression
+
+
+class TestValidationSession(TestCase):
+    def test_matches_full_validation_after_random_edits(self) -> None:
+        rng = random.Random(9)
+        source_code = "".join(rng.choices("ab1.+-*/() ", k=300))
+        session = ValidationSession(source_code, block_size=16)
+        for _ in range(500):
+            offset = rng.randint(0, len(source_code))
+            deleted_length = rng.randint(0, min(5, len(source_code) - offset))
+            inserted_text = "".join(
+                rng.choices("ab1.+-*/() $", k=rng.randint(0, 6))
+            )
+            source_code = (
+                source_code[:offset] +
+                inserted_text +
+                source_code[offset+deleted_length:]
+            )
+            session.edit(offset, deleted_length, inserted_text)
+            with self.subTest(source_code=source_code):
+                self._assert_matches_full_validation(session, source_code)
+
+    @parametrize(
+        "source_code,edit,expected_source_code",
+        [
+            ("", (0, 0, "a+b"), "a+b"),
+            ("ab+c", (1, 2, ""), "ac"),
+            ("1 + 2", (1, 3, ""), "12"),
+            ("(a+b)", (0, 5, ""), ""),
+        ]
+    )
+    def test_edits(
+        self, source_code: str, edit: tuple, expected_source_code: str
+    ) -> None:
+        session = ValidationSession(source_code, block_size=1)
+        session.edit(*edit)
+        self.assertEqual(session.source_code, expected_source_code)
+        self._assert_matches_full_validation(session, expected_source_code)
+
+    def test_rejects_edits_out_of_source_code(self) -> None:
+        session = ValidationSession("a+b")
+        with self.assertRaises(ValueError):
+            session.edit(2, 2, "")
+
+    def _assert_matches_full_validation(
+        self, session: ValidationSession, source_code: str
+    ) -> None:
+        expected_result = validate_expression(source_code)
+        self.assertEqual(session.source_code, source_code)
+        self.assertEqual(list(session.tokens), list(expected_result.tokens))
+        self.assertEqual(
+            [
+                (str(error), getattr(error, "last_visited_position", None))
+                for error in session.errors
+            ],
+            [
+                (str(error), getattr(error, "last_visited_position", None))
+                for error in expected_result.errors
+            ]
+        )
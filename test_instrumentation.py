@@ -0,0 +1,96 @@
+import contextlib
+import io
+import json
+import os
+import pstats
+import tempfile
+from unittest import TestCase
+
+import instrumentation
+import main
+from instrumentation import MetricsCollector, Observer, observing
+from utils import format_tokens
+from validation import validate_expression
+from worker import ValidationWorker
+
+
+class TestObserver(TestCase):
+    def test_is_disabled_by_default(self) -> None:
+        self.assertIsNone(instrumentation.observer)
+
+    def test_records_phases_tokens_and_errors(self) -> None:
+        with observing(MetricsCollector()) as collector:
+            result = validate_expression("a+1.5*$ (")
+            format_tokens(result.tokens)
+        self.assertIsNone(instrumentation.observer)
+        self.assertEqual(
+            dict(collector.phase_calls),
+            {"tokenize": 1, "analyze.scan": 1, "analyze.report": 1,
+             "format": 1}
+        )
+        self.assertEqual(collector.input_sizes["tokenize"], 9)
+        self.assertEqual(
+            dict(collector.token_counts),
+            {"identifier": 1, "addition_operator": 1, "number": 1,
+             "multiplication_operator": 1, "opening_parenthesis": 1}
+        )
+        self.assertEqual(
+            dict(collector.error_counts),
+            {"unsupported_lexeme": 1, "invalid_end": 1,
+             "unclosed_opening_parenthesis": 1}
+        )
+
+    def test_restores_previous_observer(self) -> None:
+        outer = Observer()
+        with observing(outer):
+            with observing(MetricsCollector()):
+                pass
+            self.assertIs(instrumentation.observer, outer)
+
+    def test_exports_prometheus_text(self) -> None:
+        with observing(MetricsCollector()) as collector:
+            validate_expression('a+"')
+        lines = collector.prometheus().splitlines()
+        self.assertIn(
+            "# TYPE expressions_phase_seconds_total counter", lines
+        )
+        self.assertIn('expressions_tokens_total{type="identifier"} 1', lines)
+        self.assertIn(
+            'expressions_errors_total{kind="unsupported_lexeme"} 1', lines
+        )
+
+
+class TestProfiling(TestCase):
+    def test_prints_summary_and_dumps_statistics(self) -> None:
+        path = os.path.join(tempfile.mkdtemp(), "main.prof")
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with (
+            contextlib.redirect_stdout(stdout),
+            contextlib.redirect_stderr(stderr),
+        ):
+            main.main(["--profile", "--profile-output", path, "a*(b-2)"])
+        self.assertIn("completely valid", stdout.getvalue())
+        self.assertIn("output", stderr.getvalue())
+        self.assertIn("Tokens of type identifier: 2", stderr.getvalue())
+        self.assertGreater(pstats.Stats(path).total_calls, 0)
+        self.assertIsNone(instrumentation.observer)
+
+    def test_profile_flag_before_expression(self) -> None:
+        stdout = io.StringIO()
+        with (
+            contextlib.redirect_stdout(stdout),
+            contextlib.redirect_stderr(io.StringIO()),
+        ):
+            main.main(["--profile", "a*b"])
+        self.assertIn("completely valid: 'a*b'", stdout.getvalue())
+
+    def test_worker_answers_metrics(self) -> None:
+        with observing(MetricsCollector()) as collector:
+            worker = ValidationWorker(metrics=collector)
+            worker.handle('{"expression": "a+b"}')
+            response = json.loads(worker.handle('{"command": "metrics"}'))
+        lines = response["metrics"].splitlines()
+        self.assertIn("expressions_requests_total 1", lines)
+        self.assertIn(
+            'expressions_phase_calls_total{phase="tokenize"} 1', lines
+        )
@@ -0,0 +1,61 @@
+import os
+import random
+import tempfile
+from unittest import TestCase, mock
+
+from analyzer import analyze
+from mapped_file import validate_file
+from test_tokenizer import parametrize
+from tokenizer import tokenize
+
+
+class TestValidateFile(TestCase):
+    @parametrize(
+        "source_code",
+        [
+            ("",),
+            ("a + b*(c1 - 2.5)\n",),
+            (")a++(b 1. $ (\x1c",),
+            ("x٣ + ٣.5 - é",),
+        ]
+    )
+    def test_matches_tokenize_and_analyze(self, source_code: str) -> None:
+        self._assert_same_result(source_code)
+
+    def test_random_sources(self) -> None:
+        rng = random.Random(11)
+        for _ in range(100):
+            source_code = "".join(
+                rng.choices("ab1.+-*/() \n$", k=rng.randint(0, 60))
+            )
+            with self.subTest(source_code=source_code):
+                self._assert_same_result(source_code)
+
+    def test_random_non_ascii_sources_in_segments(self) -> None:
+        rng = random.Random(17)
+        with mock.patch("mapped_file._SEGMENT_SIZE", 3):
+            for _ in range(100):
+                source_code = "".join(
+                    rng.choices("aé1٣.+-*/() \n$", k=rng.randint(1, 60))
+                )
+                with self.subTest(source_code=source_code):
+                    self._assert_same_result(source_code)
+
+    def test_reports_malformed_utf8_as_unsupported(self) -> None:
+        self._assert_same_result("a+\ufffd-(b", "a+\xff-(b".encode("latin-1"))
+
+    def _assert_same_result(
+        self, source_code: str, data: bytes | None = None
+    ) -> None:
+        with tempfile.NamedTemporaryFile("wb", delete=False) as file:
+            file.write(source_code.encode() if data is None else data)
+        try:
+            result = validate_file(file.name)
+        finally:
+            os.unlink(file.name)
+        tokens, tokenization_errors = tokenize(source_code)
+        self.assertEqual(result.tokens_count, len(tokens))
+        self.assertEqual(
+            [str(error) for error in result.errors],
+            [str(error) for error in [*tokenization_errors, *analyze(tokens)]]
+        )
@@ -0,0 +1,68 @@
+import random
+from unittest import TestCase, skipUnless
+
+from analyzer import analyze, scan_type_codes, token_type_codes
+from test_tokenizer import parametrize
+from tokenizer import tokenize, tokenize_stream
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+else:
+    import numpy_analyzer
+
+
+@skipUnless(np is not None, "NumPy is not installed")
+class TestNumpyAnalyzer(TestCase):
+    ALPHABET = "ab1.+-*/()"
+
+    @parametrize(
+        "expression",
+        [
+            ("a+b",), ("",), (")a+(b",), ("((x)))-",), ("(a+)*(",),
+            ("))((",), ("(()",), ("-(a*(b+c))/2",),
+        ]
+    )
+    def test_scan_matches_pure_python(self, expression: str) -> None:
+        tokens, _ = tokenize_stream(expression)
+        codes = token_type_codes(tokens)
+        self.assertEqual(
+            numpy_analyzer.scan_codes(codes), scan_type_codes(codes)
+        )
+
+    def test_batch_matches_pure_python(self) -> None:
+        rng = random.Random(5)
+        expressions = [
+            "".join(rng.choices(self.ALPHABET, k=rng.randint(0, 30)))
+            for _ in range(1000)
+        ]
+        batch = [tokenize(expression)[0] for expression in expressions]
+        for max_errors in (None, 1, 3):
+            results = numpy_analyzer.analyze_batch(batch, max_errors)
+            for expression, tokens, errors in zip(
+                expressions, batch, results
+            ):
+                with self.subTest(
+                    expression=expression, max_errors=max_errors
+                ):
+                    self.assertEqual(
+                        [str(error) for error in errors],
+                        [str(error) for error in analyze(tokens, max_errors)]
+                    )
+
+    def test_accepts_token_streams(self) -> None:
+        streams = [
+            tokenize_stream(expression)[0]
+            for expression in ["(a", "b)", "", "c*(d-1)"]
+        ]
+        self.assertEqual(
+            [
+                [str(error) for error in errors]
+                for errors in numpy_analyzer.analyze_batch(streams)
+            ],
+            [[str(error) for error in analyze(tokens)] for tokens in streams]
+        )
+
+    def test_empty_batch(self) -> None:
+        self.assertEqual(numpy_analyzer.analyze_batch([]), [])
@@ -0,0 +1,61 @@
+import random
+from unittest import TestCase
+
+from parallel import split_source_code, validate_parallel
+from test_tokenizer import parametrize
+from validation import ValidationResult, validate_expression
+
+
+def _describe(result: ValidationResult) -> tuple:
+    return (
+        list(result.tokens),
+        [
+            (str(error), error.last_visited_position)
+            for error in result.tokenization_errors
+        ],
+        [str(error) for error in result.syntax_analysis_errors],
+    )
+
+
+class TestSplitSourceCode(TestCase):
+    def test_starts_chunks_at_safe_boundaries(self) -> None:
+        source_code = "abc1+(12.5*x) -y7"
+        offsets = split_source_code(source_code, 8)
+        self.assertEqual(offsets[0], 0)
+        for offset in offsets[1:]:
+            self.assertIn(source_code[offset], "+-*/() ")
+
+
+class TestValidateParallel(TestCase):
+    @parametrize(
+        "source_code",
+        [("",), ("a b",), ("((a)) ) (b+c", ), ("x+(y*(z- 1.)) )) (( $",)]
+    )
+    def test_matches_sequential_validation(self, source_code: str) -> None:
+        for chunks_count in range(1, len(source_code) + 2):
+            with self.subTest(chunks_count=chunks_count):
+                self.assertEqual(
+                    _describe(validate_parallel(source_code, 1, chunks_count)),
+                    _describe(validate_expression(source_code))
+                )
+
+    def test_random_sources(self) -> None:
+        rng = random.Random(5)
+        for _ in range(200):
+            source_code = "".join(
+                rng.choices("ab1.+-*/()  $", k=rng.randint(0, 80))
+            )
+            with self.subTest(source_code=source_code):
+                self.assertEqual(
+                    _describe(
+                        validate_parallel(source_code, 1, rng.randint(1, 20))
+                    ),
+                    _describe(validate_expression(source_code))
+                )
+
+    def test_uses_process_pool(self) -> None:
+        source_code = "(a+b)*" * 500 + "((c)"
+        self.assertEqual(
+            _describe(validate_parallel(source_code, 2)),
+            _describe(validate_expression(source_code))
+        )
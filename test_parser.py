@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from parser import NO_NODE, ExpressionTree, NodeKind, parse_expression
+from test_tokenizer import parametrize
+
+OPERATOR_SYMBOLS = {
+    NodeKind.ADD: "+",
+    NodeKind.SUBTRACT: "-",
+    NodeKind.MULTIPLY: "*",
+    NodeKind.DIVIDE: "/",
+}
+
+
+def _render(tree: ExpressionTree, node: int) -> str:
+    kind = tree.kind(node)
+    if kind == NodeKind.NEGATE:
+        return f"(-{_render(tree, tree.left[node])})"
+    if kind in OPERATOR_SYMBOLS:
+        return (
+            f"({_render(tree, tree.left[node])}{OPERATOR_SYMBOLS[kind]}"
+            f"{_render(tree, tree.right[node])})"
+        )
+    return tree.lexeme(node)
+
+
+class TestParse(TestCase):
+    @parametrize(
+        "expression,expected_result",
+        [
+            ("a", "a"),
+            ("a+b*c", "(a+(b*c))"),
+            ("a-b-c", "((a-b)-c)"),
+            ("a/b*c", "((a/b)*c)"),
+            ("(a+b)*c", "((a+b)*c)"),
+            ("-a*b+c", "(((-a)*b)+c)"),
+            ("x*(-(y-2.5)/z)", "(x*((-(y-2.5))/z))"),
+        ]
+    )
+    def test_respects_precedence(
+        self, expression: str, expected_result: str
+    ) -> None:
+        tree = parse_expression(expression)
+        self.assertEqual(_render(tree, tree.root), expected_result)
+
+    def test_stores_children_before_parents(self) -> None:
+        tree = parse_expression("(a+b)*(c-d)/(-e)")
+        for node in range(len(tree)):
+            for child in (tree.left[node], tree.right[node]):
+                self.assertLess(child, node)
+        self.assertEqual(tree.position(tree.root).start, 11)
+
+    def test_parses_deep_nesting_without_recursion(self) -> None:
+        depth = 100_000
+        tree = parse_expression("(" * depth + "a" + "+b)" * depth)
+        self.assertEqual(len(tree), 2 * depth + 1)
+        self.assertEqual(tree.heights()[tree.root], depth)
+
+    def test_rejects_invalid_expression(self) -> None:
+        with self.assertRaises(ExceptionGroup):
+            parse_expression("a+")
+
+    def test_heights(self) -> None:
+        tree = parse_expression("a*b+(-c)")
+        self.assertEqual(list(tree.heights()), [0, 0, 1, 0, 1, 2])
+        self.assertEqual(tree.left[tree.root], 2)
+        self.assertEqual(tree.right[2], 1)
+        self.assertEqual(tree.right[4], NO_NODE)
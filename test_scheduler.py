@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from balancing import balance
+from compiler import DivisionByZeroError, interpret
+from dag import build_expressions_dag
+from parser import NodeKind, parse_expression
+from scheduler import evaluate_levels, levels, simulate
+from test_tokenizer import parametrize
+from tokenizer import Position
+
+UNIT_LATENCIES = dict.fromkeys(NodeKind, 1.0)
+
+
+class TestLevels(TestCase):
+    def test_groups_operations_by_depth(self) -> None:
+        tree = parse_expression("(a+b)*(c-d)+(-e)")
+        self.assertEqual(
+            [[tree.kind(node) for node in level] for level in levels(tree)],
+            [
+                [NodeKind.ADD, NodeKind.SUBTRACT, NodeKind.NEGATE],
+                [NodeKind.MULTIPLY],
+                [NodeKind.ADD],
+            ]
+        )
+
+    def test_evaluates_on_pool(self) -> None:
+        tree = parse_expression("(a+b)*(c-d)/(2+e)-(-a)")
+        bindings = {"a": 1.5, "b": 2, "c": 7, "d": 3, "e": 0.5}
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(
+                evaluate_levels(tree, bindings, executor),
+                interpret(tree, bindings)
+            )
+        self.assertEqual(
+            evaluate_levels(tree, bindings), interpret(tree, bindings)
+        )
+
+    def test_reports_division_by_zero_position(self) -> None:
+        tree = parse_expression("a+b/(c-c)")
+        for executor in (None, ThreadPoolExecutor(max_workers=2)):
+            with self.assertRaises(DivisionByZeroError) as context:
+                evaluate_levels(tree, {"a": 1, "b": 1, "c": 1}, executor)
+            self.assertEqual(context.exception.position, Position(3, 3))
+            if executor is not None:
+                executor.shutdown()
+
+
+class TestSimulate(TestCase):
+    @parametrize(
+        "processors,expected_makespan",
+        [(1, 15.0), (2, 8.0), (4, 5.0), (8, 4.0)]
+    )
+    def test_balanced_sum(
+        self, processors: int, expected_makespan: float
+    ) -> None:
+        tree = balance(
+            parse_expression("+".join(f"a{i}" for i in range(16)))
+        ).tree
+        result = simulate(tree, processors, UNIT_LATENCIES)
+        self.assertEqual(result.makespan, expected_makespan)
+        self.assertEqual(result.sequential_time, 15.0)
+        self.assertAlmostEqual(result.speedup, 15.0 / expected_makespan)
+        self.assertAlmostEqual(
+            result.efficiency, 15.0 / expected_makespan / processors
+        )
+
+    def test_chain_gets_no_speedup(self) -> None:
+        tree = parse_expression("a/b/c/d")
+        result = simulate(tree, 4)
+        self.assertEqual(result.makespan, 30.0)
+        self.assertEqual(result.speedup, 1.0)
+
+    def test_follows_critical_path(self) -> None:
+        # The division chain is started first, the additions fill in
+        tree = parse_expression("a/b/c + (d+e+f+g)")
+        self.assertEqual(simulate(tree, 2).makespan, 21.0)
+
+    def test_simulates_dag(self) -> None:
+        dag = build_expressions_dag(["(a+b)*c + (a+b)*d"])
+        result = simulate(dag, 2, UNIT_LATENCIES)
+        self.assertEqual(result.sequential_time, 4.0)
+        self.assertEqual(result.makespan, 3.0)
+
+    def test_single_leaf(self) -> None:
+        result = simulate(parse_expression("a"), 2)
+        self.assertEqual(result.makespan, 0.0)
+        self.assertEqual(result.speedup, 1.0)
+
+    @parametrize("processors", [(0,), (-1,)])
+    def test_rejects_non_positive_processors(self, processors: int) -> None:
+        with self.assertRaises(ValueError):
+            simulate(parse_expression("a+b"), processors)
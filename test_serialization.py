@@ -0,0 +1,174 @@
+import errno
+import io
+import json
+import os
+import pickle
+import random
+import tempfile
+from unittest import TestCase, mock, skipUnless
+
+from batch import validate_batch, validation_record
+from cache import ValidationCache
+from serialization import (
+    FORMAT_VERSION,
+    DiskCache,
+    SerializationError,
+    dump_file,
+    dumps,
+    load_file,
+    loads,
+)
+from test_cache import _describe
+from test_tokenizer import parametrize
+from validation import validate_expression
+
+
+def _positions(result) -> list:
+    return [error.position for error in result.errors]
+
+
+class TestSerialization(TestCase):
+    ALPHABET = "ab1.$+-*/() é"
+
+    def test_round_trip(self) -> None:
+        rng = random.Random(13)
+        for _ in range(300):
+            source_code = "".join(
+                rng.choices(self.ALPHABET, k=rng.randint(0, 40))
+            )
+            result = validate_expression(source_code)
+            with self.subTest(source_code=source_code):
+                for loaded in [
+                    loads(dumps(result)), loads(dumps(result), source_code)
+                ]:
+                    self.assertEqual(_describe(loaded), _describe(result))
+                    self.assertEqual(_positions(loaded), _positions(result))
+
+    def test_loads_through_memory_map(self) -> None:
+        result = validate_expression("(a + 1.) * $b)")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "result")
+            dump_file(result, path)
+            loaded = load_file(path)
+            self.assertEqual(_describe(loaded), _describe(result))
+            self.assertTrue(loaded.tokens.types.readonly)
+
+    @parametrize(
+        "data",
+        [
+            (b"",),
+            (b"XXXX" + dumps(validate_expression("a"))[4:],),
+            (dumps(validate_expression("a+b"))[:-1],),
+        ]
+    )
+    def test_rejects_malformed_data(self, data: bytes) -> None:
+        with self.assertRaises(SerializationError):
+            loads(data)
+
+    def test_rejects_other_version(self) -> None:
+        data = bytearray(dumps(validate_expression("a")))
+        data[4:6] = (FORMAT_VERSION + 1).to_bytes(2, "little")
+        with self.assertRaisesRegex(SerializationError, "version"):
+            loads(data)
+
+    def test_rejects_other_source(self) -> None:
+        with self.assertRaises(SerializationError):
+            loads(dumps(validate_expression("a+b")), "a+c")
+
+
+class TestDiskCache(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_reuses_stored_results(self) -> None:
+        cache = DiskCache(self.directory.name)
+        first = cache.validate("a+*b")
+        second = DiskCache(self.directory.name).validate("a+*b")
+        self.assertEqual(_describe(second), _describe(first))
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_counts_hits_and_misses(self) -> None:
+        cache = DiskCache(self.directory.name)
+        for expression in ["a", "b", "a", "a"]:
+            cache.validate(expression)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+
+    def test_evicts_least_recently_used_entries(self) -> None:
+        entry_size = len(dumps(validate_expression("a1")))
+        cache = DiskCache(self.directory.name, max_bytes=2 * entry_size)
+        for expression in ["a1", "a2", "a3"]:
+            cache.validate(expression)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertLessEqual(cache.total_bytes, 2 * entry_size)
+        self.assertIsNone(cache.load("a1"))
+
+    def test_malformed_entry_is_a_miss(self) -> None:
+        cache = DiskCache(self.directory.name)
+        cache.validate("a+b")
+        with open(cache.path("a+b"), "wb") as file:
+            file.write(b"PZKS")
+        self.assertIsNone(cache.load("a+b"))
+        self.assertFalse(os.path.exists(cache.path("a+b")))
+
+    def test_unreadable_entry_is_kept(self) -> None:
+        cache = DiskCache(self.directory.name)
+        cache.validate("a+b")
+        with mock.patch(
+            "builtins.open",
+            side_effect=OSError(errno.EMFILE, "Too many open files")
+        ):
+            self.assertIsNone(cache.load("a+b"))
+        self.assertTrue(os.path.exists(cache.path("a+b")))
+        self.assertIsNotNone(cache.load("a+b"))
+
+    @skipUnless(os.path.isdir("/proc/self/fd"), "needs /proc/self/fd")
+    def test_kept_results_hold_no_descriptors(self) -> None:
+        disk_cache = DiskCache(self.directory.name)
+        for index in range(50):
+            disk_cache.validate(f"a{index}")
+        cache = ValidationCache(max_entries=100, disk_cache=disk_cache)
+        descriptors_count = len(os.listdir("/proc/self/fd"))
+        for index in range(50):
+            cache.validate(f"a{index}")
+        self.assertEqual(len(os.listdir("/proc/self/fd")), descriptors_count)
+        self.assertEqual(disk_cache.stats()["hits"], 50)
+
+    def test_pickles_into_cache_of_same_directory(self) -> None:
+        cache = DiskCache(self.directory.name, max_bytes=1000)
+        cache.validate("a")
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(
+            (copy.directory, copy.max_bytes), (cache.directory, 1000)
+        )
+        self.assertIsNotNone(copy.load("a"))
+
+    def test_backs_validation_cache(self) -> None:
+        disk_cache = DiskCache(self.directory.name)
+        cache = ValidationCache(max_entries=1, disk_cache=disk_cache)
+        for expression in ["a+b", "c", "a+b"]:
+            cache.validate(expression)
+        self.assertEqual(disk_cache.stats()["hits"], 1)
+
+    def test_used_by_batch_worker_processes(self) -> None:
+        expressions = ["a+b", "(c", "a+b", "1.+$"]
+        cache = DiskCache(self.directory.name)
+        for _ in range(2):
+            output = io.StringIO()
+            validate_batch(
+                io.StringIO("\n".join(expressions)), output, 2, 1, cache
+            )
+            records = [
+                json.loads(line) for line in output.getvalue().splitlines()
+            ]
+            self.assertEqual(
+                records,
+                [
+                    validation_record(line_number, expression)
+                    for line_number, expression in enumerate(expressions, 1)
+                ]
+            )
+        self.assertEqual(len(cache), 3)
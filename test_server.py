@@ -0,0 +1,131 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest import IsolatedAsyncioTestCase
+
+import load_test
+from batch import validation_result
+from server import ValidationServer, validate_expressions
+from tokenizer import tokenize
+from utils import format_tokens
+
+EXPRESSIONS = ["a+b", "(c", "a+b", "1.+$", "", "x*(y-2)"]
+
+
+class TestValidationServer(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        executor = ThreadPoolExecutor(2)
+        self.addCleanup(executor.shutdown)
+        self.server = ValidationServer(
+            executor, 2, batch_size=4, max_request_bytes=100
+        )
+        tcp_server = await self.server.start(port=0)
+        self.port = tcp_server.sockets[0].getsockname()[1]
+
+        async def stop() -> None:
+            tcp_server.close()
+            await tcp_server.wait_closed()
+            await self.server.close()
+
+        self.addAsyncCleanup(stop)
+
+    async def _exchange(self, lines: list[str]) -> list[dict]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write("".join(line + "\n" for line in lines).encode())
+        await writer.drain()
+        responses = [
+            json.loads(await reader.readline()) for _ in range(len(lines))
+        ]
+        writer.close()
+        await writer.wait_closed()
+        return responses
+
+    async def test_answers_in_request_order(self) -> None:
+        responses = await self._exchange([
+            json.dumps({"id": index, "expression": expression})
+            for index, expression in enumerate(EXPRESSIONS)
+        ])
+        self.assertEqual(
+            responses,
+            [
+                {"id": index, **validation_result(expression, None, True)}
+                for index, expression in enumerate(EXPRESSIONS)
+            ]
+        )
+
+    async def test_responses_carry_printed_tokens(self) -> None:
+        [response] = await self._exchange(['{"expression": "a*(2)"}'])
+        tokens, _ = tokenize("a*(2)")
+        self.assertEqual(response["tokens"], format_tokens(tokens))
+
+    async def test_coalesces_identical_expressions(self) -> None:
+        results = await asyncio.gather(
+            *(self.server.validate("a+*b") for _ in range(5))
+        )
+        self.assertEqual(results, validate_expressions(["a+*b"]) * 5)
+        self.assertEqual(self.server.coalesced_count, 4)
+        self.assertEqual(self.server.batches_count, 1)
+
+    async def test_batches_distinct_expressions(self) -> None:
+        await asyncio.gather(
+            *(self.server.validate(f"a{index}") for index in range(8))
+        )
+        self.assertEqual(self.server.batches_count, 2)
+
+    async def test_reports_malformed_requests(self) -> None:
+        responses = await self._exchange(['{"expression"', "[]", "{}"])
+        self.assertEqual(
+            [sorted(response) for response in responses], [["error"]] * 3
+        )
+
+    async def test_rejects_non_string_expressions(self) -> None:
+        responses = await self._exchange([
+            '{"id": 1, "expression": null}', '{"expression": 12}'
+        ])
+        self.assertEqual(
+            responses,
+            [
+                {"id": 1, "error": "Expression must be a string"},
+                {"error": "Expression must be a string"},
+            ]
+        )
+
+    async def test_rejects_requests_above_size_limit(self) -> None:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        line = json.dumps({"expression": "a+" * 100 + "b"})
+        writer.write((line + "\n").encode())
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        self.assertIn("exceeds 100 bytes", response["error"])
+        self.assertEqual(await reader.readline(), b"")
+        writer.close()
+        await writer.wait_closed()
+
+    async def test_load_test_drives_server(self) -> None:
+        result = await load_test.drive(
+            "127.0.0.1",
+            self.port,
+            load_test.generate_expressions(0, 10, 5),
+            requests_count=50,
+            connections=3,
+            depth=4,
+        )
+        self.assertEqual(result.failed_count, 0)
+        self.assertEqual(result.latencies.snapshot()["requests"], 50)
+
+    async def test_load_test_counts_unanswered_requests(self) -> None:
+        # The oversized request is answered without an id, then the
+        # connection is closed
+        result = await asyncio.wait_for(
+            load_test.drive(
+                "127.0.0.1",
+                self.port,
+                ["a+" * 100 + "b"],
+                requests_count=5,
+                connections=1,
+                depth=2,
+            ),
+            timeout=10
+        )
+        self.assertEqual(result.failed_count, 5)
+        self.assertEqual(result.latencies.snapshot()["requests"], 0)
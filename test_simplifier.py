@@ -0,0 +1,128 @@
+import random
+import sys
+from unittest import TestCase, skipUnless
+
+from balancing import check_equivalence
+from parser import parse, parse_expression
+from simplifier import format_number, simplify_expression
+from test_tokenizer import parametrize
+from tokenizer import Position
+from utils import format_tokens
+
+
+def _random_expression(rng: random.Random, depth: int) -> str:
+    if depth == 0 or rng.random() < 0.2:
+        return rng.choice(["0", "1", "2", "2.5", "a", "b", "c"])
+    left = _random_expression(rng, depth - 1)
+    match rng.randrange(5):
+        case 0:
+            return f"({left}+{_random_expression(rng, depth - 1)})"
+        case 1:
+            return f"({left}-{_random_expression(rng, depth - 1)})"
+        case 2:
+            return f"({left}*{_random_expression(rng, depth - 1)})"
+        case 3:
+            return f"({left}/{rng.choice('abc')})"
+        case _:
+            return f"(-{left})"
+
+
+class TestSimplify(TestCase):
+    @parametrize(
+        "expression,expected_expression,expected_removed_count",
+        [
+            ("0*x+y*1+z/1+w+0", "y+z+w", 5),
+            ("(2+3)*y", "5*y", 1),
+            ("((a+b))*c", "(a+b)*c", 0),
+            ("a+(b+c)", "a+(b+c)", 0),
+            ("-(-a)", "a", 2),
+            ("x*(-(-(y)))", "x*y", 2),
+            ("a-(-b)", "a+b", 1),
+            ("(1-1)-x", "-x", 1),
+            ("a*(0-3)", "a*(-3)", 0),
+            ("-(2)*x", "-2*x", 0),
+            ("0*(a/b)+c", "0*(a/b)+c", 0),
+            ("-(a+b)*c", "-(a+b)*c", 0),
+            ("6/4*x", "1.5*x", 1),
+            ("2.50*x", "2.50*x", 0),
+            ("x-(1-1.0)*y", "x", 3),
+        ]
+    )
+    def test_simplifies(
+        self,
+        expression: str,
+        expected_expression: str,
+        expected_removed_count: int,
+    ) -> None:
+        result = simplify_expression(expression)
+        self.assertEqual(result.expression, expected_expression)
+        self.assertEqual(
+            result.removed_operations_count, expected_removed_count
+        )
+        self.assertEqual(result.divisions_by_zero, [])
+
+    def test_keeps_division_by_zero(self) -> None:
+        result = simplify_expression("a/(2-2) + 1/0")
+        self.assertEqual(result.expression, "a/0+1/0")
+        self.assertEqual(
+            [error.position for error in result.divisions_by_zero],
+            [Position(1, 1), Position(11, 11)]
+        )
+
+    @parametrize(
+        "expression,expected_expression",
+        [
+            ("0*(a/0)", "0*(a/0)"),
+            ("(a/0)*0", "a/0*0"),
+            ("(a/(1-1))*0", "a/0*0"),
+        ]
+    )
+    def test_keeps_division_by_zero_multiplied_by_zero(
+        self, expression: str, expected_expression: str
+    ) -> None:
+        result = simplify_expression(expression)
+        self.assertEqual(result.expression, expected_expression)
+        self.assertEqual(len(result.divisions_by_zero), 1)
+
+    def test_gives_formattable_tokens(self) -> None:
+        result = simplify_expression("(1+1)*a - b*0")
+        self.assertEqual(
+            format_tokens(result.tokens),
+            "NUMBER('2') MUL('*') IDENTIFIER('a')"
+        )
+
+    def test_keeps_value(self) -> None:
+        rng = random.Random(7)
+        for _ in range(200):
+            expression = _random_expression(rng, 5)
+            result = simplify_expression(expression)
+            with self.subTest(expression=expression):
+                self.assertTrue(check_equivalence(
+                    parse_expression(expression), parse(result.tokens)
+                ))
+
+    def test_simplifies_deep_nesting(self) -> None:
+        depth = 10_000
+        result = simplify_expression("(" * depth + "a" + "*1)" * depth)
+        self.assertEqual(result.expression, "a")
+        self.assertEqual(result.removed_operations_count, depth)
+
+    @skipUnless(sys.get_int_max_str_digits(), "int conversion is unlimited")
+    def test_keeps_products_too_long_to_print(self) -> None:
+        digits = "9" * (sys.get_int_max_str_digits() // 2 + 100)
+        expression = f"({digits})*({digits})"
+        self.assertEqual(
+            simplify_expression(expression).expression, f"{digits}*{digits}"
+        )
+        self.assertEqual(
+            simplify_expression(f"({digits})+1").expression,
+            "1" + "0" * len(digits)
+        )
+
+    @parametrize(
+        "value,expected_lexeme",
+        [(3, "3"), (0.1, "0.1"), (1e20, "100000000000000000000.0"),
+         (1.5e-7, "0.00000015"), (-0.0, "0.0")]
+    )
+    def test_formats_numbers(self, value: float, expected_lexeme: str) -> None:
+        self.assertEqual(format_number(value), expected_lexeme)
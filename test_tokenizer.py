@@ -1,3 +1,5 @@
+import io
+import random
 from collections.abc import Sequence
 from typing import Callable, ParamSpec
 from unittest import TestCase
@@ -7,7 +9,10 @@ from tokenizer import (
     TokenType,
     Position,
     UnsupportedLexemeError,
+    iter_tokenize,
     tokenize,
+    tokenize_reference,
+    tokenize_stream,
     _map_source_code_to_identifier_token,
     _map_source_code_to_number_token
 )
@@ -136,3 +141,101 @@ class TestTokenize(TestCase):
             errors, expected_error_messages, strict=True
         ):
             self.assertTrue(expected_error_message in str(error))
+
+
+class TestTokenizeMatchesReference(TestCase):
+    ALPHABET = "ab9Z0.+-*/() \t\n$_٣"
+
+    @parametrize(
+        "source_code",
+        [("",), ("4.",), ("12..34",), ("a1.5b",), (" 1. 5 ",), ("٣4.2x",)]
+    )
+    def test_edge_cases(self, source_code: str) -> None:
+        self._assert_same_result(source_code)
+
+    def test_random_sources(self) -> None:
+        rng = random.Random(1337)
+        for _ in range(500):
+            source_code = "".join(
+                rng.choices(self.ALPHABET, k=rng.randint(0, 40))
+            )
+            with self.subTest(source_code=source_code):
+                self._assert_same_result(source_code)
+
+    def _assert_same_result(self, source_code: str) -> None:
+        tokens, errors = tokenize(source_code)
+        expected_tokens, expected_errors = tokenize_reference(source_code)
+        self.assertEqual(tokens, expected_tokens)
+        self.assertEqual(
+            [(str(e), e.last_visited_position) for e in errors],
+            [(str(e), e.last_visited_position) for e in expected_errors]
+        )
+
+
+class TestTokenStream(TestCase):
+    SOURCE_CODE = " (ab1 + 4.2)*-c/7 "
+
+    def test_yields_same_tokens_as_tokenize(self) -> None:
+        stream, errors = tokenize_stream(self.SOURCE_CODE)
+        tokens, expected_errors = tokenize(self.SOURCE_CODE)
+        self.assertEqual(list(stream), tokens)
+        self.assertEqual(len(stream), len(tokens))
+        self.assertEqual(stream[-1], tokens[-1])
+        self.assertEqual(stream[2:4], tokens[2:4])
+        self.assertEqual(len(errors), len(expected_errors))
+
+    def test_slices_lexemes_from_source(self) -> None:
+        stream, _ = tokenize_stream(self.SOURCE_CODE)
+        self.assertEqual(stream.type(1), TokenType.IDENTIFIER)
+        self.assertEqual(stream.lexeme(1), "ab1")
+        self.assertEqual(stream.lexeme(3), "4.2")
+        self.assertEqual(stream.position(3), Position(8, 10))
+
+
+class TestIterTokenize(TestCase):
+    @parametrize(
+        "chunks",
+        [
+            (["12", ".", "5+ab", "c1"],),
+            (["12.", " 5"],),
+            (["x  ", "  y", "$", "1.", ""],),
+        ]
+    )
+    def test_carries_lexemes_across_chunks(self, chunks: list[str]) -> None:
+        self._assert_same_result(chunks, "".join(chunks))
+
+    def test_reads_file_like_objects(self) -> None:
+        rng = random.Random(3)
+        for chunk_size in [1, 2, 3, 7, 64]:
+            source_code = "".join(rng.choices("ab9.+-*/() $", k=200))
+            with self.subTest(chunk_size=chunk_size):
+                self._assert_same_result(
+                    io.StringIO(source_code), source_code, chunk_size
+                )
+
+    def test_lexemes_spanning_many_chunks(self) -> None:
+        source_code = (
+            " " * 100 + "a" * 100 + "9" * 50 + "+" + "1" * 50 + "." +
+            "2" * 50 + ".5" + "7" * 30 + "." + "\n" * 20
+        )
+        for chunk_size in [1, 3, 64]:
+            with self.subTest(chunk_size=chunk_size):
+                self._assert_same_result(
+                    io.StringIO(source_code), source_code, chunk_size
+                )
+
+    def _assert_same_result(
+        self, stream, source_code: str, chunk_size: int = 4
+    ) -> None:
+        items = list(iter_tokenize(stream, chunk_size))
+        tokens, errors = tokenize(source_code)
+        self.assertEqual(
+            [item for item in items if isinstance(item, Token)], tokens
+        )
+        self.assertEqual(
+            [
+                (str(item), item.last_visited_position)
+                for item in items if not isinstance(item, Token)
+            ],
+            [(str(error), error.last_visited_position) for error in errors]
+        )
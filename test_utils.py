@@ -0,0 +1,192 @@
+import contextlib
+import io
+import json
+from unittest import TestCase
+
+import main
+from serialization import loads
+from test_tokenizer import parametrize
+from tokenizer import tokenize, tokenize_stream
+from utils import (
+    format_tokens,
+    write_errors_ndjson,
+    write_tokens,
+    write_tokens_ndjson,
+)
+from validation import validate_expression
+
+
+class TestFormatTokens(TestCase):
+    def test_formats_every_token_type(self) -> None:
+        tokens, _ = tokenize("-a1 + (2.5*b) / c")
+        self.assertEqual(
+            format_tokens(tokens),
+            "MINUS('-') IDENTIFIER('a1') ADD('+') OP('(') NUMBER('2.5') "
+            "MUL('*') IDENTIFIER('b') CP(')') DIV('/') IDENTIFIER('c')"
+        )
+
+    def test_formats_token_streams_like_token_lists(self) -> None:
+        expression = "(a+b)*" * 3000 + "c"
+        self.assertEqual(
+            format_tokens(tokenize_stream(expression)[0]),
+            format_tokens(tokenize(expression)[0])
+        )
+
+    @parametrize(
+        "max_tokens,expected_result",
+        [
+            (None, "IDENTIFIER('a') ADD('+') IDENTIFIER('b') MUL('*') "
+                   "IDENTIFIER('c')"),
+            (5, "IDENTIFIER('a') ADD('+') IDENTIFIER('b') MUL('*') "
+                "IDENTIFIER('c')"),
+            (3, "IDENTIFIER('a') ADD('+') ... 2 tokens elided ... "
+                "IDENTIFIER('c')"),
+            (1, "IDENTIFIER('a') ... 4 tokens elided ..."),
+        ]
+    )
+    def test_elides_middle_tokens(
+        self, max_tokens: int | None, expected_result: str
+    ) -> None:
+        tokens, _ = tokenize_stream("a+b*c")
+        self.assertEqual(format_tokens(tokens, max_tokens), expected_result)
+
+    def test_writes_to_stream(self) -> None:
+        tokens, _ = tokenize_stream("x-1")
+        stream = io.StringIO()
+        write_tokens(tokens, stream)
+        self.assertEqual(stream.getvalue(), format_tokens(tokens))
+
+
+class TestNdjson(TestCase):
+    def test_writes_token_records(self) -> None:
+        tokens, _ = tokenize_stream("a + 1.5")
+        stream = io.StringIO()
+        write_tokens_ndjson(tokens, stream)
+        self.assertEqual(
+            [json.loads(line) for line in stream.getvalue().splitlines()],
+            [
+                {
+                    "type": str(token.type),
+                    "lexeme": token.lexeme,
+                    "start": token.position.start,
+                    "stop": token.position.stop,
+                }
+                for token in tokens
+            ]
+        )
+
+    def test_elides_middle_tokens(self) -> None:
+        stream = io.StringIO()
+        write_tokens_ndjson(tokenize_stream("a+b*c")[0], stream, 2)
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(
+            [record.get("lexeme", record.get("elided")) for record in records],
+            ["a", 3, "c"]
+        )
+
+    def test_writes_error_records(self) -> None:
+        result = validate_expression("$+")
+        stream = io.StringIO()
+        write_errors_ndjson(result.errors, stream)
+        self.assertEqual(
+            [json.loads(line) for line in stream.getvalue().splitlines()],
+            [
+                {"error": str(error), "start": start, "stop": stop}
+                for error, (start, stop) in zip(
+                    result.errors, [(0, 0), (1, 1), (1, 1)]
+                )
+            ]
+        )
+
+
+class TestOutputFormats(TestCase):
+    def test_text_output_is_unchanged(self) -> None:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main.main(["a*(b-2)"])
+        tokens, _ = tokenize("a*(b-2)")
+        self.assertEqual(
+            output.getvalue(),
+            "Given expression is completely valid: 'a*(b-2)'\n"
+            f"Recognized tokens: {format_tokens(tokens)}\n"
+        )
+
+    @parametrize(
+        "argv",
+        [(["-a+b"],), (["-(a)"],), (["-a+b", "--max-tokens", "2"],)]
+    )
+    def test_accepts_expression_starting_with_minus(
+        self, argv: list[str]
+    ) -> None:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main.main(argv)
+        self.assertTrue(
+            output.getvalue().startswith(
+                f"Given expression is completely valid: '{argv[0]}'"
+            )
+        )
+
+    def test_text_output_lists_tokens_of_invalid_expression(self) -> None:
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            with self.assertRaises(ExceptionGroup) as context:
+                main.main(["--max-tokens", "2", "a+b*c+"])
+        tokens, _ = tokenize("a+b*c+")
+        self.assertEqual(
+            stderr.getvalue(),
+            f"Recognized tokens: {format_tokens(tokens, 2)}\n"
+        )
+        self.assertEqual(
+            context.exception.message, "Invalid expression given: 'a+b*c+'"
+        )
+
+    @parametrize(
+        "argv",
+        [
+            (["--batch", "-", "--format", "ndjson"],),
+            (["--serve", "--format", "text"],),
+            (["--file", "expression.txt", "--max-tokens", "5"],),
+            (["--batch", "-", "--max-errors", "1"],),
+            (["--serve", "--max-errors", "1"],),
+            (["--cache-dir", "cache", "--max-errors", "1", "a"],),
+            (["--serve", "--normalize-whitespace"],),
+            (["--cache-entries", "10", "a+b"],),
+            (["--file", "expression.txt", "--cache-bytes", "1024"],),
+            (["--cache-bytes", "1024", "--normalize-whitespace", "a"],),
+        ]
+    )
+    def test_rejects_unsupported_option_combinations(
+        self, argv: list[str]
+    ) -> None:
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                main.parse_args(argv)
+
+    def test_stops_at_max_errors(self) -> None:
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(ExceptionGroup) as context:
+                main.main(["--max-errors", "2", "$$$$"])
+        self.assertEqual(len(context.exception.exceptions), 2)
+
+    def test_ndjson_output_lists_errors(self) -> None:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            with self.assertRaises(ExceptionGroup):
+                main.main(["--format", "ndjson", "a+"])
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(
+            [record.get("lexeme", record.get("error")) for record in records],
+            ["a", "+", "Expression can't end with "
+                       "<TokenType.ADDITION_OPERATOR: 'addition_operator'>"]
+        )
+
+    def test_binary_output_loads(self) -> None:
+        output = io.TextIOWrapper(io.BytesIO())
+        with contextlib.redirect_stdout(output):
+            main.main(["--format", "binary", "a+b"])
+        result = loads(output.buffer.getvalue())
+        self.assertEqual(
+            format_tokens(result.tokens),
+            format_tokens(tokenize("a+b")[0])
+        )
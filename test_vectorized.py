@@ -0,0 +1,65 @@
+from unittest import TestCase, skipUnless
+
+from compiler import compile_expression
+from parser import parse_expression
+from tokenizer import Position
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+else:
+    from vectorized import (
+        MissingBindingError,
+        assign_buffers,
+        evaluate_columns,
+    )
+
+
+@skipUnless(np is not None, "NumPy is not installed")
+class TestEvaluateColumns(TestCase):
+    def test_matches_compiled_expression(self) -> None:
+        expression = "(a+b*2.5)/(c-d)-(-(a*d)+3)*b/(c+1)"
+        rng = np.random.default_rng(3)
+        columns = {name: rng.uniform(1, 10, 1000) for name in "abcd"}
+        result = evaluate_columns(
+            parse_expression(expression), columns, block_size=64
+        )
+        compiled = compile_expression(expression)
+        rows = zip(*(columns[name] for name in compiled.identifiers))
+        expected_result = [compiled(*values) for values in rows]
+        np.testing.assert_allclose(result, expected_result)
+
+    def test_broadcasts_scalars(self) -> None:
+        tree = parse_expression("-a*k+1")
+        result = evaluate_columns(
+            tree, {"a": np.arange(5), "k": 2}, block_size=2
+        )
+        np.testing.assert_array_equal(result, [1, -1, -3, -5, -7])
+
+    def test_evaluates_single_identifier(self) -> None:
+        column = np.arange(3.0)
+        result = evaluate_columns(parse_expression("a"), {"a": column})
+        np.testing.assert_array_equal(result, column)
+        self.assertIsNot(result, column)
+
+    def test_reports_missing_bindings_first(self) -> None:
+        tree = parse_expression("a/x + b*x - y")
+        with self.assertRaises(ExceptionGroup) as context:
+            evaluate_columns(tree, {"a": np.ones(2), "b": np.ones(2)})
+        errors = context.exception.exceptions
+        self.assertTrue(
+            all(isinstance(error, MissingBindingError) for error in errors)
+        )
+        self.assertEqual(
+            [(error.identifier, error.positions) for error in errors],
+            [
+                ("x", [Position(2, 2), Position(8, 8)]),
+                ("y", [Position(12, 12)]),
+            ]
+        )
+
+    def test_reuses_buffers(self) -> None:
+        tree = parse_expression("+".join(f"(a{i}*b{i})" for i in range(50)))
+        _, buffers_count = assign_buffers(tree)
+        self.assertLessEqual(buffers_count, 2)
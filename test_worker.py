@@ -0,0 +1,75 @@
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+from unittest import TestCase
+
+from batch import validation_result
+from test_tokenizer import parametrize
+from worker import LatencyStats, ValidationWorker, serve_unix_socket
+
+
+class TestValidationWorker(TestCase):
+    def test_answers_each_request_on_its_own_line(self) -> None:
+        requests = io.StringIO(
+            '{"id": 7, "expression": "a+b"}\n'
+            '\n'
+            '{"expression": "(a"}\n'
+            'garbage\n'
+            '{"command": "stats"}\n'
+        )
+        output = io.StringIO()
+        ValidationWorker().serve(requests, output)
+        responses = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(responses[0], {"id": 7, **validation_result("a+b")})
+        self.assertEqual(responses[1], validation_result("(a"))
+        self.assertIn("error", responses[2])
+        self.assertEqual(responses[3]["requests"], 2)
+        self.assertLessEqual(responses[3]["p50_ms"], responses[3]["p99_ms"])
+
+    def test_serves_unix_socket_clients(self) -> None:
+        path = os.path.join(tempfile.mkdtemp(), "worker.sock")
+        thread = threading.Thread(
+            target=serve_unix_socket, args=(ValidationWorker(), path),
+            daemon=True
+        )
+        thread.start()
+        for _ in range(100):
+            if os.path.exists(path):
+                break
+            threading.Event().wait(0.01)
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(path)
+            client.sendall(
+                b'{"expression": "a*"}\n{"expression": "a\xff"}\n'
+            )
+            responses = client.makefile()
+            first = json.loads(responses.readline())
+            second = json.loads(responses.readline())
+        self.assertEqual(first, validation_result("a*"))
+        self.assertEqual(second, validation_result("a\ufffd"))
+
+    @parametrize(
+        "expression",
+        [(None,), (12,), (["a"],)]
+    )
+    def test_rejects_non_string_expressions(self, expression) -> None:
+        response = json.loads(ValidationWorker().handle(
+            json.dumps({"id": 1, "expression": expression})
+        ))
+        self.assertEqual(
+            response, {"id": 1, "error": "Expression must be a string"}
+        )
+
+
+class TestLatencyStats(TestCase):
+    def test_percentiles(self) -> None:
+        stats = LatencyStats()
+        for millisecond in range(1, 101):
+            stats.record(millisecond / 1000)
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["requests"], 100)
+        self.assertAlmostEqual(snapshot["p50_ms"], 50)
+        self.assertAlmostEqual(snapshot["p99_ms"], 99)
@@ -1,7 +1,14 @@
 from __future__ import annotations
 import re
+import time
+from array import array
+from collections import Counter
+from collections.abc import Generator, Iterable, Iterator, Sequence
 from dataclasses import dataclass
 from enum import StrEnum, auto
+from typing import TextIO
+
+import instrumentation
 
 DIGIT = r"\d"
 LETTER = r"[a-zA-Z]"
@@ -43,22 +50,310 @@ class Token:
     position: Position
 
 
+TOKEN_TYPES = tuple(TokenType)
+TOKEN_TYPE_CODES = {
+    token_type: code for code, token_type in enumerate(TOKEN_TYPES)
+}
+
+
+class TokenStream(Sequence[Token]):
+    """Tokens of a source code stored as parallel arrays of type codes and
+    inclusive start/stop offsets.
+
+    Lexemes are sliced from the source on demand, indexing or iterating
+    the stream builds `Token` objects for callers expecting them.
+    """
+    def __init__(
+        self,
+        source_code: str,
+        types: array | None = None,
+        starts: array | None = None,
+        stops: array | None = None,
+    ) -> None:
+        self.source_code = source_code
+        self.types = array("B") if types is None else types
+        self.starts = array("I") if starts is None else starts
+        self.stops = array("I") if stops is None else stops
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start, stop = self.starts[index], self.stops[index]
+        return Token(
+            type=TOKEN_TYPES[self.types[index]],
+            lexeme=self.source_code[start:stop+1],
+            position=Position(start, stop)
+        )
+
+    def __iter__(self) -> Iterator[Token]:
+        source_code = self.source_code
+        for code, start, stop in zip(self.types, self.starts, self.stops):
+            yield Token(
+                type=TOKEN_TYPES[code],
+                lexeme=source_code[start:stop+1],
+                position=Position(start, stop)
+            )
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
+
+    def type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.types[index]]
+
+    def lexeme(self, index: int) -> str:
+        return self.source_code[self.starts[index]:self.stops[index]+1]
+
+    def position(self, index: int) -> Position:
+        return Position(self.starts[index], self.stops[index])
+
+    def append(self, code: int, start: int, stop: int) -> None:
+        self.types.append(code)
+        self.starts.append(start)
+        self.stops.append(stop)
+
+
 class UnsupportedLexemeError(Exception):
-    """Unsupported lexeme encountered."""
+    """Unsupported lexeme encountered, its message is rendered when the
+    error is first shown."""
     def __init__(
         self, lexeme_value: str, position: int, last_visited_position: int | None = None
     ) -> None:
-        self.last_visited_position = last_visited_position 
-        super().__init__(
-            f"Got unsupported lexeme at position {position}: '{lexeme_value}'"
+        self.lexeme = lexeme_value
+        self.start = position
+        self.last_visited_position = last_visited_position
+        super().__init__(lexeme_value, position, last_visited_position)
+
+    def __str__(self) -> str:
+        return (
+            f"Got unsupported lexeme at position {self.start}: "
+            f"'{self.lexeme}'"
         )
 
+    @property
+    def position(self) -> Position:
+        return Position(self.start, self.start + len(self.lexeme) - 1)
+
+
+# Name of `UnsupportedLexemeError` among kinds of reported errors
+UNSUPPORTED_LEXEME_ERROR_KIND = "unsupported_lexeme"
 
 TokenizeResult = tuple[list[Token], list[UnsupportedLexemeError]]
+TokenStreamResult = tuple[TokenStream, list[UnsupportedLexemeError]]
+
+SINGLE_CHARACTER_LEXEMES = {
+    TokenType.ADDITION_OPERATOR: ADDITION_OPERATOR,
+    TokenType.MINUS_SIGN: MINUS_SIGN,
+    TokenType.MULTIPLICATION_OPERATOR: MULTIPLICATION_OPERATOR,
+    TokenType.DIVISION_OPERATOR: DIVISION_OPERATOR,
+    TokenType.OPENING_PARENTHESIS: OPENING_PARENTHESIS,
+    TokenType.CLOSING_PARENTHESIS: CLOSING_PARENTHESIS,
+}
+
+_WHITESPACE_GROUP = "whitespace"
+_UNSUPPORTED_GROUP = "unsupported"
+
+# Matches a lexeme at a time, in a group named after its token type,
+# "whitespace" or "unsupported"
+LEXEME_PATTERN = re.compile(
+    "|".join([
+        rf"(?P<{TokenType.IDENTIFIER}>{LETTER}(?:{LETTER}|{DIGIT})*)",
+        rf"(?P<{TokenType.NUMBER}>{DIGIT}+"
+        rf"(?:{re.escape(DECIMAL_NUMBER_SEPARATOR)}{DIGIT}*)?)",
+        *(
+            f"(?P<{token_type}>{re.escape(lexeme)})"
+            for token_type, lexeme in SINGLE_CHARACTER_LEXEMES.items()
+        ),
+        rf"(?P<{_WHITESPACE_GROUP}>{WHITESPACE}+)",
+        rf"(?P<{_UNSUPPORTED_GROUP}>.)",
+    ]),
+    re.DOTALL
+)
+
+_GROUP_TOKEN_TYPE_CODES = {
+    str(token_type): code for token_type, code in TOKEN_TYPE_CODES.items()
+}
+_GROUP_TOKEN_TYPES = {str(token_type): token_type for token_type in TokenType}
+_NUMBER_CODE = TOKEN_TYPE_CODES[TokenType.NUMBER]
+
+# Characters that may be adjacent inside an identifier or a number
+WORD_CHARACTER = re.compile(
+    rf"{LETTER}|{DIGIT}|{re.escape(DECIMAL_NUMBER_SEPARATOR)}"
+)
+
+# Rest of a lexeme of the group continued at the start of the next chunk,
+# a number whose decimal separator was already read continues as a fraction
+_CONTINUATIONS = {
+    str(TokenType.IDENTIFIER): re.compile(rf"(?:{LETTER}|{DIGIT})*"),
+    str(TokenType.NUMBER): re.compile(
+        rf"{DIGIT}*(?:{re.escape(DECIMAL_NUMBER_SEPARATOR)}{DIGIT}*)?"
+    ),
+}
+_FRACTION_CONTINUATION = re.compile(rf"{DIGIT}*")
+
+STREAM_CHUNK_SIZE = 1 << 16
 
 
 def tokenize(source_code: str) -> TokenizeResult:
-    """Identify tokens in a source code."""
+    """Identify tokens in a source code.
+
+    Produces the same result as `tokenize_reference`.
+    """
+    stream, errors = tokenize_stream(source_code)
+    return list(stream), errors
+
+
+def tokenize_stream(
+    source_code: str, max_errors: int | None = None
+) -> TokenStreamResult:
+    """Identify tokens in a source code, keeping them in a `TokenStream`.
+
+    Scans the source with a single precompiled pattern. With `max_errors`,
+    tokenizing stops at the error reaching the limit, leaving the tokens
+    after it out.
+    """
+    observer = instrumentation.observer
+    if observer is not None:
+        started_at = time.perf_counter()
+    stream = TokenStream(source_code)
+    errors = []
+    types_append = stream.types.append
+    starts_append = stream.starts.append
+    stops_append = stream.stops.append
+    group_codes = _GROUP_TOKEN_TYPE_CODES
+    for match in LEXEME_PATTERN.finditer(source_code):
+        group = match.lastgroup
+        code = group_codes.get(group)
+        start, stop = match.span()
+        if code is None:
+            if group == _UNSUPPORTED_GROUP:
+                errors.append(UnsupportedLexemeError(match.group(), start))
+                if len(errors) == max_errors:
+                    break
+            continue
+        if (
+            code == _NUMBER_CODE and
+            source_code[stop-1] == DECIMAL_NUMBER_SEPARATOR
+        ):
+            errors.append(
+                UnsupportedLexemeError(match.group(), start, stop)
+            )
+            if len(errors) == max_errors:
+                break
+            continue
+        types_append(code)
+        starts_append(start)
+        stops_append(stop - 1)
+    if observer is not None:
+        observer.phase_finished("tokenize", time.perf_counter() - started_at)
+        observer.input_measured("tokenize", len(source_code))
+        observer.tokens_counted(Counter(
+            str(TOKEN_TYPES[code]) for code in stream.types
+        ))
+        observer.errors_counted({UNSUPPORTED_LEXEME_ERROR_KIND: len(errors)})
+    return stream, errors
+
+
+def iter_tokenize(
+    stream: TextIO | Iterable[str], chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[Token | UnsupportedLexemeError]:
+    """Identify tokens in a source code read in chunks.
+
+    Takes a text file, read `chunk_size` characters at a time, or any
+    iterable of text chunks. Tokens and errors are yielded in source order
+    with absolute positions. An identifier or a number that may continue
+    past the end of a chunk is collected piece by piece, so that chunks
+    are scanned once however long lexemes are.
+    """
+    if hasattr(stream, "read"):
+        chunks = iter(lambda: stream.read(chunk_size), "")
+    else:
+        chunks = iter(stream)
+
+    # Pieces of a lexeme continued from earlier chunks, its group, start
+    # and the pattern of its continuation
+    pieces: list[str] = []
+    group = continuation = None
+    start = 0
+    offset = 0
+    for chunk in chunks:
+        position = 0
+        if pieces:
+            position = continuation.match(chunk).end()
+            piece = chunk[:position]
+            pieces.append(piece)
+            if DECIMAL_NUMBER_SEPARATOR in piece:
+                continuation = _FRACTION_CONTINUATION
+            if position < len(chunk):
+                yield _lexeme_item(group, "".join(pieces), start)
+                pieces = []
+        if not pieces:
+            extended = yield from _lex_buffer(chunk, position, offset)
+            if extended is not None:
+                group, start, lexeme = extended
+                pieces = [lexeme]
+                continuation = _CONTINUATIONS[group]
+                if DECIMAL_NUMBER_SEPARATOR in lexeme:
+                    continuation = _FRACTION_CONTINUATION
+        offset += len(chunk)
+    if pieces:
+        yield _lexeme_item(group, "".join(pieces), start)
+
+
+def _lexeme_item(
+    group: str, lexeme: str, start: int
+) -> Token | UnsupportedLexemeError:
+    """Token of a lexeme matched as `group` at `start`, or the error of a
+    number missing digits after its decimal separator."""
+    token_type = _GROUP_TOKEN_TYPES[group]
+    if (
+        token_type is TokenType.NUMBER and
+        lexeme[-1] == DECIMAL_NUMBER_SEPARATOR
+    ):
+        return UnsupportedLexemeError(lexeme, start, start + len(lexeme))
+    return Token(
+        type=token_type,
+        lexeme=lexeme,
+        position=Position(start, start + len(lexeme) - 1)
+    )
+
+
+def _lex_buffer(
+    buffer: str, position: int, offset: int
+) -> Generator[
+    Token | UnsupportedLexemeError, None, tuple[str, int, str] | None
+]:
+    """Yield lexemes of a buffer from `position` on, the buffer starting
+    at `offset` in the source code.
+
+    An identifier or a number reaching the end of the buffer may continue
+    in the next one, so it is returned with its group and start instead.
+    """
+    for match in LEXEME_PATTERN.finditer(buffer, position):
+        group = match.lastgroup
+        start, stop = match.span()
+        if group in _CONTINUATIONS:
+            if stop == len(buffer):
+                return group, offset + start, match.group()
+            yield _lexeme_item(group, match.group(), offset + start)
+        elif group == _UNSUPPORTED_GROUP:
+            yield UnsupportedLexemeError(match.group(), offset + start)
+        elif group != _WHITESPACE_GROUP:
+            yield Token(
+                type=_GROUP_TOKEN_TYPES[group],
+                lexeme=match.group(),
+                position=Position(offset + start, offset + stop - 1)
+            )
+    return None
+
+
+def tokenize_reference(source_code: str) -> TokenizeResult:
+    """Identify tokens in a source code, one character at a time.
+
+    Original implementation of the lexer, kept to cross-check `tokenize`.
+    """
     tokens = []
     errors = []
     pos = 0
@@ -1,19 +1,167 @@
-from tokenizer import Token
+import io
+import json
+import time
+from collections.abc import Sequence
+from typing import TextIO
 
+import instrumentation
+from analyzer import SyntaxAnalysisError
+from tokenizer import (
+    TOKEN_TYPE_CODES,
+    TOKEN_TYPES,
+    Token,
+    TokenStream,
+    TokenType,
+    UnsupportedLexemeError,
+)
 
-def format_tokens(tokens: list[Token]) -> str:
-    result = []
-    for token in tokens:
-        token_type = str(token.type).upper()
-        words = token_type.split('_')
-        if len(words) == 1:
-            result.append(f"{words[0]}('{token.lexeme}')")
+# Tokens written at once by the writers below, bounding their buffers
+_WRITE_CHUNK_SIZE = 4096
+
+
+def _token_label(token_type: TokenType) -> str:
+    words = str(token_type).upper().split('_')
+    if len(words) == 1 or words[1] == 'SIGN':
+        return words[0]
+    if words[1] == 'OPERATOR':
+        return words[0][:3]
+    return f"{words[0][0]}{words[1][0]}"
+
+
+# TOKEN_PREFIXES[code] starts a formatted token of type with that code
+TOKEN_PREFIXES = tuple(
+    f"{_token_label(token_type)}('" for token_type in TOKEN_TYPES
+)
+# NDJSON_PREFIXES[code] starts an NDJSON record of a token of that type
+NDJSON_PREFIXES = tuple(
+    f'{{"type": "{token_type}", "lexeme": "' for token_type in TOKEN_TYPES
+)
+
+
+def _token_fields(
+    tokens: Sequence[Token], indices: range
+) -> tuple[list[int], list[str], list[int], list[int]]:
+    """Type codes, lexemes, starts and stops of tokens at `indices`."""
+    if isinstance(tokens, TokenStream):
+        source_code = tokens.source_code
+        starts = tokens.starts[indices.start:indices.stop]
+        stops = tokens.stops[indices.start:indices.stop]
+        return (
+            tokens.types[indices.start:indices.stop],
+            [
+                source_code[start:stop+1]
+                for start, stop in zip(starts, stops)
+            ],
+            starts,
+            stops,
+        )
+    tokens = tokens[indices.start:indices.stop]
+    return (
+        [TOKEN_TYPE_CODES[token.type] for token in tokens],
+        [token.lexeme for token in tokens],
+        [token.position.start for token in tokens],
+        [token.position.stop for token in tokens],
+    )
+
+
+def _chunks(tokens_count: int, max_tokens: int | None) -> list[range]:
+    """Ranges of token indices to write, in chunks of bounded size, with
+    an empty range standing for the elided middle of a long listing."""
+    if max_tokens is None or tokens_count <= max_tokens:
+        kept = [range(tokens_count)]
+    else:
+        head_count = (max_tokens + 1) // 2
+        kept = [
+            range(head_count),
+            range(tokens_count - max_tokens + head_count, tokens_count),
+        ]
+    chunks = []
+    for number, indices in enumerate(kept):
+        if number:
+            chunks.append(range(0))
+        chunks += [
+            range(start, min(start + _WRITE_CHUNK_SIZE, indices.stop))
+            for start in range(
+                indices.start, indices.stop, _WRITE_CHUNK_SIZE
+            )
+        ]
+    return chunks
+
+
+def write_tokens(
+    tokens: Sequence[Token], stream: TextIO, max_tokens: int | None = None
+) -> None:
+    """Write tokens as `format_tokens` formats them, without building the
+    whole listing in memory.
+
+    With `max_tokens`, only the first and last tokens are written, the
+    middle of a longer listing is replaced by a count of elided tokens.
+    """
+    observer = instrumentation.observer
+    if observer is not None:
+        started_at = time.perf_counter()
+    prefixes = TOKEN_PREFIXES
+    elided_count = len(tokens) - (max_tokens or 0)
+    separator = ""
+    for indices in _chunks(len(tokens), max_tokens):
+        if not indices:
+            stream.write(f" ... {elided_count} tokens elided ...")
             continue
-        if token_type == 'MINUS_SIGN':
-            result.append(f"{words[0]}('{token.lexeme}')")
-        if words[1] == 'OPERATOR':
-            result.append(f"{words[0][:3]}('{token.lexeme}')")
-        if words[1] == 'PARENTHESIS':
-            result.append(f"{words[0][0]}{words[1][0]}('{token.lexeme}')")
-    return ' '.join(result)
+        codes, lexemes, _, _ = _token_fields(tokens, indices)
+        stream.write(separator)
+        stream.write(" ".join([
+            f"{prefixes[code]}{lexeme}')"
+            for code, lexeme in zip(codes, lexemes)
+        ]))
+        separator = " "
+    if observer is not None:
+        observer.phase_finished("format", time.perf_counter() - started_at)
+
+
+def format_tokens(
+    tokens: Sequence[Token], max_tokens: int | None = None
+) -> str:
+    stream = io.StringIO()
+    write_tokens(tokens, stream, max_tokens)
+    return stream.getvalue()
+
+
+def write_tokens_ndjson(
+    tokens: Sequence[Token], stream: TextIO, max_tokens: int | None = None
+) -> None:
+    """Write a JSON object per token and line, with its type, lexeme and
+    inclusive start and stop.
+
+    With `max_tokens`, middle tokens of a longer listing are replaced by
+    an object with the count of elided tokens.
+    """
+    prefixes = NDJSON_PREFIXES
+    elided_count = len(tokens) - (max_tokens or 0)
+    for indices in _chunks(len(tokens), max_tokens):
+        if not indices:
+            stream.write(f'{{"elided": {elided_count}}}\n')
+            continue
+        # Lexemes consist of letters, digits, '.' and operators, none of
+        # which JSON escapes
+        stream.write("".join([
+            f'{prefixes[code]}{lexeme}", "start": {start}, '
+            f'"stop": {stop}}}\n'
+            for code, lexeme, start, stop in zip(
+                *_token_fields(tokens, indices)
+            )
+        ]))
+
 
+def write_errors_ndjson(
+    errors: Sequence[UnsupportedLexemeError | SyntaxAnalysisError],
+    stream: TextIO,
+) -> None:
+    """Write a JSON object per error and line, with its message and the
+    inclusive start and stop of where it was found, if anywhere."""
+    for error in errors:
+        position = error.position
+        stream.write(json.dumps({
+            "error": str(error),
+            "start": position.start if position else None,
+            "stop": position.stop if position else None,
+        }) + "\n")
@@ -0,0 +1,50 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from analyzer import SyntaxAnalysisError, SyntaxAnalyzer
+from tokenizer import TokenStream, UnsupportedLexemeError, tokenize_stream
+
+
+@dataclass(frozen=True)
+class ValidationResult:
+    """Tokens and errors found in an expression."""
+    tokens: TokenStream
+    tokenization_errors: tuple[UnsupportedLexemeError, ...]
+    syntax_analysis_errors: Sequence[SyntaxAnalysisError]
+
+    @property
+    def errors(
+        self
+    ) -> tuple[UnsupportedLexemeError | SyntaxAnalysisError, ...]:
+        return (*self.tokenization_errors, *self.syntax_analysis_errors)
+
+    @property
+    def is_valid(self) -> bool:
+        return not (self.tokenization_errors or self.syntax_analysis_errors)
+
+
+def validate_expression(
+    expression: str, max_errors: int | None = None
+) -> ValidationResult:
+    """Tokenize and analyze an expression.
+
+    With `max_errors`, validation stops once that many errors are found,
+    they are the first errors found without the limit. Tokens are then
+    only given up to the last tokenization error. Syntax errors are kept
+    as records and only built when accessed.
+    """
+    tokens, tokenization_errors = tokenize_stream(expression, max_errors)
+    syntax_analysis_errors: Sequence[SyntaxAnalysisError]
+    if max_errors is None:
+        syntax_analysis_errors = SyntaxAnalyzer(tokens).analyze_records()
+    elif len(tokenization_errors) < max_errors:
+        syntax_analysis_errors = SyntaxAnalyzer(
+            tokens, max_errors - len(tokenization_errors)
+        ).analyze_records()
+    else:
+        syntax_analysis_errors = ()
+    return ValidationResult(
+        tokens=tokens,
+        tokenization_errors=tuple(tokenization_errors),
+        syntax_analysis_errors=syntax_analysis_errors,
+    )
@@ -0,0 +1,152 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+from compiler import number_value
+from parser import LEAF_KINDS, NO_NODE, ExpressionTree, NodeKind
+from tokenizer import Position
+
+DEFAULT_BLOCK_SIZE = 1 << 16
+
+_UFUNCS = {
+    NodeKind.ADD: np.add,
+    NodeKind.SUBTRACT: np.subtract,
+    NodeKind.MULTIPLY: np.multiply,
+    NodeKind.DIVIDE: np.divide,
+    NodeKind.NEGATE: np.negative,
+}
+
+_NO_BUFFER = -1
+
+
+class MissingBindingError(Exception):
+    """Identifier has no bound value."""
+    def __init__(self, identifier: str, positions: list[Position]) -> None:
+        self.identifier = identifier
+        self.positions = positions
+        super().__init__(
+            f"{', '.join(map(str, positions))}: "
+            f"no value bound to '{identifier}'"
+        )
+
+
+def missing_bindings(
+    tree: ExpressionTree, bindings: Mapping[str, object]
+) -> list[MissingBindingError]:
+    """Errors about unbound identifiers, in order of first appearance."""
+    positions: dict[str, list[Position]] = {}
+    for node, kind in enumerate(tree.kinds):
+        if kind == NodeKind.IDENTIFIER:
+            name = tree.lexeme(node)
+            if name not in bindings:
+                positions.setdefault(name, []).append(tree.position(node))
+    return [
+        MissingBindingError(name, name_positions)
+        for name, name_positions in positions.items()
+    ]
+
+
+def assign_buffers(tree: ExpressionTree) -> tuple[list[int], int]:
+    """Buffer of every operator node but the root, and buffers count.
+
+    An operator writes its result over the buffer of one of its operands,
+    the other operand's buffer is released, so buffers are only taken
+    when both operands are leaves.
+    """
+    buffers = [_NO_BUFFER] * len(tree)
+    released: list[int] = []
+    buffers_count = 0
+    for node, kind in enumerate(tree.kinds):
+        if kind in LEAF_KINDS or node == tree.root:
+            continue
+        operand_buffers = [
+            buffers[child]
+            for child in (tree.left[node], tree.right[node])
+            if child != NO_NODE and buffers[child] != _NO_BUFFER
+        ]
+        if operand_buffers:
+            buffers[node] = operand_buffers[0]
+            released.extend(operand_buffers[1:])
+        elif released:
+            buffers[node] = released.pop()
+        else:
+            buffers[node] = buffers_count
+            buffers_count += 1
+    return buffers, buffers_count
+
+
+def _rows_count(values: list[np.ndarray]) -> int:
+    shape = np.broadcast_shapes(*(value.shape for value in values))
+    if len(shape) > 1:
+        raise ValueError(
+            f"Bindings must be scalars or columns, got shape {shape}"
+        )
+    return shape[0] if shape else 1
+
+
+def evaluate_columns(
+    tree: ExpressionTree,
+    bindings: Mapping[str, np.ndarray | float],
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> np.ndarray:
+    """Evaluate an expression over columns of identifier values.
+
+    Identifiers are bound to columns or scalars. Missing bindings are
+    raised as an ExceptionGroup of `MissingBindingError` before anything
+    is computed. Rows are processed in blocks of `block_size`, operators
+    write into a few preallocated block buffers through `out=`, and the
+    root writes straight into the result, so memory beyond the result is
+    bounded by the block size. The result has a single row when all
+    bindings are scalars. Division by zero follows NumPy's rules.
+    """
+    errors = missing_bindings(tree, bindings)
+    if errors:
+        raise ExceptionGroup("Missing identifier bindings", errors)
+
+    leaves: dict[int, np.ndarray] = {}
+    for node, kind in enumerate(tree.kinds):
+        if kind == NodeKind.IDENTIFIER:
+            leaves[node] = np.asarray(bindings[tree.lexeme(node)])
+        elif kind == NodeKind.NUMBER:
+            leaves[node] = np.asarray(number_value(tree.lexeme(node)))
+    values = list(leaves.values())
+    rows_count = _rows_count(values)
+    dtype = np.result_type(np.float64, *values)
+    for node, value in leaves.items():
+        if value.ndim and value.shape[0] != rows_count:
+            leaves[node] = value[0]
+        elif not value.ndim:
+            leaves[node] = value[()]
+
+    result = np.empty(rows_count, dtype)
+    buffers, buffers_count = assign_buffers(tree)
+    block_size = max(min(block_size, rows_count), 1)
+    block_buffers = [
+        np.empty(block_size, dtype) for _ in range(buffers_count)
+    ]
+    root = tree.root
+    kinds, left, right = tree.kinds, tree.left, tree.right
+    node_values: list = [None] * len(tree)
+    for start in range(0, rows_count, block_size):
+        stop = min(start + block_size, rows_count)
+        for node, kind in enumerate(kinds):
+            if kind in LEAF_KINDS:
+                value = leaves[node]
+                node_values[node] = (
+                    value[start:stop] if np.ndim(value) else value
+                )
+                continue
+            out = (
+                result[start:stop] if node == root
+                else block_buffers[buffers[node]][:stop-start]
+            )
+            if kind == NodeKind.NEGATE:
+                np.negative(node_values[left[node]], out=out)
+            else:
+                _UFUNCS[kind](
+                    node_values[left[node]], node_values[right[node]], out=out
+                )
+            node_values[node] = out
+        if kinds[root] in LEAF_KINDS:
+            result[start:stop] = node_values[root]
+    return result
@@ -0,0 +1,167 @@
+import json
+import os
+import socketserver
+import stat
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable
+from typing import TextIO
+
+from batch import validation_result
+from cache import ValidationCache
+from instrumentation import MetricsCollector, metric_lines
+from serialization import DiskCache
+
+LATENCY_SAMPLES_LIMIT = 10_000
+
+STATS_COMMAND = "stats"
+METRICS_COMMAND = "metrics"
+
+
+class LatencyStats:
+    """Latencies of the most recent requests."""
+    def __init__(self, samples_limit: int = LATENCY_SAMPLES_LIMIT) -> None:
+        self.requests_count = 0
+        self._samples: deque[float] = deque(maxlen=samples_limit)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.requests_count += 1
+            self._samples.append(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            requests_count = self.requests_count
+        return {
+            "requests": requests_count,
+            "p50_ms": _percentile(samples, 50) * 1000,
+            "p99_ms": _percentile(samples, 99) * 1000,
+        }
+
+
+def _percentile(sorted_samples: list[float], percent: int) -> float:
+    if not sorted_samples:
+        return 0.0
+    rank = -(-len(sorted_samples) * percent // 100)
+    return sorted_samples[max(rank, 1) - 1]
+
+
+class ValidationWorker:
+    """Long-lived validator answering newline-delimited JSON requests.
+
+    A request is either `{"expression": "..."}`, answered with the
+    validation result, `{"command": "stats"}`, answered with request
+    latency percentiles and cache counters, or `{"command": "metrics"}`,
+    answered with the same counters and those of `metrics`, if given, in
+    Prometheus text format. An optional `"id"` is echoed back in the
+    response.
+    """
+    def __init__(
+        self,
+        cache: ValidationCache | DiskCache | None = None,
+        metrics: MetricsCollector | None = None,
+    ) -> None:
+        self.stats = LatencyStats()
+        self.cache = cache
+        self.metrics = metrics
+
+    def handle(self, line: str) -> str:
+        started_at = time.perf_counter()
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as exc:
+            return json.dumps({"error": f"Malformed request: {exc}"})
+        if not isinstance(request, dict):
+            return json.dumps({"error": "Request must be a JSON object"})
+
+        response = {"id": request["id"]} if "id" in request else {}
+        if "expression" in request:
+            expression = request["expression"]
+            if not isinstance(expression, str):
+                response["error"] = "Expression must be a string"
+                return json.dumps(response)
+            response.update(validation_result(expression, self.cache))
+            self.stats.record(time.perf_counter() - started_at)
+        elif request.get("command") == STATS_COMMAND:
+            response.update(self.stats.snapshot())
+            if self.cache is not None:
+                response["cache"] = self.cache.stats()
+        elif request.get("command") == METRICS_COMMAND:
+            response["metrics"] = self.prometheus()
+        else:
+            response["error"] = (
+                "Request must contain an expression or a command"
+            )
+        return json.dumps(response)
+
+    def prometheus(self) -> str:
+        snapshot = self.stats.snapshot()
+        families = [
+            metric_lines(
+                "requests_total",
+                "Validated expressions.",
+                "counter",
+                {"": snapshot["requests"]}
+            ),
+            metric_lines(
+                "request_latency_seconds",
+                "Latency of recent requests.",
+                "summary",
+                {
+                    "0.5": snapshot["p50_ms"] / 1000,
+                    "0.99": snapshot["p99_ms"] / 1000,
+                },
+                label="quantile"
+            ),
+        ]
+        if self.cache is not None:
+            cache_stats = self.cache.stats()
+            families.append(metric_lines(
+                "cache_entries",
+                "Cached validation results.",
+                "gauge",
+                {"": cache_stats["entries"]}
+            ))
+            families += [
+                metric_lines(
+                    f"cache_{name}_total",
+                    f"Validation cache {name}.",
+                    "counter",
+                    {"": cache_stats[name]}
+                )
+                for name in ("hits", "misses", "evictions")
+            ]
+        if self.metrics is not None:
+            families.append(self.metrics.prometheus())
+        return "".join(families)
+
+    def serve(self, requests: Iterable[str], output: TextIO) -> None:
+        for line in requests:
+            if not line.strip():
+                continue
+            output.write(self.handle(line) + "\n")
+            output.flush()
+
+
+def serve_unix_socket(worker: ValidationWorker, path: str) -> None:
+    """Serve the worker's line protocol to clients of a Unix domain socket."""
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for raw_line in self.rfile:
+                line = raw_line.decode(errors="replace")
+                if not line.strip():
+                    continue
+                self.wfile.write((worker.handle(line) + "\n").encode())
+                self.wfile.flush()
+
+    if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        server.daemon_threads = True
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)